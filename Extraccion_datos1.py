@@ -7,6 +7,11 @@ import numpy as np
 from ansys.dpf import core as dpf
 from ansys.dpf.core import operators as ops
 
+from reduccion_campos import displacement_norm, von_mises
+from soporte_tiempo import TimeSupport, read_time_support
+from curvas_fuerza import support_reaction, support_selection
+from escritores import write_dataset
+
 
 
 def get_data_from_rst(rst_path):
@@ -37,54 +42,33 @@ def get_data_from_rst(rst_path):
         print(f"  [ERROR] No se pudo cargar la malla: {e}")
         return None
 
-    # b) OBTENER PASOS DE TIEMPO (CORREGIDO: usando 'time_steps')
+    # SELECCIÓN DE APOYO para la fuerza de reacción (sin ella el archivo falla)
     try:
-        time_op = ops.result.time_steps(data_sources=data_source)
-        all_time_steps = time_op.outputs.time_steps.array
-    except AttributeError:
-        # Fallback si 'time_steps' no funciona, asume un análisis estático de un solo paso (paso 1)
-        all_time_steps = np.array([1])
-        print("    Advertencia: No se encontraron pasos de tiempo. Asumiendo análisis estático (paso 1).")
-    
-    if not all_time_steps.size:
-        all_time_steps = np.array([1]) # Asegura al menos el paso 1 para estático
-
-
-    for time_step in all_time_steps:
-        
-        # Conectar el paso de tiempo a los operadores que lo necesitan
-        # 1. Conexión al Desplazamiento (el operador de RESULTADO)
-        displacement_op.inputs.time_scoping.connect([time_step])
-        
-        # 2. Conexión a Esfuerzo
-        stress_op.inputs.time_scoping.connect([time_step])
-        
-        # 3. Conexión a Fuerza
-        reaction_force_op.inputs.time_scoping.connect([time_step])
-
+        fixed_selection = support_selection(mesh)
+    except ValueError as e:
+        print(f"  [ERROR] {e}")
+        return None
 
-        # --- Obtener los resultados ---
+    # b) OBTENER LOS SETS DE RESULTADOS DESDE EL SOPORTE DE TIEMPO
+    # (ids de set enteros, paso de carga, subpaso y tiempo real; ver soporte_tiempo.py)
+    try:
+        support = read_time_support(data_source)
+        print(f"    {support.describe()}")
+    except Exception as e:
+        # Si falla, asume un análisis estático de un solo paso (set 1)
+        support = TimeSupport.single()
+        print(f"    Advertencia: No se pudo leer el soporte de tiempo ({e}). Asumiendo análisis estático (set 1).")
 
-        # Desplazamiento (Máximo Valor en todos los nodos)
-        # Aquí pedimos la salida del operador de la NORMA
-        disp_fields = displacement_norm_op.outputs.fields_container()
-        # ... (resto del cálculo de max_displacement)
+    # c) Operador de Desplazamiento (campo vectorial; la norma se calcula con NumPy)
+    displacement_op = ops.result.displacement(data_sources=data_source)
 
-# d) Operador para obtener los Esfuerzos (Asumimos Von Mises o lo calculamos si es un tensor)
-    # Volvemos a la definición más simple y antigua, que devuelve el campo de esfuerzos.
+    # d) Operador para obtener los Esfuerzos (tensor nodal; Von Mises se calcula con NumPy)
     stress_op = ops.result.stress(data_sources=data_source,
-                                  requested_location=dpf.locations.nodal) 
-    
-    # IMPORTANTE: Si 'stress_op' devuelve un campo tensorial (6 componentes), 
-    # la siguiente parte del script (alrededor de la línea 90) que usa 'np.max' 
-    # podría necesitar ajustarse si no devuelve Von Mises por defecto.
-    # Por ahora, dejaremos el resto del script intacto y probaremos.
-
-    # e) Operador para obtener la Fuerza de Reacción (Reaction Force) - ¡SOLUCIÓN FINAL!
-    # Obtenemos el campo de fuerzas sin el operador de suma, y lo sumaremos con NumPy más tarde.
-    reaction_force_op = ops.result.nodal_force(data_sources=data_source) 
-    # Ya no necesitamos sum_reaction_force_op
+                                  requested_location=dpf.locations.nodal)
 
+    # e) La Fuerza de Reacción se toma en la selección de apoyo (la suma de
+    # reacciones de todo el modelo es ~0 cuando el resorte está apoyado en
+    # ambos extremos; ver curvas_fuerza.py).
 
     # 3. Iteración y Extracción de Datos
     extracted_data = []
@@ -99,46 +83,39 @@ def get_data_from_rst(rst_path):
         project_name = os.path.basename(os.path.dirname(os.path.dirname(rst_path)))
 
 
-    for time_step in all_time_steps:
-        # Establecer el paso de tiempo para los operadores
-        
-        # 1. Conectar tiempo al operador de Desplazamiento BASE (el que tiene tiempo)
-        displacement_op.inputs.time_scoping.connect([time_step])
-        
-        # 2. Conectar tiempo a los otros operadores de Resultado
-        stress_op.inputs.time_scoping.connect([time_step])
-        reaction_force_op.inputs.time_scoping.connect([time_step]) # Agregamos la fuerza
+    for set_id in support.scoping():
+        # Conectar el set (id entero) a los operadores de resultado
+        displacement_op.inputs.time_scoping.connect([set_id])
+        stress_op.inputs.time_scoping.connect([set_id])
 
 
         # Obtener los resultados (se ejecutan en este punto)
 
-        # Desplazamiento (Máximo Valor en todos los nodos)
-        disp_fields = displacement_norm_op.outputs.fields_container()
-        max_displacement = np.max([field.data.max() for field in disp_fields])
+        # Desplazamiento (Máxima norma en todos los nodos)
+        disp_fields = displacement_op.outputs.fields_container()
+        max_displacement = max(displacement_norm(np.asarray(field.data).reshape(-1, 3)).max()
+                               for field in disp_fields)
 
         # Esfuerzo (Máximo Esfuerzo de Von Mises en todos los nodos)
         stress_fields = stress_op.outputs.fields_container()
-        max_von_mises = np.max([field.data.max() for field in stress_fields])
+        max_von_mises = max(von_mises(np.asarray(field.data).reshape(-1, 6)).max()
+                            for field in stress_fields)
 
-        # Fuerza de Reacción (Magnitud total de la suma de fuerzas)
-        # 1. Obtenemos el contenedor de campos del operador de fuerza.
-        rf_fields = reaction_force_op.outputs.fields_container()
+        # Fuerza de Reacción (Magnitud de la suma de fuerzas en el apoyo)
+        # 1. Sumamos Fx, Fy, Fz de los nodos de la selección de apoyo.
+        _, total_force_vector, _ = support_reaction(ops, data_source, [set_id], mesh, fixed_selection)
         
-        # 2. Sumamos las fuerzas de todos los nodos en el primer campo (paso de tiempo)
-        # Esto suma Fx, Fy, Fz en todos los nodos para obtener la fuerza de reacción TOTAL.
-        total_force_vector = np.sum(rf_fields[0].data, axis=0) 
-        
-        # 3. Calculamos la magnitud (Norma) de ese vector total.
-        total_reaction_force_norm = np.linalg.norm(total_force_vector)
+        # 2. Calculamos la magnitud (Norma) de ese vector total.
+        total_reaction_force_norm = np.linalg.norm(total_force_vector[0])
 
 
         # Guardar la fila de datos
         extracted_data.append({
             'Proyecto': project_name, 
-            'Tiempo': time_step,
-            'Max_Desplazamiento': max_displacement,
-            'Max_Von_Mises': max_von_mises,
-            'Total_Reaction_Force_Norm': total_reaction_force_norm,
+            **{column: values[0].item() for column, values in support.columns([set_id]).items()},
+            'Max_Desplazamiento': float(max_displacement),
+            'Max_Von_Mises': float(max_von_mises),
+            'Total_Reaction_Force_Norm': float(total_reaction_force_norm),
             'RST_Source': rst_path 
         })
 
@@ -149,7 +126,7 @@ def get_data_from_rst(rst_path):
 # FUNCIÓN DE NAVEGACIÓN (LÓGICA DE BÚSQUEDA AJUSTADA)
 # ----------------------------------------------------------------------
 
-def process_all_projects(root_directory, output_filename="ansys_extracted_data.csv"):
+def process_all_projects(root_directory, output_filename="ansys_extracted_data.parquet", output_format="parquet"):
     """
     Busca archivos .rst dentro de la estructura de carpetas:
     ROOT_DIR / [Proyecto X] / 3_SIMULACION / ... / file.rst
@@ -171,18 +148,31 @@ def process_all_projects(root_directory, output_filename="ansys_extracted_data.c
     print(f"--- Archivos .rst encontrados: {len(rst_files)}")
 
     all_data_frames = []
+    failed_files = []
 
     for rst_path in rst_files:
-        df = get_data_from_rst(rst_path)
+        # Un archivo con error no detiene el lote: queda en la lista de fallidos
+        try:
+            df = get_data_from_rst(rst_path)
+        except Exception as e:
+            print(f"  [ERROR] {rst_path}: {type(e).__name__}: {e}")
+            df = None
         if df is not None:
             all_data_frames.append(df)
+        else:
+            failed_files.append(rst_path)
+
+    if failed_files:
+        print(f"\n--- Archivos fallidos ({len(failed_files)}):")
+        for rst_path in failed_files:
+            print(f"  {rst_path}")
             
     # Combina todos los DataFrames
     if all_data_frames:
         final_df = pd.concat(all_data_frames, ignore_index=True)
         
-        # Guarda el DataFrame final en un archivo CSV
-        final_df.to_csv(output_filename, index=False)
+        # Guarda el DataFrame final (Parquet por defecto; output_format="csv" para Excel)
+        output_filename = write_dataset(final_df, output_filename, fmt=output_format)
         print("\n" + "="*50)
         print(f" ¡Éxito! Datos exportados a '{output_filename}'")
         print(f"El dataset final tiene {len(final_df)} filas.")
@@ -199,7 +189,7 @@ def process_all_projects(root_directory, output_filename="ansys_extracted_data.c
 PROJECTS_ROOT_PATH = r"E:\Trabajo_de_grado\2_Proyecto\3_Dataset_FEA_de_resortes_IMAL\Recolección\DAIHATSU_TERIOS_2006_2018_TRA"
 
 # Nombre del archivo de salida
-OUTPUT_FILE = "dataset_para_ia.csv"
+OUTPUT_FILE = "dataset_para_ia.parquet"
 
 # Llamamos a la función principal para comenzar la ejecución
 if __name__ == "__main__":
@@ -5,13 +5,11 @@ import numpy as np
 
 # Importamos las herramientas de PyAnsys
 from ansys.dpf import core as dpf
-from ansys.dpf.core import fields_factory
-from ansys.dpf.core import locations
 from ansys.dpf.core import operators as ops
 
-field_with_classic_api = dpf.Field()
-field_with_classic_api.location = locations.nodal
-field_with_factory = fields_factory.create_scalar_field(10)
+from reduccion_campos import displacement_norm, von_mises
+from soporte_tiempo import TimeSupport, read_time_support
+from escritores import write_dataset
 
 def get_data_from_rst(rst_path):
     """
@@ -34,17 +32,14 @@ def get_data_from_rst(rst_path):
         print(f"  [ERROR] No se pudo cargar la malla: {e}")
         return None
 
-    # --- OBTENER TODOS LOS 24 SUBPASOS (SOLUCIÓN DE CONTINGENCIA) ---
+    # --- SOPORTE DE TIEMPO: LOS SETS QUE REALMENTE TIENE EL ARCHIVO ---
+    # (antes se forzaban 24 subpasos; ver soporte_tiempo.py)
     try:
-        # Forzamos la lista de subpasos [1.0, 2.0, ..., 24.0]
-        num_substeps = 24 
-        all_time_steps = np.arange(1.0, float(num_substeps) + 1.0).astype(np.float64)
-        print(f"    Forzando {len(all_time_steps)} subpasos de carga para iterar.")
+        support = read_time_support(data_source)
+        print(f"    {support.describe()}")
     except Exception as e:
-        all_time_steps = np.array([1.0], dtype=np.float64) 
-    
-    if not all_time_steps.size:
-        all_time_steps = np.array([1.0], dtype=np.float64)
+        print(f"    [AVISO] No se pudo leer el soporte de tiempo ({e}). Asumiendo un único set.")
+        support = TimeSupport.single()
 
     
     # Extraemos el nombre del proyecto
@@ -55,48 +50,42 @@ def get_data_from_rst(rst_path):
         project_name = os.path.basename(os.path.dirname(os.path.dirname(rst_path)))
 
     
-    # 2. ITERACIÓN Y EXTRACCIÓN DE DATOS POR PASO DE CARGA
-    extracted_data = []
+    # 2. EXTRACCIÓN DE TODOS LOS PASOS DE CARGA EN UNA SOLA EVALUACIÓN
+    # Una sola cadena de operadores con un time_scoping que cubre todos los sets:
+    # el .rst se lee una vez por resultado y no una vez por subpaso.
+    time_scoping = support.scoping()
 
-    for time_step in all_time_steps:
-        
-        # Valor del paso de carga (float)
-        current_time_value = float(time_step) 
-        
-        # --- A. DESPLAZAMIENTO ---
-        displacement_op = ops.result.displacement(data_sources=data_source, time_scoping=[current_time_value])
-        displacement_norm_op = ops.math.norm(displacement_op)
-        disp_fields = displacement_norm_op.outputs[0] 
-        
-        # --- B. ESFUERZOS ---
-        stress_op = ops.result.stress(data_sources=data_source, 
-                                      requested_location=dpf.locations.nodal, 
-                                      time_scoping=[current_time_value])
-        stress_fields = stress_op.outputs[0]
-        
-        
-        # 3. CÁLCULO FINAL Y GUARDADO
-        
-        # Máximo Desplazamiento
-        disp_data = disp_fields.get_data()
-        max_displacement = disp_data.max()
+    # --- A. DESPLAZAMIENTO ---
+    displacement_op = ops.result.displacement(data_sources=data_source, time_scoping=time_scoping)
+    disp_fields = displacement_op.outputs.fields_container()
 
-        # Máximo Esfuerzo
-        stress_data = stress_fields.get_data()
-        max_von_mises = stress_data.max()
-        
-        # LA FUERZA SE EXCLUYE POR INCOMPATIBILIDAD
-        
-        # Guardar la fila de datos
-        extracted_data.append({
-            'Proyecto': project_name, 
-            'Paso_Carga': current_time_value, 
-            'Max_Desplazamiento': max_displacement,
-            'Max_Von_Mises': max_von_mises,
-            'RST_Source': rst_path 
-        })
+    # --- B. ESFUERZOS ---
+    stress_op = ops.result.stress(data_sources=data_source,
+                                  requested_location=dpf.locations.nodal,
+                                  time_scoping=time_scoping)
+    stress_fields = stress_op.outputs.fields_container()
+
+    # 3. CÁLCULO FINAL Y GUARDADO (reducciones por paso con NumPy)
+    time_ids = sorted(disp_fields.get_label_scoping("time").ids)
+    disp_stack = np.stack([np.asarray(disp_fields.get_field({"time": t}).data).reshape(-1, 3)
+                           for t in time_ids])
+    stress_stack = np.stack([np.asarray(stress_fields.get_field({"time": t}).data).reshape(-1, 6)
+                             for t in time_ids])
+
+    # Máximo Desplazamiento (norma por nodo) y Máximo Von Mises por paso
+    max_displacement = displacement_norm(disp_stack).max(axis=1)
+    max_von_mises = von_mises(stress_stack).max(axis=1)
+
+    # LA FUERZA SE EXCLUYE POR INCOMPATIBILIDAD
 
-    return pd.DataFrame(extracted_data)
+    # Paso de carga, subpaso, set y tiempo real de los sets devueltos
+    return pd.DataFrame({
+        'Proyecto': project_name,
+        **support.columns(time_ids),
+        'Max_Desplazamiento': max_displacement,
+        'Max_Von_Mises': max_von_mises,
+        'RST_Source': rst_path,
+    })
 
 
 
@@ -104,7 +93,7 @@ def get_data_from_rst(rst_path):
 # FUNCIÓN DE NAVEGACIÓN (LÓGICA DE BÚSQUEDA AJUSTADA)
 # ----------------------------------------------------------------------
 
-def process_all_projects(root_directory, output_filename="ansys_extracted_data.csv"):
+def process_all_projects(root_directory, output_filename="ansys_extracted_data.parquet", output_format="parquet"):
     """
     Busca archivos .rst dentro de la estructura de carpetas:
     ROOT_DIR / [Proyecto X] / 3_SIMULACION / ... / file.rst
@@ -138,8 +127,8 @@ def process_all_projects(root_directory, output_filename="ansys_extracted_data.c
         
         # EL BLOQUE DE ABAJO ESTÁ CORRECTAMENTE INDENTADO (MOVIDO A LA DERECHA)
         
-        # Guardar el archivo CSV con delimitadores compatibles (¡IMPORTANTE!)
-        final_df.to_csv(output_filename, index=False, sep=';', decimal='.', encoding='utf-8')
+        # Guardar el dataset (Parquet por defecto; output_format="csv" para Excel)
+        output_filename = write_dataset(final_df, output_filename, fmt=output_format)
 
         print("\n" + "="*50)
         print(f"¡Éxito! Datos exportados a '{output_filename}'")
@@ -157,7 +146,7 @@ def process_all_projects(root_directory, output_filename="ansys_extracted_data.c
 PROJECTS_ROOT_PATH = r"E:\Trabajo_de_grado\2_Proyecto\3_Dataset_FEA_de_resortes_IMAL\Recolección\DAIHATSU_TERIOS_2006_2018_TRA"
 
 # Nombre del archivo de salida
-OUTPUT_FILE = "dataset_para_ia.csv"
+OUTPUT_FILE = "dataset_para_ia.parquet"
 
 # Llamamos a la función principal para comenzar la ejecución
 if __name__ == "__main__":
@@ -1,112 +1,220 @@
 import os
-import glob
-import pandas as pd
+import sys
+import time
 import numpy as np
 
-# Importamos las herramientas de PyAnsys para el postprocesamiento (DPF)
-from ansys.dpf.core import operators as ops 
-from ansys.dpf import core as dpf
+# pandas y PyAnsys (DPF) se importan dentro de las funciones que los usan:
+# arrancar DPF tarda segundos y no hace falta para --help, el descubrimiento
+# de archivos ni para exportar lo que ya está en el caché.
 
+from reduccion_campos import reduce_results, stack_fields
+from curvas_fuerza import support_reaction, support_selection
+from escritores import write_dataset, DEFAULT_FORMAT, DEFAULT_COMPRESSION, WRITERS
+from descubrimiento import discover_rst_files, project_from_path
+from soporte_tiempo import TimeSupport, read_time_support
+from cache_mallas import shared_cache, MESH_CACHE_MB
+from cache_extraccion import file_fingerprint
+from diario_extraccion import RunJournal, interrupted_runs, backoff_delay, MAX_ATTEMPTS, BACKOFF_SECONDS
+import instrumentacion
+from instrumentacion import stage
 
 
 
 
-def get_data_from_rst(rst_path):
+
+# ----------------------------------------------------------------------
+# EXTRACCIÓN EN BLOQUE (TODOS LOS SUBPASOS EN UNA SOLA EVALUACIÓN)
+# ----------------------------------------------------------------------
+
+def _support_reaction_norm(ops, data_source, time_scoping, mesh=None, selection=None):
+    """
+    Norma de la fuerza de reacción total en la selección de apoyo por paso (la
+    misma reacción que curvas_fuerza.py). La suma de TODO el modelo se cancela
+    cuando el resorte está apoyado en ambos extremos.
+    """
+    if mesh is None:
+        mesh = ops.mesh.mesh_provider(data_sources=data_source).outputs.mesh()
+    _, reaction, _ = support_reaction(ops, data_source, time_scoping, mesh, selection)
+    return np.linalg.norm(reaction, axis=1)
+
+
+def _extract_all_steps(data_source, support, project_name, rst_path, mesh=None, fixed_selection=None):
+    """
+    Construye UNA cadena de operadores con un time_scoping que cubre todos los
+    sets del soporte de tiempo, evalúa cada resultado una sola vez y hace las
+    reducciones por paso con NumPy sobre los arreglos apilados. El .rst se lee
+    una vez por resultado en lugar de una vez por subpaso.
+
+    Con mesh, la malla ya leída se pasa a todos los operadores (ver cache_mallas.py).
+    fixed_selection: selección nombrada del apoyo para la fuerza de reacción.
+    """
+    import pandas as pd
+    from ansys.dpf import core as dpf
+    from ansys.dpf.core import operators as ops
+
+    time_scoping = support.scoping()
+    mesh_input = {} if mesh is None else {'mesh': mesh}
+
+    # 1. Desplazamiento (vector por nodo)
+    with stage('displacement', evaluations=1):
+        displacement_op = ops.result.displacement(data_sources=data_source, time_scoping=time_scoping,
+                                                  **mesh_input)
+        set_ids, disp, disp_ids = stack_fields(displacement_op.outputs.fields_container())
+
+    # 2. Esfuerzos (tensor nodal de 6 componentes)
+    with stage('stress', evaluations=1):
+        stress_op = ops.result.stress(data_sources=data_source, requested_location=dpf.locations.nodal,
+                                      time_scoping=time_scoping, **mesh_input)
+        stress_set_ids, stress, stress_ids = stack_fields(stress_op.outputs.fields_container())
+    if list(stress_set_ids) != list(set_ids):
+        raise ValueError(f"Desplazamiento y esfuerzo devolvieron sets distintos "
+                         f"({len(set_ids)} vs {len(stress_set_ids)})")
+
+    # 3. Reducción a escalares: norma de desplazamiento, Von Mises y principal máximo
+    with stage('reduccion'):
+        reduced = reduce_results(disp, disp_ids, stress, stress_ids)
+    n_steps = len(reduced['Max_Desplazamiento'])
+
+    # 4. Fuerza de reacción: suma vectorial de los nodos del apoyo y su norma por paso
+    try:
+        with stage('support_reaction', evaluations=1):
+            reaction_norm = _support_reaction_norm(ops, data_source, time_scoping, mesh, fixed_selection)
+        if len(reaction_norm) != n_steps:
+            raise ValueError(f"{len(reaction_norm)} sets de reacción para {n_steps} sets de resultados")
+    except Exception as e:
+        print(f"    [AVISO] Falló la extracción de fuerza: {e}. Asumiendo 0.0")
+        reaction_norm = np.zeros(n_steps)
+
+    if n_steps != len(time_scoping):
+        print(f"    [AVISO] Se pidieron {len(time_scoping)} sets y DPF devolvió {n_steps}.")
+
+    # Paso de carga, subpaso, set y tiempo real de los sets que DPF devolvió
+    return pd.DataFrame({
+        'Proyecto': project_name,
+        **support.columns(set_ids),
+        **reduced,
+        'Total_Reaction_Force_Norm': reaction_norm,
+        'RST_Source': rst_path,
+    })
+
+
+def project_name_from_path(rst_path):
+    """
+    Nombre del proyecto: la carpeta inmediatamente superior a '3_SIMULACION'
+    (con o sin tilde, ver descubrimiento.py).
+    """
+    return project_from_path(rst_path)
+
+
+def get_data_from_rst(rst_path, batched=True, meshes=None, source_path=None, fixed_selection=None,
+                      fingerprint=None):
     """
     Función que lee un archivo de resultados de ANSYS (.rst) y extrae
     tiempos, desplazamientos, esfuerzos y fuerzas de reacción.
-    Se definen los operadores de resultado DENTRO del bucle para resolver
-    el NameError y los problemas de conexión de tiempo.
+
+    Con batched=True (por defecto) todos los subpasos se extraen con una sola
+    cadena de operadores (ver _extract_all_steps). Con batched=False se usa la
+    extracción paso a paso, que define los operadores DENTRO del bucle.
+
+    La malla sale de 'meshes' (por defecto el caché de mallas del proceso), así
+    que un .rst ya visto o con la misma malla que otro no la vuelve a leer.
+
+    Con source_path, rst_path es una copia local (ver tuberia_extraccion.py): el
+    archivo se lee de rst_path, pero el proyecto, RST_Source y el índice de mallas
+    usan la ruta original.
+
+    fingerprint: file_fingerprint del archivo ya calculado (por ejemplo por el
+    caché de extracción). Sin él se calcula una sola vez sobre rst_path, que en
+    modo tubería es la copia local y no el original en el NAS.
+
+    La fuerza de reacción se suma en la selección nombrada de apoyo
+    fixed_selection (por defecto la primera de curvas_fuerza.FIXED_SELECTIONS).
+    Si la malla no la tiene se lanza ValueError: el archivo queda como fallido
+    en lugar de escribir una fuerza 0.0.
     """
-    print(f"  -> Procesando archivo: {rst_path}")
+    import pandas as pd
+    from ansys.dpf import core as dpf
+    from ansys.dpf.core import operators as ops
+
+    source_path = source_path or rst_path
+    print(f"  -> Procesando archivo: {source_path}")
 
     # 1. Conexión a la Data Source
     try:
-        data_source = dpf.DataSources(rst_path)
+        with stage('data_sources'):
+            data_source = dpf.DataSources(rst_path)
     except Exception as e:
         print(f"  [ERROR] No se pudo cargar el archivo DPF: {e}")
         return None
 
     # 2. DEFINICIÓN DE OPERADORES INICIALES (MALLA Y TIEMPOS)
-    # a) OBTENER EL OBJETO DE MALLA (USANDO 'mesh_provider')
+    # a) OBTENER EL OBJETO DE MALLA (caché de mallas; 'mesh_provider' solo si no está)
+    meshes = meshes if meshes is not None else shared_cache()
     try:
-        mesh_op = ops.mesh.mesh_provider(data_sources=data_source)
-        mesh = mesh_op.outputs.mesh() 
-        print(f"    Malla: Nodos={mesh.nodes.n_nodes}, Elementos={mesh.elements.n_elements}")
+        fingerprint = fingerprint or file_fingerprint(rst_path)
+        with stage('mesh_provider', evaluations=0 if meshes.cached(source_path, fingerprint) else 1):
+            mesh, mesh_id = meshes.get(data_source, source_path, fingerprint)
+        print(f"    Malla {mesh_id}: Nodos={mesh.nodes.n_nodes}, Elementos={mesh.elements.n_elements}")
     except Exception as e:
         print(f"  [ERROR] No se pudo cargar la malla: {e}")
         return None
 
-    # b) OBTENER PASOS DE TIEMPO (USANDO SOPORTE DE TIEMPO PARA TODOS LOS PASOS)
-    try:
-        # Usamos el operador de PyAnsys completo (solucionando el AttributeError)
-        time_op = dpf.operators.result.time_freq_steps(data_sources=data_source)
-        
-        # Accedemos a la lista de pasos de tiempo/subpasos
-        all_time_steps = time_op.outputs.time_steps.array.astype(np.float64)
-        
-        print(f"    Encontrados {len(all_time_steps)} subpasos (resultados) para iterar.")
+    # b) SELECCIÓN DE APOYO (sin ella no hay fuerza de reacción: el archivo falla)
+    fixed_selection = support_selection(mesh, fixed_selection)
 
+    # c) SOPORTE DE TIEMPO: sets, pasos de carga, subpasos y tiempos reales (una sola lectura)
+    try:
+        with stage('time_freq_support', evaluations=1):
+            support = read_time_support(data_source)
+        print(f"    {support.describe()}")
     except Exception as e:
-        # Si falla (simulación estática o error de sintaxis), asumimos el paso 1
-        print(f"    [AVISO] Falló la extracción de subpasos ({e}). Asumiendo solo el paso final.")
-        all_time_steps = np.array([1.0], dtype=np.float64) 
+        # Si falla (simulación estática o soporte ilegible), se pide solo el set 1
+        print(f"    [AVISO] No se pudo leer el soporte de tiempo ({e}). Asumiendo un único set.")
+        support = TimeSupport.single()
 
-    if not all_time_steps.size:
-        all_time_steps = np.array([1.0], dtype=np.float64)
+    if not support.n_sets:
+        support = TimeSupport.single()
 
     
     # 3. ITERACIÓN Y EXTRACCIÓN DE DATOS
     extracted_data = []
     
     # Extraemos el nombre del proyecto de la ruta
-    project_path_parts = rst_path.split(os.sep)
-    try:
-        project_name = project_path_parts[project_path_parts.index('3_SIMULACION') - 1]
-    except ValueError:
-        project_name = os.path.basename(os.path.dirname(os.path.dirname(rst_path)))
+    project_name = project_name_from_path(source_path)
 
+    if batched:
+        try:
+            return _extract_all_steps(data_source, support, project_name, source_path, mesh=mesh,
+                                      fixed_selection=fixed_selection)
+        except Exception as e:
+            print(f"    [AVISO] Falló la extracción en bloque ({e}). Usando extracción paso a paso.")
+
+    for set_id in support.scoping():
 
-    for time_step in all_time_steps:
-        
         # --- DEFINICIONES (MOVIDAS AL INICIO DEL BUCLE) ---
-        
-        # OBTENEMOS EL VALOR FLOTANTE NATIVO DE PYTHON
-        current_time_value = float(time_step)
-        # Reemplazamos el valor del tiempo por el índice de subpaso
-        # Esto le dice a PyAnsys "dame el resultado del subpaso número 5, 6, 7..."
-        substep_index = int(time_step) # Tomamos el paso (que debe ser 1, 2, 3...) 
-        
-        # 1. Desplazamiento (Definición y Conexión)
-        displacement_op = ops.result.displacement(data_sources=data_source, time_scoping=[current_time_value])
-        displacement_norm_op = ops.math.norm(displacement_op)
-        
-        # 2. Esfuerzos (Definición y Conexión)
-        stress_op = ops.result.stress(data_sources=data_source, requested_location=dpf.locations.nodal, time_scoping=[current_time_value])
-        
-              
-        # --- OBTENER LOS CONTENEDORES DE RESULTADOS (DEBEN IR AQUÍ) ---
+        # time_scoping con el id de set entero: DPF no tiene que buscar el tiempo
 
-        disp_fields = displacement_norm_op.outputs[0]  # Define el contenedor
-        stress_fields = stress_op.outputs[0] # Define el contenedor
+        # 1. Desplazamiento (Definición y Conexión)
+        displacement_op = ops.result.displacement(data_sources=data_source, time_scoping=[set_id], mesh=mesh)
 
-        # Desplazamiento (Máximo)
-        disp_data = np.asarray(disp_fields.get_data())
-        max_displacement = disp_data.max()
+        # 2. Esfuerzos (Definición y Conexión)
+        stress_op = ops.result.stress(data_sources=data_source, requested_location=dpf.locations.nodal, time_scoping=[set_id],
+                                      mesh=mesh)
 
-        # Esfuerzo (Máximo)
-        stress_data = np.asarray(stress_fields.get_data())
-        max_von_mises = stress_data.max()
+        # --- OBTENER LOS CONTENEDORES DE RESULTADOS Y REDUCIR A ESCALARES ---
+        with stage('displacement', evaluations=1):
+            _, disp, disp_ids = stack_fields(displacement_op.outputs.fields_container())
+        with stage('stress', evaluations=1):
+            _, stress, stress_ids = stack_fields(stress_op.outputs.fields_container())
+        with stage('reduccion'):
+            reduced = reduce_results(disp, disp_ids, stress, stress_ids)
 
        # --- CÁLCULO DE FUERZA DE REACCIÓN (BLOQUE SEGURO) ---
         try:
-            # Revertimos a support_reaction (Nomenclatura que debe funcionar)
-            reaction_force_op = dpf.operators.result.support_reaction(data_sources=data_source, time_scoping=[current_time_value])
-            rf_fields = reaction_force_op.outputs[0] # Acceso al Field
-            
-            # ... (Lógica de cálculo de fuerza) ...
-            final_reaction_value = np.linalg.norm(total_force_vector)
-            
+            with stage('support_reaction', evaluations=1):
+                final_reaction_value = float(_support_reaction_norm(ops, data_source, [set_id], mesh,
+                                                                    fixed_selection)[0])
+
         except Exception as e:
             # Si hay un error, la fuerza será 0.0
             print(f"    [AVISO] Falló la extracción de fuerza: {e}. Asumiendo 0.0")
@@ -114,66 +222,488 @@ def get_data_from_rst(rst_path):
 
         # Guardar la fila de datos
         extracted_data.append({
-            'Proyecto': project_name, 
-            'Tiempo': current_time_value, # Usamos current_time_value para consistencia
-            'Max_Desplazamiento': max_displacement,
-            'Max_Von_Mises': max_von_mises,
-            'Total_Reaction_Force_Norm': final_reaction_value, # USAR LA VARIABLE FINAL Y SEGURA
-            'RST_Source': rst_path 
+            'Proyecto': project_name,
+            **{column: values[0].item() for column, values in support.columns([set_id]).items()},
+            **{column: values[0].item() for column, values in reduced.items()},
+            'Total_Reaction_Force_Norm': final_reaction_value,
+            'RST_Source': source_path
         })
 
     return pd.DataFrame(extracted_data)
 
 
+# ----------------------------------------------------------------------
+# EJECUCIÓN EN PARALELO (POOL DE PROCESOS)
+# ----------------------------------------------------------------------
+
+def _extract_worker(rst_path, profile=False, mesh_cache_mb=None, mesh_export_dir=None, fixed_selection=None,
+                    local_path=None, fingerprint=None):
+    """
+    Envoltura de get_data_from_rst para ejecutarse dentro de un proceso del pool.
+    Cada proceso crea sus propias DataSources de DPF al llamar a get_data_from_rst,
+    por lo que no se comparte ningún objeto DPF entre procesos.
+    Devuelve (rst_path, DataFrame o None, mensaje de error o None, registros de
+    instrumentación). Con profile=True el proceso mide sus etapas (ver instrumentacion.py).
+    Cada proceso tiene su caché de mallas, que dura entre archivos (ver cache_mallas.py).
+    Con local_path se lee esa copia del archivo en lugar de rst_path.
+    fingerprint: huella del archivo ya calculada (ver get_data_from_rst).
+    """
+    shared_cache(mesh_cache_mb, mesh_export_dir)
+    if profile:
+        instrumentacion.enable()
+    instrumentacion.start_file(rst_path)
+    try:
+        df = get_data_from_rst(local_path or rst_path, source_path=rst_path, fixed_selection=fixed_selection,
+                               fingerprint=fingerprint)
+        error = None if df is not None else "No se extrajeron datos (ver mensajes del proceso)"
+    except Exception as e:
+        df, error = None, f"{type(e).__name__}: {e}"
+    instrumentacion.end_file(status='ok' if error is None else 'error',
+                             rows=0 if df is None else len(df))
+    return rst_path, df, error, instrumentacion.pop_records()
+
+
+# Cola por la que cada proceso del pool avisa qué archivo empieza (ruta, pid).
+# Sirve para saber qué archivos estaban REALMENTE en ejecución cuando murió un
+# proceso (los que seguían en cola no tienen la culpa) y qué proceso terminar
+# cuando un archivo supera el tiempo máximo.
+_STARTED = None
+
+
+def _init_worker(started, initializer=None):
+    global _STARTED
+    _STARTED = started
+    if initializer is not None:
+        initializer()
+
+
+def _tracked_worker(rst_path, *args):
+    """
+    _extract_worker precedido del aviso de inicio. SimpleQueue escribe en el
+    pipe antes de volver, así que el aviso llega aunque el proceso muera justo
+    después dentro de DPF.
+    """
+    if _STARTED is not None:
+        _STARTED.put((rst_path, os.getpid()))
+    return _extract_worker(rst_path, *args)
+
+
+def _drain_started(started, running):
+    now = time.monotonic()
+    while not started.empty():
+        path, pid = started.get()
+        running.setdefault(path, (pid, now))
+
+
+def _kill_process(pid):
+    """
+    Termina un proceso del pool bloqueado dentro de DPF (no se puede cancelar de
+    otra forma). El pool queda roto y ProcessPoolExecutor termina el resto.
+    """
+    import signal
+
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+
+def run_parallel_extraction(rst_files, workers, timeout=None, poll_interval=1.0, profile=False,
+                            initializer=None, mesh_cache_mb=None, mesh_export_dir=None, on_result=None,
+                            fixed_selection=None, fingerprints=None):
+    """
+    Reparte los archivos .rst entre 'workers' procesos.
+
+    - timeout: segundos máximos por archivo (None = sin límite), contados desde
+      que el archivo empieza en un proceso. Si un archivo lo supera se registra
+      como fallo, se termina su proceso y los demás archivos pendientes se
+      vuelven a enviar a un pool nuevo.
+    - Si un proceso muere (por ejemplo, un fallo de DPF con un .rst corrupto) el
+      pool queda roto. Los archivos que estaban en cola se vuelven a enviar sin
+      contar como fallo; los que estaban en ejecución son sospechosos y se
+      repiten de a uno, cada uno en su propio pool: solo el que vuelve a tumbar
+      su proceso se registra como 'proceso_caido'.
+
+    - initializer: función que ejecuta cada proceso al arrancar (por ejemplo
+      dpf_sintetico.install en el banco de pruebas).
+    - mesh_cache_mb / mesh_export_dir: presupuesto del caché de mallas de cada
+      proceso y carpeta donde se exporta cada malla única (ver cache_mallas.py).
+    - on_result(rst_path, df, fallo): se llama en cuanto termina cada archivo
+      (df o el dict del fallo), para confirmarlo sin esperar al resto.
+    - fixed_selection: selección de apoyo para la fuerza de reacción.
+    - fingerprints: dict rst_path -> file_fingerprint ya calculado (el del caché
+      de extracción); los procesos no vuelven a leer esos archivos para el
+      caché de mallas.
+
+    Devuelve (resultados, fallos, registros) donde 'resultados' es un dict
+    rst_path -> DataFrame, 'fallos' una lista de dicts con RST_Source, Motivo y
+    Detalle y 'registros' la instrumentación de cada archivo (vacía sin profile).
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from concurrent.futures.process import BrokenProcessPool
+
+    results = {}
+    failures = []
+    records = []
+
+    def fail(path, motivo, detalle):
+        failures.append({'RST_Source': path, 'Motivo': motivo, 'Detalle': detalle})
+        if on_result is not None:
+            on_result(path, None, failures[-1])
+    fingerprints = fingerprints or {}
+    pending_paths = list(rst_files)
+    suspects = []
+
+    while pending_paths or suspects:
+        # Un sospechoso se repite solo: si el pool vuelve a romperse, es él
+        isolating = bool(suspects)
+        if isolating:
+            batch = [suspects.pop(0)]
+        else:
+            batch, pending_paths = pending_paths, []
+
+        started = multiprocessing.SimpleQueue()
+        executor = ProcessPoolExecutor(max_workers=1 if isolating else workers,
+                                       initializer=_init_worker, initargs=(started, initializer))
+        futures = {executor.submit(_tracked_worker, path, profile, mesh_cache_mb, mesh_export_dir,
+                                   fixed_selection, None, fingerprints.get(path)): path
+                   for path in batch}
+        running = {}
+        finished = set()
+        broken = None
+        killed = False
+
+        not_done = set(futures)
+        while not_done:
+            done, not_done = wait(not_done, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            _drain_started(started, running)
+
+            for future in done:
+                path = futures[future]
+                if path in finished:
+                    continue
+                try:
+                    _, df, error, file_records = future.result()
+                    records.extend(file_records)
+                except BrokenProcessPool as e:
+                    broken = e
+                    continue
+                except Exception as e:
+                    df, error = None, f"{type(e).__name__}: {e}"
+
+                finished.add(path)
+                if error is not None:
+                    fail(path, 'error', error)
+                    print(f"  [ERROR] {path}: {error}")
+                else:
+                    results[path] = df
+                    if on_result is not None:
+                        on_result(path, df, None)
+                    print(f"  [OK] ({len(results)}/{len(rst_files)}) {path}")
+
+            if timeout is None:
+                continue
+
+            # Control del tiempo máximo por archivo. Al terminar el proceso el
+            # pool se rompe y el resto de futuros termina con BrokenProcessPool.
+            now = time.monotonic()
+            for path, (pid, started_at) in running.items():
+                if path not in finished and now - started_at > timeout:
+                    finished.add(path)
+                    fail(path, 'timeout', f"Superó {timeout} s")
+                    print(f"  [ERROR] Tiempo máximo superado ({timeout} s): {path}")
+                    _kill_process(pid)
+                    killed = True
+
+        executor.shutdown(wait=True, cancel_futures=True)
+        if broken is None:
+            continue
+
+        _drain_started(started, running)
+        unresolved = [path for path in futures.values() if path not in finished]
+        in_flight = [path for path in unresolved if path in running] or unresolved
+        if killed:
+            # El pool lo rompió el control de tiempo, no un archivo
+            pending_paths.extend(unresolved)
+        elif isolating or len(in_flight) == 1:
+            # Solo un archivo estaba en ejecución: es el que tumbó el proceso
+            fail(in_flight[0], 'proceso_caido', str(broken))
+            print(f"  [ERROR] El proceso murió procesando: {in_flight[0]}")
+            pending_paths.extend(path for path in unresolved if path != in_flight[0])
+        else:
+            suspects.extend(in_flight)
+            pending_paths.extend(path for path in unresolved if path not in in_flight)
+            print(f"  [AVISO] Murió un proceso del pool; {len(in_flight)} archivo(s) en ejecución se "
+                  f"repiten de a uno, {len(unresolved) - len(in_flight)} se vuelven a enviar.")
+
+    return results, failures, records
+
+
+def write_failure_report(failures, report_filename):
+    """
+    Guarda el reporte de archivos fallidos (RST_Source;Motivo;Detalle).
+    """
+    import pandas as pd
+
+    report_df = pd.DataFrame(failures, columns=['RST_Source', 'Motivo', 'Detalle'])
+    report_df = report_df.sort_values('RST_Source', kind='stable')
+    report_df.to_csv(report_filename, index=False, sep=';', encoding='utf-8')
+    print(f"Reporte de fallos ({len(report_df)} archivos) guardado en '{report_filename}'")
+
 
 # ----------------------------------------------------------------------
 # FUNCIÓN DE NAVEGACIÓN (LÓGICA DE BÚSQUEDA AJUSTADA)
 # ----------------------------------------------------------------------
 
-def process_all_projects(root_directory, output_filename="ansys_extracted_data.csv"):
+def process_all_projects(root_directory, output_filename="ansys_extracted_data.parquet",
+                         workers=1, timeout=None, failures_filename=None,
+                         cache_path=None, rebuild_cache=False,
+                         output_format=DEFAULT_FORMAT, compression=DEFAULT_COMPRESSION,
+                         partition_by_project=False, index_path=None, scan_workers=8,
+                         profile_log=None, mesh_cache_mb=MESH_CACHE_MB, mesh_export_dir=None,
+                         journal_path=None, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF_SECONDS,
+                         pipeline=False, scratch_dir=None, prefetch=2, validate=True, datis_path=None,
+                         fixed_selection=None):
     """
     Busca archivos .rst dentro de la estructura de carpetas:
     ROOT_DIR / [Proyecto X] / 3_SIMULACION / ... / file.rst
+
+    Con workers > 1 los archivos se reparten en un pool de procesos. El resultado
+    se une siempre en el orden (ordenado) de las rutas encontradas, así que el CSV
+    final es el mismo sin importar el número de procesos.
+
+    Con cache_path solo se extraen los archivos nuevos o modificados; el resto se
+    toma del caché (ver cache_extraccion.py). rebuild_cache=True fuerza a
+    extraer todo de nuevo.
+
+    El dataset se guarda en Parquet por defecto (ver escritores.py); con
+    output_format='csv' se guarda el CSV con ';' para Excel.
+
+    La búsqueda de archivos usa descubrimiento.py (os.scandir en paralelo, tolerante
+    a '3_SIMULACIÓN'); con index_path el índice de descubrimiento queda en disco.
+
+    Con profile_log se mide cada archivo (tiempo por etapa, RSS máximo del
+    proceso y variación de RSS en el archivo, bytes leídos y evaluaciones
+    declaradas de operadores), se agrega al registro JSON-lines y se
+    imprime una tabla resumen al final (ver instrumentacion.py).
+
+    Las mallas se guardan en un caché LRU por proceso de mesh_cache_mb MB; con
+    mesh_export_dir cada malla única se exporta una vez (ver cache_mallas.py).
+
+    Ejecución reanudable: con caché, las filas de cada archivo se confirman en
+    cuanto termina (no al final) y, con journal_path, cada evento queda en el
+    diario (ver diario_extraccion.py). Si la ejecución se cae, volver a lanzarla
+    salta los archivos confirmados y reintenta los fallidos con espera creciente.
+    El dataset final se arma siempre desde el caché, así que es idéntico byte a
+    byte al de una ejecución sin interrupciones.
+
+    Con pipeline=True la copia del .rst a scratch_dir, la evaluación con DPF
+    (workers procesos) y la escritura en el caché se solapan con colas acotadas
+    (ver tuberia_extraccion.py); al final se imprime el rendimiento por etapa.
+
+    Con validate=True el dataset pasa por el control de calidad antes de
+    guardarse (ver validacion_dataset.py): los proyectos con errores van a
+    <salida>_cuarentena y el detalle a <salida>_validacion.csv. Los límites
+    físicos salen de BASEDAT en datis_path (por defecto DATIS.xlsm del repositorio);
+    si el libro no está, no se extrae nada.
+
+    fixed_selection: selección nombrada del apoyo donde se suma la fuerza de
+    reacción (por defecto la primera de curvas_fuerza.FIXED_SELECTIONS). Los
+    archivos sin esa selección quedan en el reporte de fallos. El caché no
+    guarda la selección: al cambiarla, usar rebuild_cache=True.
+
+    Devuelve la ruta del dataset guardado, o None si no se guardó (sin DATIS, sin archivos,
+    sin datos o rechazado por el control de calidad).
     """
+    # El libro de diseño se carga antes de extraer: si falta, se avisa ya y no
+    # al final de la ejecución
+    design_df = None
+    if validate:
+        from validacion_dataset import load_design
+
+        try:
+            design_df = load_design(datis_path)
+        except FileNotFoundError as e:
+            print(f"[ERROR] Control de calidad: {e} (o desactivarlo con --no-validate)")
+            return None
+
     print(f"Iniciando la búsqueda de archivos .rst en: {root_directory}")
 
-        # Este patrón busca recursivamente ('**') la carpeta '3_SIMULACION', y luego
-    # busca cualquier archivo .rst dentro de sus subcarpetas ('**/*.rst').
-    # Esto es más seguro que el intento anterior.
-    rst_pattern = os.path.join(root_directory, '**', '3_SIMULACION', '**', '*.rst')
-    rst_files = glob.glob(rst_pattern, recursive=True)
+    # Busca las carpetas '3_SIMULACION' (con o sin tilde) y los .rst dentro de ellas
+    rst_files = discover_rst_files(root_directory, index_path=index_path, workers=scan_workers,
+                                   use_index=index_path is not None)
     if not rst_files:
         print("---")
         print(" No se encontró ningún archivo .rst dentro de la estructura. ¡Verifica la ruta y el nombre '3_SIMULACION'!")
-        print(f"Patrón de búsqueda usado: {rst_pattern}")
-        return
+        return None
 
     print(f"--- Archivos .rst encontrados: {len(rst_files)}")
 
-    all_data_frames = []
+    # Archivos ya extraídos y sin cambios se toman del caché
+    cache = None
+    cached_results = {}
+    to_extract = rst_files
+    fingerprints = {}
+    if cache_path is not None:
+        from cache_extraccion import ExtractionCache
+
+        cache = ExtractionCache(cache_path, rebuild=rebuild_cache)
+        cache.prune(rst_files, root_directory)
+        for rst_path in rst_files:
+            df = cache.get(rst_path)
+            if df is not None:
+                cached_results[rst_path] = df
+        to_extract = [path for path in rst_files if path not in cached_results]
+        # La huella de cada archivo ya se leyó en get(): la reutiliza el caché de mallas
+        fingerprints = {path: cache.fingerprint(path) for path in to_extract}
+        print(f"--- En caché: {len(cached_results)} | Por extraer: {len(to_extract)}")
+
+    profile = profile_log is not None
+    run_started = time.time()
+
+    # Diario de la ejecución (solo con caché: el caché guarda las filas confirmadas)
+    journal = None
+    attempts = {}
+    if cache is not None and journal_path is not None:
+        journal = RunJournal(journal_path)
+        entries = journal.entries()
+        if interrupted_runs(entries):
+            print(f"--- Reanudando: {len(interrupted_runs(entries))} ejecuciones anteriores sin terminar; "
+                  f"{len(cached_results)} archivos ya confirmados en el caché")
+        attempts = journal.failed_attempts()
+        journal.start_run({'root': root_directory, 'n_files': len(rst_files),
+                           'n_cached': len(cached_results), 'workers': workers})
+
+    def commit(rst_path, df, failure):
+        # Cada archivo se confirma al terminar: primero sus filas, después el diario
+        attempts[rst_path] = attempts.get(rst_path, 0) + 1
+        if failure is None:
+            if cache is not None:
+                cache.put(rst_path, df)
+            if journal is not None:
+                journal.record(rst_path, 'ok', rows=len(df), attempt=attempts[rst_path])
+        elif journal is not None:
+            journal.record(rst_path, 'error', motivo=failure['Motivo'], detalle=failure['Detalle'],
+                           attempt=attempts[rst_path])
+
+    # Los archivos fallidos se reintentan (hasta max_attempts intentos en total,
+    # contando los de ejecuciones anteriores) con una espera que se duplica
+    results, failures, records = {}, [], []
+    pending = to_extract
+    retry = 0
+    pipeline_metrics = []
+    if pipeline and to_extract:
+        from tuberia_extraccion import run_pipeline, print_metrics
+
+        print(f"--- Modo tubería: copia -> evaluación ({workers} procesos) -> escritura")
+        if timeout is not None:
+            print("    [AVISO] La tubería no aplica el tiempo máximo por archivo (--timeout).")
+    elif workers > 1 and to_extract:
+        print(f"--- Modo paralelo: {workers} procesos")
+    while pending:
+        if retry:
+            delay = backoff_delay(retry, backoff)
+            print(f"--- Reintento {retry}: {len(pending)} archivos en {delay:g} s")
+            time.sleep(delay)
+        if pipeline:
+            round_results, round_failures, round_records, round_metrics = run_pipeline(
+                pending, workers, scratch_dir=scratch_dir, prefetch=prefetch, profile=profile,
+                mesh_cache_mb=mesh_cache_mb, mesh_export_dir=mesh_export_dir, on_result=commit,
+                fixed_selection=fixed_selection, fingerprints=fingerprints)
+            print_metrics(round_metrics)
+            pipeline_metrics.append(round_metrics)
+        elif workers > 1:
+            round_results, round_failures, round_records = run_parallel_extraction(
+                pending, workers, timeout=timeout, profile=profile, mesh_cache_mb=mesh_cache_mb,
+                mesh_export_dir=mesh_export_dir, on_result=commit, fixed_selection=fixed_selection,
+                fingerprints=fingerprints)
+        else:
+            round_results, round_failures, round_records = {}, [], []
+            for rst_path in pending:
+                _, df, error, file_records = _extract_worker(rst_path, profile, mesh_cache_mb, mesh_export_dir,
+                                                             fixed_selection,
+                                                             fingerprint=fingerprints.get(rst_path))
+                round_records.extend(file_records)
+                if error is not None:
+                    round_failures.append({'RST_Source': rst_path, 'Motivo': 'error', 'Detalle': error})
+                    commit(rst_path, None, round_failures[-1])
+                else:
+                    round_results[rst_path] = df
+                    commit(rst_path, df, None)
+        results.update(round_results)
+        records.extend(round_records)
+        pending = [f['RST_Source'] for f in round_failures if attempts[f['RST_Source']] < max_attempts]
+        failures.extend(f for f in round_failures if f['RST_Source'] not in pending)
+        retry += 1
+    if workers <= 1 and not pipeline and to_extract:
+        print(shared_cache().summary())
+
+    if cache is not None:
+        # El dataset se arma con las filas tal como quedaron en el caché: una
+        # ejecución reanudada produce el mismo archivo que una sin interrupciones
+        for rst_path in results:
+            results[rst_path] = cache.rows(rst_path)
+        print(cache.summary())
+        cache.close()
+        results.update(cached_results)
+
+    if profile:
+        instrumentacion.write_run_log(records, profile_log, run_info={
+            'root': root_directory, 'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(run_started)),
+            'seconds': time.time() - run_started, 'workers': workers,
+            'n_files': len(rst_files), 'n_cached': len(cached_results), 'n_extracted': len(to_extract),
+            **({'pipeline': pipeline_metrics} if pipeline_metrics else {}),
+        })
+        instrumentacion.print_summary(records)
+        print(f"Registro de instrumentación agregado a '{profile_log}'")
 
-    for rst_path in rst_files:
-        df = get_data_from_rst(rst_path)
-        if df is not None:
-            all_data_frames.append(df)
-     # Manejo y guardado del DataFrame final (Solución a NameError y IndentationError)
-    final_df = pd.DataFrame() # Inicialización segura
+    # Unión determinista: mismo orden que la lista de archivos
+    all_data_frames = [results[path] for path in rst_files if path in results]
+
+    if failures:
+        if failures_filename is None:
+            failures_filename = os.path.splitext(output_filename)[0] + "_fallos.csv"
+        write_failure_report(failures, failures_filename)
 
     if all_data_frames:
+        import pandas as pd
+
         final_df = pd.concat(all_data_frames, ignore_index=True)
-        
-        # EL BLOQUE DE ABAJO ESTÁ CORRECTAMENTE INDENTADO (MOVIDO A LA DERECHA)
-        
-        # Guardar el archivo CSV con delimitadores compatibles (¡IMPORTANTE!)
-        final_df.to_csv(output_filename, index=False, sep=';', decimal='.', encoding='utf-8')
+
+        # Control de calidad: los proyectos con errores no llegan al dataset. Si
+        # falla toda la ejecución (todo en cuarentena) no se guarda nada
+        if validate:
+            from validacion_dataset import quality_gate
+
+            try:
+                final_df = quality_gate(final_df, output_filename, design_df,
+                                        output_format=output_format, compression=compression)
+            except ValueError as e:
+                print(f"\n[ERROR] Control de calidad: {e} No se guardó el dataset.")
+                if journal is not None:
+                    journal.end_run(ok=len(results), failed=len(failures), rejected=True,
+                                    seconds=round(time.time() - run_started, 3))
+                return None
+
+        # Guardar el dataset con el escritor elegido (Parquet o CSV)
+        output_filename = write_dataset(final_df, output_filename, fmt=output_format,
+                                        compression=compression,
+                                        partition_cols=['Proyecto'] if partition_by_project else None)
 
         print("\n" + "="*50)
         print(f"¡Éxito! Datos exportados a '{output_filename}'")
         print(f"El dataset final tiene {len(final_df)} filas.")
+        print(f"Archivos procesados: {len(all_data_frames)} | Fallidos: {len(failures)}")
         print("="*50)
     else:
+        output_filename = None
         print("\n No se pudieron extraer datos de ningún archivo para el CSV.")
 
+    if journal is not None:
+        journal.end_run(ok=len(results), failed=len(failures), seconds=round(time.time() - run_started, 3))
+    return output_filename
+
 # ----------------------------------------------------------------------
 #                      VARIABLES A AJUSTAR
 # ----------------------------------------------------------------------
@@ -183,8 +713,103 @@ def process_all_projects(root_directory, output_filename="ansys_extracted_data.c
 PROJECTS_ROOT_PATH = r"E:\Trabajo_de_grado\2_Proyecto\3_Dataset_FEA_de_resortes_IMAL\Recolección\DAIHATSU_TERIOS_2006_2018_TRA"
 
 # Nombre del archivo de salida
-OUTPUT_FILE = "dataset_para_ia.csv"
+OUTPUT_FILE = "dataset_para_ia.parquet"
+
+# Caché de extracción (se reutilizan los .rst que no han cambiado)
+CACHE_FILE = "cache_extraccion.sqlite"
+
+# Índice de descubrimiento de archivos .rst
+INDEX_FILE = "indice_rst.sqlite"
+
+# Registro de instrumentación (JSON-lines, una línea por archivo)
+PROFILE_LOG = "registro_extraccion.jsonl"
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extracción de resultados ANSYS (.rst) para el dataset de IA.")
+    parser.add_argument("root", nargs="?", default=PROJECTS_ROOT_PATH,
+                        help="Carpeta que contiene las carpetas de proyecto")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE,
+                        help="Archivo de salida (la extensión se ajusta al formato)")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, choices=sorted(WRITERS),
+                        help="Formato de salida: parquet (por defecto) o csv para Excel")
+    parser.add_argument("--compression", default=DEFAULT_COMPRESSION,
+                        help="Compresión Parquet (zstd, snappy, gzip o none)")
+    parser.add_argument("--index", default=INDEX_FILE,
+                        help="Índice SQLite del descubrimiento de archivos .rst")
+    parser.add_argument("--scan-workers", type=int, default=8,
+                        help="Hilos para recorrer las carpetas de proyecto")
+    parser.add_argument("--partition", action="store_true",
+                        help="Parquet particionado por Proyecto (una carpeta por proyecto)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Número de procesos para extraer en paralelo (1 = secuencial)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Tiempo máximo en segundos por archivo .rst (solo con --workers > 1)")
+    parser.add_argument("--failures", default=None,
+                        help="Archivo del reporte de fallos (por defecto <output>_fallos.csv)")
+    parser.add_argument("--cache", default=CACHE_FILE,
+                        help="Archivo SQLite del caché de extracción")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="No usar el caché: extraer todos los archivos")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="Vaciar el caché y extraer todos los archivos de nuevo")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_LOG, default=None, metavar="LOG",
+                        help=f"Medir tiempos, memoria y operadores por archivo y etapa; "
+                             f"agrega un registro JSON-lines (por defecto {PROFILE_LOG})")
+    parser.add_argument("--mesh-cache-mb", type=float, default=MESH_CACHE_MB,
+                        help="Memoria máxima del caché de mallas de cada proceso (MB)")
+    parser.add_argument("--export-meshes", default=None, metavar="DIR",
+                        help="Exportar nodos y conectividad de cada malla única a DIR")
+    parser.add_argument("--journal", default=None, metavar="PATH",
+                        help="Diario de la ejecución para reanudarla (por defecto <output>_diario.jsonl)")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="No escribir el diario de la ejecución")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help="Intentos por archivo antes de darlo por fallido (incluye ejecuciones anteriores)")
+    parser.add_argument("--backoff", type=float, default=BACKOFF_SECONDS,
+                        help="Espera antes del primer reintento en segundos (se duplica en cada ronda)")
+    parser.add_argument("--no-validate", action="store_true",
+                        help="No pasar el dataset por el control de calidad (ver validacion_dataset.py)")
+    parser.add_argument("--datis", default=None,
+                        help="DATIS.xlsm con los límites físicos por proyecto (por defecto el del repositorio)")
+    parser.add_argument("--fixed-selection", default=None, metavar="NOMBRE",
+                        help="Selección nombrada del apoyo para la fuerza de reacción (por defecto la primera "
+                             "de FIJO, FIXED, APOYO, BASE, SOPORTE). Al cambiarla, usar --rebuild-cache")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Solapar copia, evaluación DPF y escritura (tubería con colas acotadas)")
+    parser.add_argument("--scratch", default=None, metavar="DIR",
+                        help="Carpeta local donde la tubería copia cada .rst antes de evaluarlo "
+                             "(por defecto se lee directamente del origen)")
+    parser.add_argument("--prefetch", type=int, default=2,
+                        help="Archivos que la tubería copia por delante de la evaluación")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    journal_path = None
+    if not args.no_journal:
+        journal_path = args.journal or os.path.splitext(args.output)[0] + "_diario.jsonl"
+    output = process_all_projects(args.root, args.output, workers=args.workers,
+                         timeout=args.timeout, failures_filename=args.failures,
+                         cache_path=None if args.no_cache else args.cache,
+                         rebuild_cache=args.rebuild_cache,
+                         output_format=args.format,
+                         compression=None if args.compression == "none" else args.compression,
+                         partition_by_project=args.partition,
+                         index_path=args.index, scan_workers=args.scan_workers,
+                         profile_log=args.profile, mesh_cache_mb=args.mesh_cache_mb,
+                         mesh_export_dir=args.export_meshes, journal_path=journal_path,
+                         max_attempts=args.max_attempts, backoff=args.backoff,
+                         pipeline=args.pipeline, scratch_dir=args.scratch, prefetch=args.prefetch,
+                         validate=not args.no_validate, datis_path=args.datis,
+                         fixed_selection=args.fixed_selection)
+    # Código de salida distinto de 0 si no se guardó el dataset
+    return 0 if output is not None else 1
+
 
 # Llamamos a la función principal para comenzar la ejecución
 if __name__ == "__main__":
-    process_all_projects(PROJECTS_ROOT_PATH, OUTPUT_FILE)
\ No newline at end of file
+    sys.exit(main())
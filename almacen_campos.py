@@ -0,0 +1,241 @@
+import os
+import re
+import json
+import glob
+
+import numpy as np
+
+from cache_extraccion import file_fingerprint
+from cache_mallas import MeshCache, load_mesh
+
+# ----------------------------------------------------------------------
+# ALMACÉN DE CAMPOS NODALES (MEMORY-MAPPED) PARA ENTRENAR MODELOS
+# ----------------------------------------------------------------------
+# Estructura en disco:
+#
+#   STORE_ROOT/
+#     index.json                      <- versión + un registro por proyecto
+#     mallas/<huella>/                <- una vez por malla única (ver cache_mallas.py)
+#       node_ids.npy                  (nodos,)            int32
+#       coords.npy                    (nodos, 3)          float32
+#       connectivity.npy, offsets.npy, element_ids.npy, element_types.npy
+#     <clave_proyecto>/
+#       displacement.npy              (pasos, nodos, 3)   float32
+#       stress.npy                    (pasos, nodos, 6)   float32
+#       nodal_force.npy               (pasos, nodos, 3)   float32
+#
+# Todos los cubos de un proyecto usan el orden de nodos de su malla, así que
+# el nodo i de 'coords.npy' es el nodo i de cada cubo. Los design points con la
+# misma malla comparten la carpeta de la malla. Los cubos se abren con
+# np.load(..., mmap_mode='r'): leer un paso o un nodo no copia el archivo.
+
+STORE_VERSION = 2
+DEFAULT_FIELDS = ('displacement', 'stress', 'nodal_force')
+INDEX_FILE = 'index.json'
+MESH_DIR = 'mallas'
+
+
+def project_key(rst_path):
+    """
+    Clave del proyecto en el almacén: el nombre del proyecto y, si el .rst no es
+    del design point dp0, el sufijo '__dpN'.
+    """
+    from descubrimiento import project_from_path
+
+    key = project_from_path(rst_path)
+    match = re.search(r'[\\/](dp\d+)[\\/]', rst_path)
+    if match and match.group(1) != 'dp0':
+        key = f"{key}__{match.group(1)}"
+    return key
+
+
+class FieldStore:
+    """
+    Almacén versionado de campos nodales por proyecto y paso.
+
+        store = FieldStore("almacen_campos")
+        store.add_rst(rst_path)                     # escribe los cubos de un .rst
+        disp = store.open("PROYECTO", "displacement")   # memmap (pasos, nodos, 3)
+        for key, cube in store.iter_field("stress"):   # recorre todos los proyectos
+            ...
+    """
+
+    def __init__(self, root, mesh_cache_mb=None):
+        self.root = root
+        os.makedirs(os.path.join(root, MESH_DIR), exist_ok=True)
+        self.meshes = MeshCache(export_dir=os.path.join(root, MESH_DIR),
+                                **({} if mesh_cache_mb is None else {'budget_mb': mesh_cache_mb}))
+        self.index_path = os.path.join(root, INDEX_FILE)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                self.index = json.load(f)
+            if self.index.get('version') != STORE_VERSION:
+                raise ValueError(f"El almacén '{root}' tiene versión {self.index.get('version')}; "
+                                 f"se esperaba {STORE_VERSION}. Reconstruirlo en otra carpeta.")
+        else:
+            self.index = {'version': STORE_VERSION, 'projects': {}}
+
+    def _save_index(self):
+        # Escritura atómica: el índice nunca queda a medio escribir
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def projects(self):
+        return sorted(self.index['projects'])
+
+    def entry(self, key):
+        return self.index['projects'][key]
+
+    def is_current(self, rst_path, key=None, fingerprint=None):
+        """
+        True si el proyecto ya está en el almacén y el .rst no cambió.
+        """
+        key = key or project_key(rst_path)
+        entry = self.index['projects'].get(key)
+        fingerprint = fingerprint or file_fingerprint(rst_path)
+        return entry is not None and entry['fingerprint'] == list(fingerprint)
+
+    def add_rst(self, rst_path, fields=DEFAULT_FIELDS, key=None, force=False):
+        """
+        Exporta los campos de un .rst al almacén (un cubo memory-mapped por campo).
+        La malla se exporta solo si ninguna otra entrada del almacén la tiene.
+        """
+        from ansys.dpf import core as dpf
+        from exportador_nodal import stream_nodal_result, NODAL_RESULTS
+        from soporte_tiempo import read_time_support
+
+        key = key or project_key(rst_path)
+        # La huella se lee una vez: sirve para is_current, el caché de mallas y el índice
+        fingerprint = file_fingerprint(rst_path)
+        if not force and self.is_current(rst_path, key, fingerprint):
+            print(f"  [OK] {key} ya está en el almacén")
+            return key
+
+        project_dir = os.path.join(self.root, key)
+        os.makedirs(project_dir, exist_ok=True)
+        data_source = dpf.DataSources(rst_path)
+
+        # 1. Malla (caché + exportación única): sus ids de nodo definen el orden de los cubos
+        mesh, mesh_id = self.meshes.get(data_source, rst_path, fingerprint)
+        node_ids = np.asarray(mesh.nodes.scoping.ids, dtype=np.int32)
+
+        # 2. Soporte de tiempo: sets, pasos de carga, subpasos y tiempos (una sola lectura)
+        support = read_time_support(data_source)
+        set_ids = support.scoping()
+        times = support.times_of(set_ids)
+
+        # 3. Un cubo por campo, escrito paso a paso
+        field_entries = {}
+        for field_name in fields:
+            path = os.path.join(project_dir, f'{field_name}.npy')
+            stream_nodal_result(data_source, path, result=field_name, sink='npy',
+                                set_ids=set_ids, time_values=times, mesh=mesh, node_ids=node_ids)
+            field_entries[field_name] = {
+                'file': f'{field_name}.npy',
+                'shape': [len(set_ids), len(node_ids), len(NODAL_RESULTS[field_name]['columns'])],
+                'dtype': 'float32',
+                'columns': NODAL_RESULTS[field_name]['columns'],
+            }
+
+        self.index['projects'][key] = {
+            'rst_path': rst_path,
+            'fingerprint': list(fingerprint),
+            'n_steps': len(set_ids),
+            'n_nodes': int(len(node_ids)),
+            'mesh': mesh_id,
+            'times': times.tolist(),
+            'time_support': support.to_dict(),
+            'fields': field_entries,
+        }
+        self._save_index()
+        print(f"  [OK] {key}: {len(set_ids)} pasos x {len(node_ids)} nodos -> {project_dir}")
+        return key
+
+    def remove(self, key):
+        entry = self.index['projects'].pop(key, None)
+        if entry is None:
+            return
+        # La malla queda: puede ser de otros proyectos
+        project_dir = os.path.join(self.root, key)
+        for name in [f['file'] for f in entry['fields'].values()]:
+            for path in glob.glob(os.path.join(project_dir, os.path.splitext(name)[0] + '*')):
+                os.remove(path)
+        self._save_index()
+
+    # --- Lectura (sin copias) ---
+
+    def open(self, key, field_name, mmap_mode='r'):
+        """
+        Cubo de un campo como np.memmap (pasos, nodos, componentes).
+        """
+        entry = self.entry(key)['fields'][field_name]
+        return np.load(os.path.join(self.root, key, entry['file']), mmap_mode=mmap_mode)
+
+    def mesh(self, key, mmap_mode='r'):
+        """
+        Arreglos de la malla del proyecto (ver cache_mallas.MESH_ARRAYS).
+        """
+        return load_mesh(os.path.join(self.root, MESH_DIR), self.entry(key)['mesh'], mmap_mode)
+
+    def coords(self, key, mmap_mode='r'):
+        return self.mesh(key, mmap_mode)['coords']
+
+    def node_ids(self, key, mmap_mode='r'):
+        return self.mesh(key, mmap_mode)['node_ids']
+
+    def times(self, key):
+        return np.asarray(self.entry(key)['times'])
+
+    def iter_field(self, field_name, keys=None):
+        """
+        Recorre (clave, memmap) de un campo para todos los proyectos que lo tienen.
+        """
+        for key in keys or self.projects():
+            if field_name in self.entry(key)['fields']:
+                yield key, self.open(key, field_name)
+
+    def samples(self, field_name, keys=None):
+        """
+        Lista de (clave, paso) de todo el almacén, para repartir en lotes de entrenamiento.
+        """
+        return [(key, step)
+                for key in keys or self.projects()
+                if field_name in self.entry(key)['fields']
+                for step in range(self.entry(key)['n_steps'])]
+
+
+def build_store(root_directory, store_root, fields=DEFAULT_FIELDS, force=False):
+    """
+    Agrega al almacén todos los .rst encontrados bajo root_directory
+    (misma estructura que process_all_projects). Los .rst sin cambios se saltan.
+    """
+    from descubrimiento import discover_rst_files
+
+    rst_files = discover_rst_files(root_directory, use_index=False)
+
+    store = FieldStore(store_root)
+    for rst_path in rst_files:
+        try:
+            store.add_rst(rst_path, fields=fields, force=force)
+        except Exception as e:
+            print(f"  [ERROR] {rst_path}: {e}")
+    return store
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Construye el almacén de campos nodales memory-mapped.")
+    parser.add_argument("root", help="Carpeta que contiene las carpetas de proyecto")
+    parser.add_argument("store", help="Carpeta del almacén")
+    parser.add_argument("--fields", nargs="+", default=list(DEFAULT_FIELDS),
+                        help="Campos a exportar (displacement, stress, nodal_force)")
+    parser.add_argument("--force", action="store_true", help="Reexportar aunque el .rst no haya cambiado")
+    args = parser.parse_args(argv)
+    build_store(args.root, args.store, fields=args.fields, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
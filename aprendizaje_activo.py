@@ -0,0 +1,313 @@
+import os
+import time
+
+import numpy as np
+
+from surrogado import SurrogateModel, DEFAULT_FEATURES, DEFAULT_TARGETS
+
+# ----------------------------------------------------------------------
+# APRENDIZAJE ACTIVO: QUÉ RESORTES SIMULAR DESPUÉS
+# ----------------------------------------------------------------------
+# Un ensamble de redes pequeñas (online bagging: cada miembro ve cada fila un
+# número de veces Poisson(1)) da, además de la predicción, una incertidumbre:
+# la desviación entre miembros. Con ella se ordenan los diseños de BASEDAT que
+# aún no tienen simulación FEA por ganancia de información esperada
+#
+#   IG = 1/2 log(1 + sigma^2 / sigma_ruido^2)     (por salida y por tiempo)
+#
+# y se arma una cola de simulación en la que cada diseño elegido penaliza a sus
+# vecinos (no se gastan dos simulaciones en casi el mismo resorte).
+#
+# Los resultados nuevos se incorporan con partial_fit: solo las filas que el
+# modelo no ha visto, mezcladas con una muestra acotada de filas anteriores
+# (repaso) para no olvidar lo aprendido. No se reentrena desde cero.
+#
+# El ensamble se guarda dentro de un SurrogateModel, así que surrogado.py
+# (serve, bench) y barrido_disenos.py lo usan como cualquier otro modelo.
+
+MODEL_FILE = 'aprendizaje_activo.joblib'
+QUEUE_FILE = 'cola_simulacion.csv'
+
+# Tiempos (fracción de la carga) en los que se evalúa la incertidumbre de un diseño
+QUERY_TIMES = (0.25, 0.5, 0.75, 1.0)
+
+# Varianza del ruido de una simulación, en unidades estandarizadas de la salida
+NOISE_VARIANCE = 0.01
+
+
+class OnlineBaggingEnsemble:
+    """
+    Ensamble de MLPRegressor entrenado por lotes incrementales (partial_fit).
+
+        ensemble = OnlineBaggingEnsemble(X_range=(low, high))
+        ensemble.partial_fit(X, y, keys)      # solo agrega las filas con claves nuevas
+        mean, std = ensemble.predict_dist(X)  # (n, salidas) cada uno
+
+    Las entradas se escalan con el rango fijo X_range (por ejemplo el del
+    catálogo de candidatos) y las salidas con la media y desviación del primer
+    lote; ambos quedan fijos para que los miembros no cambien de escala.
+    """
+
+    def __init__(self, X_range, n_members=8, hidden=(32, 32), replay=5000, epochs=60,
+                 batch_size=64, random_state=0):
+        low, high = (np.asarray(v, dtype=np.float64) for v in X_range)
+        self.X_low = low
+        self.X_span = np.where(high > low, high - low, 1.0)
+        self.n_members = n_members
+        self.hidden = tuple(hidden)
+        self.replay = replay
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(random_state)
+        self.members = None
+        self.y_mean = None
+        self.y_std = None
+        self.seen = set()
+        self._X = np.empty((0, len(low)))
+        self._y = None
+        self.n_updates = 0
+
+    def _scale_X(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.X_low) / self.X_span
+
+    def _new_member(self, seed):
+        from sklearn.neural_network import MLPRegressor
+
+        return MLPRegressor(hidden_layer_sizes=self.hidden, learning_rate_init=1e-3,
+                            alpha=1e-4, random_state=seed)
+
+    def partial_fit(self, X, y, keys=None):
+        """
+        Incorpora las filas nuevas (las claves ya vistas se ignoran). Devuelve
+        cuántas filas se agregaron.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        y = np.asarray(y, dtype=np.float64).reshape(len(X), -1)
+        if keys is not None:
+            new = np.array([k not in self.seen for k in keys], dtype=bool)
+            X, y = X[new], y[new]
+            self.seen.update(k for k, is_new in zip(keys, new) if is_new)
+        if not len(X):
+            return 0
+
+        if self.members is None:
+            self.y_mean = y.mean(axis=0)
+            self.y_std = np.where(y.std(axis=0) > 0, y.std(axis=0), 1.0)
+            self.members = [self._new_member(int(self.rng.integers(2 ** 31))) for _ in range(self.n_members)]
+            self._y = np.empty((0, y.shape[1]))
+
+        Xs, ys = self._scale_X(X), (y - self.y_mean) / self.y_std
+        # Repaso: una muestra acotada de lo ya visto va junto con lo nuevo
+        if len(self._X):
+            take = self.rng.choice(len(self._X), size=min(len(self._X), self.replay), replace=False)
+            Xs = np.vstack([Xs, self._scale_X(self._X[take])])
+            ys = np.vstack([ys, (self._y[take] - self.y_mean) / self.y_std])
+
+        for member in self.members:
+            # Online bagging: cada fila se repite Poisson(1) veces en este miembro
+            counts = self.rng.poisson(1.0, size=len(Xs))
+            Xm, ym = np.repeat(Xs, counts, axis=0), np.repeat(ys, counts, axis=0)
+            if not len(Xm):
+                continue
+            for _ in range(self.epochs):
+                order = self.rng.permutation(len(Xm))
+                for start in range(0, len(order), self.batch_size):
+                    batch = order[start:start + self.batch_size]
+                    member.partial_fit(Xm[batch], ym[batch])
+
+        self._X = np.vstack([self._X, X])
+        self._y = np.vstack([self._y, y])
+        self.n_updates += 1
+        return len(X)
+
+    def _member_predictions(self, X):
+        Xs = self._scale_X(X)
+        return np.stack([np.asarray(m.predict(Xs)).reshape(len(Xs), -1) for m in self.members])
+
+    def predict_dist(self, X, standardized=False):
+        """
+        Media y desviación entre miembros, (n, salidas) cada una. Con
+        standardized=True en unidades estandarizadas de cada salida.
+        """
+        predictions = self._member_predictions(X)
+        mean, std = predictions.mean(axis=0), predictions.std(axis=0)
+        if standardized:
+            return mean, std
+        return mean * self.y_std + self.y_mean, std * self.y_std
+
+    def predict(self, X):
+        return self.predict_dist(X)[0]
+
+
+# ----------------------------------------------------------------------
+# DATOS: DATASET DE EXTRACCIÓN + BASEDAT
+# ----------------------------------------------------------------------
+
+def training_table(fea_df, design_df, features=DEFAULT_FEATURES, targets=DEFAULT_TARGETS):
+    """
+    Filas de entrenamiento (dataset de extracción unido con BASEDAT) y la clave
+    de cada fila (proyecto, archivo y set), que decide qué filas son nuevas.
+    """
+    from carga_datos import join_with_fea
+
+    data = join_with_fea(fea_df, design_df).dropna(subset=list(features) + list(targets))
+    step = data['Set'] if 'Set' in data else data['Tiempo']
+    source = data['RST_Source'].astype(str) if 'RST_Source' in data else ''
+    keys = (data['Proyecto_Clave'].astype(str) + '|' + source + '|' + step.astype(str)).tolist()
+    return data, keys
+
+
+def tested_projects(fea_df):
+    from carga_datos import project_key
+
+    return {project_key(p) for p in fea_df['Proyecto'].dropna().astype(str).unique()}
+
+
+def candidate_table(design_df, fea_df, features=DEFAULT_FEATURES):
+    """
+    Diseños de BASEDAT sin simulación (ni en el dataset) con todas sus entradas.
+    """
+    design_features = [f for f in features if f != 'Tiempo']
+    tested = tested_projects(fea_df)
+    candidates = design_df[~design_df['Proyecto'].isin(tested)]
+    return candidates.dropna(subset=design_features).drop_duplicates('Proyecto').reset_index(drop=True)
+
+
+def feature_range(design_df, fea_df, features=DEFAULT_FEATURES):
+    """
+    Rango de cada entrada sobre el catálogo completo y el dataset (fija la escala).
+    """
+    low, high = [], []
+    for f in features:
+        values = [df[f].to_numpy(dtype=np.float64) for df in (design_df, fea_df) if f in df]
+        values = np.concatenate(values) if values else np.array([0.0, 1.0])
+        low.append(np.nanmin(values))
+        high.append(np.nanmax(values))
+    return np.array(low), np.array(high)
+
+
+# ----------------------------------------------------------------------
+# ACTUALIZACIÓN INCREMENTAL Y COLA DE SIMULACIÓN
+# ----------------------------------------------------------------------
+
+def update_model(fea_df, design_df, model_path=MODEL_FILE, features=DEFAULT_FEATURES,
+                 targets=DEFAULT_TARGETS, **ensemble_options):
+    """
+    Carga el modelo (o lo crea) e incorpora las filas del dataset que no ha visto.
+    """
+    data, keys = training_table(fea_df, design_df, features, targets)
+    if os.path.exists(model_path):
+        model = SurrogateModel.load(model_path, mmap_mode=None)
+        if not isinstance(model.estimator, OnlineBaggingEnsemble):
+            raise ValueError(f"'{model_path}' no es un modelo de aprendizaje activo")
+    else:
+        ensemble = OnlineBaggingEnsemble(feature_range(design_df, fea_df, features), **ensemble_options)
+        model = SurrogateModel(ensemble, features, targets, {'kind': 'online_bagging_mlp'})
+
+    start = time.perf_counter()
+    added = model.estimator.partial_fit(data[model.features].to_numpy(dtype=np.float64),
+                                        data[model.targets].to_numpy(dtype=np.float64), keys)
+    seconds = time.perf_counter() - start
+    model.metadata.update({'n_train': len(model.estimator.seen), 'n_updates': model.estimator.n_updates,
+                           'trained_at': time.strftime('%Y-%m-%d %H:%M:%S')})
+    model.metadata['feature_min'] = model.estimator.X_low.tolist()
+    model.metadata['feature_max'] = (model.estimator.X_low + model.estimator.X_span).tolist()
+    if added:
+        model.save(model_path)
+    print(f"  [OK] {added} filas nuevas incorporadas en {seconds:.1f} s "
+          f"({len(model.estimator.seen)} en total, {model.estimator.n_updates} actualizaciones)")
+    return model
+
+
+def information_gain(model, candidates, times=QUERY_TIMES, noise_variance=NOISE_VARIANCE):
+    """
+    Ganancia de información esperada de simular cada candidato (suma sobre
+    salidas, media sobre los tiempos) y la incertidumbre media por salida.
+    """
+    n = len(candidates)
+    columns = {f: candidates[f].to_numpy(dtype=np.float64) for f in model.features if f != 'Tiempo'}
+    # Todos los (candidato, tiempo) en una sola predicción
+    X = np.column_stack([np.repeat(np.asarray(times, dtype=np.float64), n) if f == 'Tiempo'
+                         else np.tile(columns[f], len(times)) for f in model.features])
+    _, std = model.estimator.predict_dist(X, standardized=True)
+    std = std.reshape(len(times), n, -1)
+    gain = 0.5 * np.log1p(std ** 2 / noise_variance).sum(axis=2).mean(axis=0)
+    return gain, std.mean(axis=0) * model.estimator.y_std
+
+
+def build_queue(model, candidates, n_queue=20, diversity=0.1, **gain_options):
+    """
+    Cola priorizada: selección voraz por ganancia de información, y después de
+    cada elección se atenúa la ganancia de los candidatos cercanos (distancia en
+    entradas escaladas, escala 'diversity').
+    """
+    gain, uncertainty = information_gain(model, candidates, **gain_options)
+    design_features = [f for f in model.features if f != 'Tiempo']
+    positions = [model.features.index(f) for f in design_features]
+    Z = ((candidates[design_features].to_numpy(dtype=np.float64) - model.estimator.X_low[positions])
+         / model.estimator.X_span[positions])
+
+    score = gain.copy()
+    order, adjusted = [], []
+    for _ in range(min(n_queue, len(candidates))):
+        best = int(np.argmax(score))
+        if not np.isfinite(score[best]) or score[best] < 0:
+            break
+        order.append(best)
+        adjusted.append(score[best])
+        distance2 = ((Z - Z[best]) ** 2).sum(axis=1)
+        score *= 1.0 - np.exp(-distance2 / (2 * diversity ** 2))
+        score[best] = -np.inf
+
+    queue = candidates.iloc[order][['Proyecto'] + [c for c in ('Codigo',) if c in candidates]
+                                   + design_features].reset_index(drop=True)
+    queue.insert(0, 'Prioridad', np.arange(1, len(order) + 1))
+    queue['Ganancia_Info'] = gain[order]
+    # Ganancia que quedaba al elegirlo (después de penalizar a los vecinos ya elegidos)
+    queue['Ganancia_Ajustada'] = adjusted
+    for i, target in enumerate(model.targets):
+        queue[f'Incertidumbre_{target}'] = uncertainty[order, i]
+    return queue
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aprendizaje activo: cola de resortes a simular.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_update = sub.add_parser("update", help="Incorporar los resultados nuevos del dataset al modelo")
+    p_queue = sub.add_parser("queue", help="Actualizar el modelo y emitir la cola de simulación")
+    for p in (p_update, p_queue):
+        p.add_argument("dataset", help="Dataset de extracción (Parquet o CSV con ';')")
+        p.add_argument("-m", "--model", default=MODEL_FILE)
+        p.add_argument("--datis", default=None, help="Ruta de DATIS.xlsm (BASEDAT)")
+        p.add_argument("--members", type=int, default=8, help="Miembros del ensamble (solo al crearlo)")
+        p.add_argument("--epochs", type=int, default=60, help="Pasadas por actualización (solo al crearlo)")
+    p_queue.add_argument("-n", type=int, default=20, help="Diseños en la cola")
+    p_queue.add_argument("--diversity", type=float, default=0.1,
+                         help="Escala de la penalización por vecinos (entradas escaladas a [0, 1])")
+    p_queue.add_argument("--noise", type=float, default=NOISE_VARIANCE,
+                         help="Varianza del ruido de una simulación (unidades estandarizadas)")
+    p_queue.add_argument("-o", "--output", default=QUEUE_FILE)
+    args = parser.parse_args(argv)
+
+    from escritores import read_dataset, write_dataset
+    from carga_datos import load_basedat, DATIS_PATH
+
+    fea_df = read_dataset(args.dataset)
+    design_df = load_basedat(args.datis or DATIS_PATH)
+    model = update_model(fea_df, design_df, args.model, n_members=args.members, epochs=args.epochs)
+    if args.command == "update":
+        return
+
+    candidates = candidate_table(design_df, fea_df, model.features)
+    print(f"Candidatos sin simular en BASEDAT: {len(candidates)}")
+    queue = build_queue(model, candidates, n_queue=args.n, diversity=args.diversity, noise_variance=args.noise)
+    path = write_dataset(queue, args.output, fmt='csv' if args.output.endswith('.csv') else 'parquet')
+    print(queue.head(10).to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+    print(f"Cola de {len(queue)} diseños guardada en '{path}'")
+
+
+if __name__ == "__main__":
+    main()
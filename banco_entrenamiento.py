@@ -0,0 +1,363 @@
+import os
+import json
+import time
+import hashlib
+import platform
+
+import numpy as np
+import pandas as pd
+
+from surrogado import DEFAULT_FEATURES, DEFAULT_TARGETS, SurrogateModel
+
+# ----------------------------------------------------------------------
+# BANCO DE ENTRENAMIENTO: VALIDACIÓN CRUZADA POR PROYECTO Y BÚSQUEDA EN PARALELO
+# ----------------------------------------------------------------------
+# 1. Matriz de entrenamiento: dataset de extracción unido con BASEDAT
+#    (aprendizaje_activo.training_table), guardada como .npz en CACHE_DIR. El
+#    nombre lleva una huella del dataset, de DATIS.xlsm y de las columnas: si
+#    nada cambió, la unión no se vuelve a hacer.
+# 2. Validación cruzada agrupada por proyecto (GroupKFold): las filas de un
+#    resorte nunca quedan a la vez en entrenamiento y en prueba, así que el
+#    puntaje mide la predicción de resortes NO simulados.
+# 3. Búsqueda de hiperparámetros: cada (familia, parámetros, pliegue) es una
+#    tarea independiente; joblib las reparte entre los núcleos.
+# 4. Rendimiento: el mejor modelo de cada familia se reentrena con todos los
+#    datos SIN otras tareas en paralelo, para medir filas/s de ajuste y de
+#    predicción y la latencia de una sola fila sin competir por la CPU.
+#
+# Cada ejecución agrega una línea por familia a RESULTS_FILE con el commit de git.
+
+RESULTS_FILE = "banco_entrenamiento.jsonl"
+MATRIX_VERSION = 1
+LATENCY_REPEATS = 20
+
+
+def _ridge_poly():
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler, PolynomialFeatures
+    from sklearn.linear_model import Ridge
+
+    return Pipeline([('escala', StandardScaler()), ('poly', PolynomialFeatures()), ('ridge', Ridge())])
+
+
+def _random_forest():
+    from sklearn.ensemble import RandomForestRegressor
+
+    return RandomForestRegressor(n_jobs=1, random_state=0)
+
+
+def _extra_trees():
+    from sklearn.ensemble import ExtraTreesRegressor
+
+    return ExtraTreesRegressor(n_jobs=1, random_state=0)
+
+
+def _gradient_boosting():
+    from sklearn.multioutput import MultiOutputRegressor
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    return MultiOutputRegressor(HistGradientBoostingRegressor(random_state=0))
+
+
+def _scaled(regressor):
+    # Entradas y salidas estandarizadas: SVR, k-NN y MLP dependen de la escala
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.compose import TransformedTargetRegressor
+
+    return TransformedTargetRegressor(Pipeline([('escala', StandardScaler()), ('modelo', regressor)]),
+                                      transformer=StandardScaler())
+
+
+def _svr():
+    from sklearn.svm import SVR
+    from sklearn.multioutput import MultiOutputRegressor
+
+    return _scaled(MultiOutputRegressor(SVR()))
+
+
+def _knn():
+    from sklearn.neighbors import KNeighborsRegressor
+
+    return _scaled(KNeighborsRegressor())
+
+
+def _mlp():
+    from sklearn.neural_network import MLPRegressor
+
+    return _scaled(MLPRegressor(max_iter=1000, early_stopping=True, random_state=0))
+
+
+# familia -> (constructor, rejilla de hiperparámetros)
+MODEL_FAMILIES = {
+    'ridge_poly': (_ridge_poly, {'poly__degree': [2, 3], 'ridge__alpha': [1e-3, 1e-1, 10.0]}),
+    'random_forest': (_random_forest, {'n_estimators': [100, 300], 'min_samples_leaf': [1, 2, 5]}),
+    'extra_trees': (_extra_trees, {'n_estimators': [100, 300], 'min_samples_leaf': [1, 2, 5]}),
+    'gradient_boosting': (_gradient_boosting, {'estimator__max_iter': [200, 500],
+                                               'estimator__learning_rate': [0.05, 0.1],
+                                               'estimator__max_leaf_nodes': [15, 31]}),
+    'svr': (_svr, {'regressor__modelo__estimator__C': [1.0, 10.0, 100.0],
+                   'regressor__modelo__estimator__epsilon': [0.01, 0.1]}),
+    'knn': (_knn, {'regressor__modelo__n_neighbors': [3, 5, 10],
+                   'regressor__modelo__weights': ['uniform', 'distance']}),
+    'mlp': (_mlp, {'regressor__modelo__hidden_layer_sizes': [(64,), (64, 64)],
+                   'regressor__modelo__alpha': [1e-4, 1e-2]}),
+}
+
+
+def make_model(family, params=None):
+    try:
+        constructor, _ = MODEL_FAMILIES[family]
+    except KeyError:
+        raise ValueError(f"Familia desconocida: '{family}'. Opciones: {sorted(MODEL_FAMILIES)}")
+    return constructor().set_params(**(params or {}))
+
+
+# ----------------------------------------------------------------------
+# MATRIZ DE ENTRENAMIENTO MEMOIZADA
+# ----------------------------------------------------------------------
+
+def _dataset_fingerprint(path):
+    """
+    Huella (ruta, tamaño, fecha) del dataset; para un Parquet particionado, de
+    todos sus archivos.
+    """
+    from cache_extraccion import file_fingerprint
+
+    if not os.path.isdir(path):
+        return [file_fingerprint(path)]
+    return sorted(file_fingerprint(os.path.join(folder, name))
+                  for folder, _, names in os.walk(path) for name in names)
+
+
+def matrix_key(dataset_path, datis_path, features, targets):
+    from carga_datos import workbook_hash
+
+    payload = json.dumps({'version': MATRIX_VERSION, 'dataset': _dataset_fingerprint(dataset_path),
+                          'datis': workbook_hash(datis_path), 'features': list(features),
+                          'targets': list(targets)}, default=list)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def build_matrix(dataset_path, datis_path=None, features=DEFAULT_FEATURES, targets=DEFAULT_TARGETS):
+    """
+    (X, y, grupos, nombres de grupo): filas del dataset unidas con su diseño.
+    El grupo de cada fila es el índice de su proyecto en 'nombres de grupo'.
+    """
+    from escritores import read_dataset
+    from carga_datos import load_basedat, DATIS_PATH
+    from aprendizaje_activo import training_table
+
+    data, _ = training_table(read_dataset(dataset_path), load_basedat(datis_path or DATIS_PATH),
+                             features, targets)
+    groups, names = pd.factorize(data['Proyecto_Clave'].astype(str), sort=True)
+    return (data[list(features)].to_numpy(dtype=np.float64), data[list(targets)].to_numpy(dtype=np.float64),
+            groups.astype(np.int32), np.asarray(names, dtype=str))
+
+
+def load_matrix(dataset_path, datis_path=None, features=DEFAULT_FEATURES, targets=DEFAULT_TARGETS,
+                refresh=False):
+    """
+    build_matrix memoizado en CACHE_DIR (matriz_<huella>.npz).
+    """
+    from carga_datos import CACHE_DIR, DATIS_PATH
+
+    datis_path = datis_path or DATIS_PATH
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"matriz_{matrix_key(dataset_path, datis_path, features, targets)}.npz")
+    if os.path.exists(path) and not refresh:
+        with np.load(path) as data:
+            print(f"  [OK] Matriz de entrenamiento desde el caché '{path}'")
+            return data['X'], data['y'], data['groups'], data['group_names']
+
+    X, y, groups, names = build_matrix(dataset_path, datis_path, features, targets)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, X=X, y=y, groups=groups, group_names=names)
+    os.replace(tmp_path, path)
+    print(f"  [OK] Matriz de entrenamiento: {X.shape[0]} filas, {len(names)} proyectos -> '{path}'")
+    return X, y, groups, names
+
+
+# ----------------------------------------------------------------------
+# BÚSQUEDA CON VALIDACIÓN CRUZADA AGRUPADA
+# ----------------------------------------------------------------------
+
+def _fit_fold(family, params, X, y, train, test):
+    """
+    Una tarea de la búsqueda: ajusta en 'train' y evalúa en 'test'.
+    """
+    from sklearn.metrics import r2_score, mean_absolute_error
+
+    model = make_model(family, params)
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    predicted = np.asarray(model.predict(X[test])).reshape(len(test), -1)
+    predict_seconds = time.perf_counter() - start
+    return {
+        'r2': r2_score(y[test], predicted, multioutput='raw_values').tolist(),
+        'mae': mean_absolute_error(y[test], predicted, multioutput='raw_values').tolist(),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+    }
+
+
+def cross_validate_search(X, y, groups, families=tuple(MODEL_FAMILIES), n_splits=5, workers=-1):
+    """
+    Evalúa cada combinación de la rejilla de cada familia con GroupKFold.
+    Devuelve un DataFrame con una fila por (familia, parámetros): R2 y MAE
+    medios por salida y su desviación entre pliegues.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import GroupKFold, ParameterGrid
+
+    n_groups = len(np.unique(groups))
+    if n_groups < 2:
+        raise ValueError(f"Se necesitan al menos 2 proyectos para validar por proyecto (hay {n_groups}).")
+    folds = list(GroupKFold(n_splits=min(n_splits, n_groups)).split(X, y, groups))
+    candidates = [(family, params) for family in families for params in ParameterGrid(MODEL_FAMILIES[family][1])]
+    print(f"--- Búsqueda: {len(candidates)} combinaciones x {len(folds)} pliegues = "
+          f"{len(candidates) * len(folds)} ajustes")
+
+    start = time.perf_counter()
+    scores = Parallel(n_jobs=workers)(delayed(_fit_fold)(family, params, X, y, train, test)
+                                      for family, params in candidates for train, test in folds)
+    print(f"    {time.perf_counter() - start:.1f} s")
+
+    rows = []
+    for i, (family, params) in enumerate(candidates):
+        fold_scores = scores[i * len(folds):(i + 1) * len(folds)]
+        r2 = np.array([s['r2'] for s in fold_scores])
+        mae = np.array([s['mae'] for s in fold_scores])
+        rows.append({
+            'Familia': family,
+            'Parametros': params,
+            'R2': float(r2.mean()),
+            'R2_Std': float(r2.mean(axis=1).std()),
+            'R2_Salidas': r2.mean(axis=0).tolist(),
+            'MAE_Salidas': mae.mean(axis=0).tolist(),
+            'Ajuste_CV_s': float(np.mean([s['fit_seconds'] for s in fold_scores])),
+        })
+    return pd.DataFrame(rows).sort_values('R2', ascending=False, ignore_index=True)
+
+
+def measure_throughput(family, params, X, y, repeats=LATENCY_REPEATS):
+    """
+    Reentrena con todos los datos (sin otras tareas en paralelo) y mide filas/s
+    de ajuste y de predicción en lote y la latencia de una sola fila.
+    """
+    model = make_model(family, params)
+    start = time.perf_counter()
+    model.fit(X, y)
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    model.predict(X)
+    batch_seconds = time.perf_counter() - start
+    single = X[:1]
+    latency = min(_timed(model.predict, single) for _ in range(repeats))
+    return model, {
+        'Ajuste_filas_s': len(X) / fit_seconds if fit_seconds > 0 else np.inf,
+        'Prediccion_filas_s': len(X) / batch_seconds if batch_seconds > 0 else np.inf,
+        'Latencia_1_fila_us': latency * 1e6,
+    }
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def run_benchmark(X, y, groups, families=tuple(MODEL_FAMILIES), n_splits=5, workers=-1,
+                  latency_budget_us=None):
+    """
+    Búsqueda + medición. Devuelve (tabla por familia con el mejor candidato,
+    tabla completa de la búsqueda, modelos reentrenados por familia).
+    """
+    search = cross_validate_search(X, y, groups, families, n_splits, workers)
+    best = search.drop_duplicates('Familia').reset_index(drop=True)
+
+    rows, models = [], {}
+    for candidate in best.itertuples(index=False):
+        model, timing = measure_throughput(candidate.Familia, candidate.Parametros, X, y)
+        models[candidate.Familia] = model
+        rows.append({**candidate._asdict(), **timing})
+    table = pd.DataFrame(rows)
+    if latency_budget_us is not None:
+        table['Cumple_Latencia'] = table['Latencia_1_fila_us'] <= latency_budget_us
+    return table, search, models
+
+
+def print_table(table, targets=DEFAULT_TARGETS):
+    view = table.copy()
+    for i, target in enumerate(targets):
+        view[f'R2_{target}'] = view['R2_Salidas'].map(lambda values: values[i])
+    columns = ['Familia', 'R2', 'R2_Std', *[f'R2_{t}' for t in targets],
+               'Ajuste_filas_s', 'Prediccion_filas_s', 'Latencia_1_fila_us']
+    if 'Cumple_Latencia' in view:
+        columns.append('Cumple_Latencia')
+    print("\n" + view[columns].to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    for row in table.itertuples(index=False):
+        print(f"  {row.Familia}: {row.Parametros}")
+
+
+def append_results(table, results_path, params):
+    import sklearn
+    from instrumentacion import git_revision
+
+    commit, dirty = git_revision()
+    run = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit, 'dirty': dirty,
+           'host': platform.node(), 'python': platform.python_version(),
+           'sklearn': sklearn.__version__, 'params': params}
+    with open(results_path, 'a', encoding='utf-8') as f:
+        for record in table.to_dict(orient='records'):
+            f.write(json.dumps({**run, **record}, ensure_ascii=False, default=str) + '\n')
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Banco de entrenamiento: validación cruzada por proyecto, "
+                                                 "búsqueda en paralelo y rendimiento por familia de modelos.")
+    parser.add_argument("dataset", help="Dataset de extracción (Parquet o CSV con ';')")
+    parser.add_argument("--datis", default=None, help="DATIS.xlsm (por defecto el del repositorio)")
+    parser.add_argument("--families", nargs="+", default=list(MODEL_FAMILIES), choices=sorted(MODEL_FAMILIES))
+    parser.add_argument("--features", nargs="+", default=DEFAULT_FEATURES)
+    parser.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS)
+    parser.add_argument("--folds", type=int, default=5, help="Pliegues de GroupKFold (por proyecto)")
+    parser.add_argument("--workers", type=int, default=-1, help="Procesos de la búsqueda (-1 = todos los núcleos)")
+    parser.add_argument("--latency-budget-us", type=float, default=None,
+                        help="Latencia máxima aceptable por diseño (microsegundos, una fila)")
+    parser.add_argument("--refresh", action="store_true", help="Reconstruir la matriz de entrenamiento")
+    parser.add_argument("--results", default=RESULTS_FILE, help="Archivo JSON-lines de resultados")
+    parser.add_argument("--save", default=None, metavar="MODELO",
+                        help="Guardar el mejor modelo (que cumpla la latencia) como modelo sustituto")
+    args = parser.parse_args(argv)
+
+    X, y, groups, _ = load_matrix(args.dataset, args.datis, args.features, args.targets, refresh=args.refresh)
+    table, _, models = run_benchmark(X, y, groups, args.families, args.folds, args.workers,
+                                     args.latency_budget_us)
+    print_table(table, args.targets)
+    append_results(table, args.results, {'dataset': args.dataset, 'features': args.features,
+                                         'targets': args.targets, 'folds': args.folds,
+                                         'n_rows': int(len(X)), 'n_projects': int(len(np.unique(groups)))})
+    print(f"Resultados agregados a '{args.results}'")
+
+    if args.save:
+        eligible = table[table['Cumple_Latencia']] if 'Cumple_Latencia' in table else table
+        if eligible.empty:
+            print("[AVISO] Ningún modelo cumple la latencia pedida; no se guardó ninguno.")
+            return
+        choice = eligible.iloc[0]
+        model = SurrogateModel(models[choice['Familia']], args.features, args.targets, {
+            'kind': choice['Familia'], 'params': {k: str(v) for k, v in choice['Parametros'].items()},
+            'cv_r2': choice['R2'], 'n_train': int(len(X)),
+            'feature_min': X.min(axis=0).tolist(), 'feature_max': X.max(axis=0).tolist(),
+            'trained_at': time.strftime('%Y-%m-%d %H:%M:%S')})
+        model.save(args.save)
+        print(f"Modelo '{choice['Familia']}' (R2 {choice['R2']:.4f}) guardado en '{args.save}'")
+
+
+if __name__ == "__main__":
+    main()
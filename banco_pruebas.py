@@ -0,0 +1,269 @@
+import os
+import io
+import json
+import time
+import shutil
+import platform
+import tempfile
+from contextlib import redirect_stdout
+
+# ----------------------------------------------------------------------
+# BANCO DE PRUEBAS DE RENDIMIENTO DE LA EXTRACCIÓN
+# ----------------------------------------------------------------------
+# Mide la extracción sin ANSYS con el backend sintético de dpf_sintetico.py
+# (campos con la misma forma que DPF, tamaño configurable). Casos:
+#
+#   extraccion  get_data_from_rst paso a paso vs en bloque
+#   escritores  write_dataset CSV vs Parquet y exportación nodal npy vs Parquet
+#   paralelo    extracción secuencial vs pool de N procesos
+#
+# Cada ejecución agrega una línea por caso a banco_resultados.jsonl con el
+# commit de git, para comparar entre versiones con --compare.
+#
+# Este script SIEMPRE usa el backend sintético: se instala al importarlo y en
+# cada proceso del pool (initializer de run_parallel_extraction).
+
+import dpf_sintetico
+
+dpf_sintetico.install()
+
+import numpy as np
+import pandas as pd
+
+import Extraccion_datos3 as extraccion
+from escritores import write_dataset, read_dataset
+from exportador_nodal import stream_nodal_result
+from instrumentacion import git_revision
+
+RESULTS_FILE = "banco_resultados.jsonl"
+CASES = ('extraccion', 'escritores', 'paralelo')
+
+
+def _timeit(function, repeat):
+    """
+    Ejecuta 'function' 'repeat' veces (sin mostrar sus mensajes) y devuelve
+    (tiempos en segundos, resultado de la última ejecución).
+    """
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = function()
+            seconds.append(time.perf_counter() - start)
+    return seconds, result
+
+
+def _record(case, variant, seconds, work, unit, **extra):
+    return {
+        'case': case,
+        'variant': variant,
+        'seconds_min': min(seconds),
+        'seconds_median': float(np.median(seconds)),
+        'repeat': len(seconds),
+        'throughput': work / min(seconds) if min(seconds) > 0 else None,
+        'unit': unit,
+        **extra,
+    }
+
+
+# ----------------------------------------------------------------------
+# CASOS
+# ----------------------------------------------------------------------
+
+def bench_extraction(rst_files, repeat=3):
+    """
+    get_data_from_rst paso a paso (un operador por subpaso) vs en bloque (una
+    evaluación por resultado). Verifica que ambos modos den los mismos valores.
+    """
+    records = []
+    frames = {}
+    for variant, batched in (('paso_a_paso', False), ('bloque', True)):
+        seconds, frames[variant] = _timeit(
+            lambda: [extraccion.get_data_from_rst(path, batched=batched) for path in rst_files], repeat)
+        rows = sum(len(df) for df in frames[variant])
+        records.append(_record('extraccion', variant, seconds, len(rst_files), 'archivos/s', rows=rows))
+
+    numeric = ['Tiempo', 'Max_Desplazamiento', 'Max_Von_Mises', 'Max_Principal', 'Total_Reaction_Force_Norm']
+    for step_df, batch_df in zip(frames['paso_a_paso'], frames['bloque']):
+        if not np.allclose(step_df[numeric].to_numpy(), batch_df[numeric].to_numpy(), equal_nan=True):
+            raise AssertionError("La extracción en bloque no coincide con la extracción paso a paso")
+    return records
+
+
+def synthetic_dataset(n_rows, n_projects=50, seed=0):
+    """
+    DataFrame con las columnas de Extraccion_datos3 (para medir escritores sin extraer).
+    """
+    rng = np.random.default_rng(seed)
+    project = rng.integers(0, n_projects, n_rows)
+    return pd.DataFrame({
+        'Proyecto': np.array([f'PROYECTO_{i:03d}' for i in range(n_projects)])[project],
+        'Tiempo': rng.uniform(0, 1, n_rows),
+        'Max_Desplazamiento': rng.uniform(0, 200, n_rows),
+        'Nodo_Max_Desplazamiento': rng.integers(1, 50000, n_rows),
+        'Max_Von_Mises': rng.uniform(0, 1500, n_rows),
+        'Nodo_Max_Von_Mises': rng.integers(1, 50000, n_rows),
+        'Max_Principal': rng.uniform(0, 1500, n_rows),
+        'Nodo_Max_Principal': rng.integers(1, 50000, n_rows),
+        'Total_Reaction_Force_Norm': rng.uniform(0, 20000, n_rows),
+        'RST_Source': np.array([f'E:\\Recoleccion\\PROYECTO_{i:03d}\\3_SIMULACION\\file.rst'
+                                for i in range(n_projects)])[project],
+    })
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(folder, name))
+                   for folder, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path)
+
+
+def bench_writers(rst_path, work_dir, n_rows=1_000_000, repeat=3):
+    """
+    write_dataset en CSV vs Parquet (escritura, lectura y tamaño) y exportación
+    nodal en streaming a cubo .npy vs Parquet para un .rst.
+    """
+    records = []
+    df = synthetic_dataset(n_rows)
+    for fmt in ('csv', 'parquet'):
+        base = os.path.join(work_dir, 'dataset')
+        seconds, path = _timeit(lambda: write_dataset(df, base, fmt=fmt), repeat)
+        read_seconds, _ = _timeit(lambda: read_dataset(path), repeat)
+        records.append(_record('escritores', fmt, seconds, n_rows, 'filas/s',
+                               bytes=_size(path), read_seconds_min=min(read_seconds)))
+
+    for sink in ('npy', 'parquet'):
+        path = os.path.join(work_dir, f'nodal.{sink}')
+        seconds, _ = _timeit(lambda: stream_nodal_result(rst_path, path, result='stress', sink=sink), repeat)
+        n_steps = dpf_sintetico.DataSources(rst_path).spec['n_steps']
+        records.append(_record('escritores', f'nodal_{sink}', seconds, n_steps, 'pasos/s',
+                               bytes=_size(path)))
+    return records
+
+
+def bench_parallel(rst_files, workers=(2, 4), repeat=1):
+    """
+    Extracción secuencial vs run_parallel_extraction con cada número de procesos.
+    El arranque del pool se incluye en el tiempo (es parte del costo real).
+    """
+    seconds, _ = _timeit(lambda: [extraccion._extract_worker(path) for path in rst_files], repeat)
+    records = [_record('paralelo', 'secuencial', seconds, len(rst_files), 'archivos/s', workers=1)]
+    for n in workers:
+        seconds, (results, failures, _) = _timeit(
+            lambda: extraccion.run_parallel_extraction(rst_files, n, initializer=dpf_sintetico.install),
+            repeat)
+        if failures:
+            raise AssertionError(f"Fallaron {len(failures)} archivos en modo paralelo: {failures[0]}")
+        records.append(_record('paralelo', f'{n}_procesos', seconds, len(rst_files), 'archivos/s',
+                               workers=n))
+    return records
+
+
+# ----------------------------------------------------------------------
+# REGISTRO Y COMPARACIÓN
+# ----------------------------------------------------------------------
+
+def append_results(records, results_path, params):
+    commit, dirty = git_revision()
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'dirty': dirty,
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'params': params,
+    }
+    with open(results_path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps({**run, **record}, ensure_ascii=False) + '\n')
+
+
+def compare(results_path, last=2):
+    """
+    Tabla de tiempos (mediana, s) por caso y variante para los últimos 'last'
+    commits medidos, con la razón entre el último y el primero de ellos.
+    Solo se comparan ejecuciones con los mismos parámetros que la más reciente.
+    """
+    with open(results_path, encoding='utf-8') as f:
+        df = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    df['params'] = df['params'].map(lambda p: json.dumps(p, sort_keys=True))
+    df = df[df['params'] == df['params'].iloc[-1]]
+    df['version'] = df['commit'].fillna('?') + np.where(df['dirty'].fillna(False), '+', '')
+
+    versions = list(dict.fromkeys(df['version']))[-last:]
+    table = (df[df['version'].isin(versions)]
+             .groupby(['case', 'variant', 'version'], sort=False)['seconds_median'].last()
+             .unstack('version')[versions])
+    if len(versions) > 1:
+        table['razon'] = table[versions[-1]] / table[versions[0]]
+    return table
+
+
+def print_records(records):
+    table = pd.DataFrame(records)[['case', 'variant', 'seconds_min', 'seconds_median', 'throughput', 'unit']]
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+
+def run(cases=CASES, n_nodes=20000, n_steps=24, n_files=8, call_overhead=0.002, workers=(2, 4),
+        n_rows=1_000_000, repeat=3, results_path=RESULTS_FILE, keep=False):
+    params = {'n_nodes': n_nodes, 'n_steps': n_steps, 'n_files': n_files,
+              'call_overhead': call_overhead, 'workers': list(workers), 'n_rows': n_rows}
+    work_dir = tempfile.mkdtemp(prefix='banco_')
+    try:
+        rst_files = dpf_sintetico.make_synthetic_tree(os.path.join(work_dir, 'proyectos'), n_projects=n_files,
+                                                      n_nodes=n_nodes, n_steps=n_steps,
+                                                      call_overhead=call_overhead)
+        records = []
+        if 'extraccion' in cases:
+            print(f"--- extraccion ({n_files} archivos, {n_nodes} nodos, {n_steps} subpasos)")
+            records += bench_extraction(rst_files, repeat)
+        if 'escritores' in cases:
+            print(f"--- escritores ({n_rows} filas)")
+            records += bench_writers(rst_files[0], work_dir, n_rows, repeat)
+        if 'paralelo' in cases:
+            print(f"--- paralelo (procesos: {list(workers)})")
+            records += bench_parallel(rst_files, workers)
+    finally:
+        if keep:
+            print(f"Archivos de prueba en: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_records(records)
+    append_results(records, results_path, params)
+    print(f"Resultados agregados a '{results_path}'")
+    return records
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Banco de pruebas de la extracción con un backend DPF sintético.")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+    parser.add_argument("--nodes", type=int, default=20000, help="Nodos por archivo sintético")
+    parser.add_argument("--steps", type=int, default=24, help="Subpasos por archivo")
+    parser.add_argument("--files", type=int, default=8, help="Número de archivos .rst sintéticos")
+    parser.add_argument("--overhead", type=float, default=0.002,
+                        help="Segundos extra por evaluación de operador (latencia de DPF)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="Procesos a probar")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Filas del dataset para los escritores")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición")
+    parser.add_argument("--results", default=RESULTS_FILE, help="Archivo JSON-lines de resultados")
+    parser.add_argument("--keep", action="store_true", help="No borrar los archivos sintéticos")
+    parser.add_argument("--compare", nargs="?", type=int, const=2, default=None, metavar="N",
+                        help="Solo comparar los últimos N commits registrados (no mide)")
+    args = parser.parse_args(argv)
+
+    if args.compare is not None:
+        print(compare(args.results, args.compare).to_string(float_format=lambda v: f"{v:.4g}"))
+        return
+
+    run(cases=args.cases, n_nodes=args.nodes, n_steps=args.steps, n_files=args.files,
+        call_overhead=args.overhead, workers=args.workers, n_rows=args.rows, repeat=args.repeat,
+        results_path=args.results, keep=args.keep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+import os
+import time
+
+import numpy as np
+
+from calculadora_resortes import calculate, DEFAULT_MATERIAL
+
+# ----------------------------------------------------------------------
+# BARRIDO DEL ESPACIO DE DISEÑO (CALCULADORA + MODELO SUSTITUTO)
+# ----------------------------------------------------------------------
+# Genera millones de geometrías de resorte (malla regular o hipercubo latino),
+# las evalúa por bloques con la calculadora analítica y, si se da, con el modelo
+# sustituto entrenado; descarta las que no cumplen las restricciones (esfuerzo,
+# altura sólida, rata, índice, pandeo) y devuelve el frente de Pareto de los
+# objetivos elegidos más un ranking de los mejores diseños factibles.
+#
+# Memoria acotada: cada bloque se genera DENTRO del proceso que lo evalúa a
+# partir de su número (no se envían diseños entre procesos) y de cada bloque
+# solo vuelven su frente de Pareto y sus mejores diseños. El frente global es
+# el frente de la unión de los frentes de los bloques (un punto dominado en su
+# bloque también lo está en el total). Como los bloques son fijos, el
+# resultado no depende del número de procesos.
+
+# Variables de diseño y rango por defecto (mm, espiras)
+DEFAULT_SPACE = {
+    'Diametro_Alambre': (8.0, 20.0),
+    'Diametro_Medio': (50.0, 180.0),
+    'Espiras_Totales': (4.0, 12.0),
+    'Longitud_Libre': (200.0, 450.0),
+}
+
+# Objetivos por defecto: peso mínimo y esfuerzo mínimo a la carga de trabajo
+DEFAULT_OBJECTIVES = ('Peso', 'Esfuerzo_Carga')
+
+DEFAULT_CHUNK = 200_000
+SURROGATE_PREFIX = 'Sur_'
+
+
+class SweepConfig:
+    """
+    Parámetros de un barrido. Las restricciones en None no se aplican.
+
+    - space: {variable: (mínimo, máximo)} con las variables de DEFAULT_SPACE
+    - method: 'grid' (levels valores por variable) o 'lhs' (n_samples diseños)
+    - objectives: columnas a minimizar; 'columna:max' para maximizar
+    - load: carga de trabajo (N) para Esfuerzo_Carga y Deflexion_Carga
+    - model_path: modelo sustituto (surrogado.py); sus salidas se agregan como
+      'Sur_<salida>' y se pueden usar en objetivos y restricciones
+    """
+
+    def __init__(self, space=None, method='lhs', n_samples=1_000_000, levels=30, seed=0,
+                 ends='TCM', material=DEFAULT_MATERIAL, load=3000.0, time_value=1.0,
+                 max_stress=None, max_solid_height=None, min_rate=None, max_rate=None,
+                 min_index=4.0, max_index=16.0, check_buckling=True, max_surrogate=None,
+                 objectives=DEFAULT_OBJECTIVES, model_path=None, chunk_size=DEFAULT_CHUNK, keep=1000):
+        self.space = dict(space or DEFAULT_SPACE)
+        unknown = set(self.space) - set(DEFAULT_SPACE)
+        if unknown:
+            raise ValueError(f"Variables desconocidas {sorted(unknown)}. Opciones: {list(DEFAULT_SPACE)}")
+        for name, default in DEFAULT_SPACE.items():
+            self.space.setdefault(name, default)
+        if method not in ('grid', 'lhs'):
+            raise ValueError(f"Método desconocido: '{method}' (grid o lhs)")
+        self.method = method
+        self.n_samples = int(n_samples)
+        self.levels = int(levels)
+        self.seed = seed
+        self.ends = ends
+        self.material = material
+        self.load = load
+        self.time_value = time_value
+        self.max_stress = max_stress
+        self.max_solid_height = max_solid_height
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.min_index = min_index
+        self.max_index = max_index
+        self.check_buckling = check_buckling
+        self.max_surrogate = dict(max_surrogate or {})
+        self.objectives = [_parse_objective(o) for o in objectives]
+        self.model_path = model_path
+        self.chunk_size = int(chunk_size)
+        self.keep = int(keep)
+
+    @property
+    def variables(self):
+        return list(DEFAULT_SPACE)
+
+    @property
+    def n_designs(self):
+        if self.method == 'grid':
+            return self.levels ** len(self.variables)
+        return self.n_samples
+
+    @property
+    def n_chunks(self):
+        return -(-self.n_designs // self.chunk_size)
+
+
+def _parse_objective(objective):
+    name, _, sense = objective.partition(':')
+    sense = sense or 'min'
+    if sense not in ('min', 'max'):
+        raise ValueError(f"Objetivo '{objective}': el sentido debe ser min o max")
+    return name, sense
+
+
+# ----------------------------------------------------------------------
+# MUESTREO POR BLOQUES
+# ----------------------------------------------------------------------
+
+def sample_chunk(config, chunk_index):
+    """
+    Diseños del bloque chunk_index como dict {variable: arreglo}.
+
+    - grid: los índices start..stop de la malla se convierten en niveles con
+      np.unravel_index, sin construir la malla completa
+    - lhs: cada bloque es un hipercubo latino propio (estratificado dentro del
+      bloque) con semilla (seed, chunk_index), así que es reproducible
+    """
+    start = chunk_index * config.chunk_size
+    stop = min(start + config.chunk_size, config.n_designs)
+    n_vars = len(config.variables)
+
+    if config.method == 'grid':
+        levels = np.unravel_index(np.arange(start, stop), (config.levels,) * n_vars)
+        unit = [level / max(config.levels - 1, 1) for level in levels]
+    else:
+        n = stop - start
+        rng = np.random.default_rng([config.seed, chunk_index])
+        unit = [(rng.permutation(n) + rng.random(n)) / n for _ in range(n_vars)]
+
+    return {name: low + u * (high - low)
+            for name, u, (low, high) in zip(config.variables, unit,
+                                            (config.space[v] for v in config.variables))}
+
+
+# ----------------------------------------------------------------------
+# EVALUACIÓN, RESTRICCIONES Y FRENTE DE PARETO
+# ----------------------------------------------------------------------
+
+def evaluate_designs(config, designs, model=None):
+    """
+    Columnas de la calculadora (y del modelo sustituto) para un bloque de diseños.
+    """
+    d = designs['Diametro_Alambre']
+    D = designs['Diametro_Medio']
+    columns = dict(designs)
+    columns.update(calculate(d, D, designs['Espiras_Totales'], designs['Longitud_Libre'],
+                             ends=config.ends, material=config.material, load=config.load))
+
+    if model is not None:
+        available = dict(columns, Tiempo=np.full(len(d), config.time_value))
+        available.update({'Calc_' + k: v for k, v in columns.items()})
+        missing = [f for f in model.features if f not in available]
+        if missing:
+            raise KeyError(f"El modelo sustituto necesita {missing}, que el barrido no genera")
+        X = np.column_stack([np.broadcast_to(available[f], len(d)) for f in model.features])
+        predictions = model.predict(X)
+        for i, target in enumerate(model.targets):
+            columns[SURROGATE_PREFIX + target] = predictions[:, i]
+    return columns
+
+
+def constraint_masks(config, columns):
+    """
+    Dict {restricción: máscara de diseños que la cumplen}.
+    """
+    masks = {}
+    C = columns['Indice_Resorte']
+    if config.min_index is not None:
+        masks['Indice_Min'] = C >= config.min_index
+    if config.max_index is not None:
+        masks['Indice_Max'] = C <= config.max_index
+    # Geometría posible: espiras activas y recorrido hasta sólido positivos
+    masks['Geometria'] = (columns['Espiras_Activas'] > 0) & (columns['Deflexion_Solida'] > 0)
+    if config.load is not None:
+        # La carga de trabajo no debe llevar el resorte a sólido
+        masks['Carga_Antes_Solido'] = columns['Deflexion_Carga'] < columns['Deflexion_Solida']
+        if config.max_stress is not None:
+            masks['Esfuerzo'] = columns['Esfuerzo_Carga'] <= config.max_stress
+        if config.check_buckling:
+            masks['Pandeo'] = columns['Deflexion_Carga'] < columns['Deflexion_Pandeo']
+    if config.max_solid_height is not None:
+        masks['Altura_Solida'] = columns['Altura_Solida'] <= config.max_solid_height
+    if config.min_rate is not None:
+        masks['Rata_Min'] = columns['Rata'] >= config.min_rate
+    if config.max_rate is not None:
+        masks['Rata_Max'] = columns['Rata'] <= config.max_rate
+    for target, limit in config.max_surrogate.items():
+        name = SURROGATE_PREFIX + target
+        if name not in columns:
+            raise KeyError(f"Restricción sobre '{target}' sin modelo sustituto que lo prediga")
+        masks[name] = columns[name] <= limit
+    # Objetivos sin valor (NaN); inf es válido (p. ej. Deflexion_Pandeo de un resorte estable)
+    masks['Objetivos_Definidos'] = ~np.any(np.isnan(objective_matrix(config, columns)), axis=1)
+    return masks
+
+
+def objective_matrix(config, columns):
+    """
+    Matriz (diseños, objetivos) a minimizar (los objetivos 'max' cambian de signo).
+    """
+    missing = [name for name, _ in config.objectives if name not in columns]
+    if missing:
+        raise KeyError(f"Objetivos desconocidos {missing}. Columnas: {sorted(columns)}")
+    return np.column_stack([columns[name] if sense == 'min' else -columns[name]
+                            for name, sense in config.objectives])
+
+
+def pareto_mask(F):
+    """
+    Máscara de los puntos no dominados de F (n, k), todos los objetivos a minimizar.
+    Con dos objetivos usa un orden y un mínimo acumulado (n log n); con más,
+    descarta por bloques los dominados por cada punto del frente.
+    """
+    F = np.asarray(F, dtype=np.float64)
+    n = len(F)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    if F.shape[1] == 1:
+        mask = np.zeros(n, dtype=bool)
+        mask[np.argmin(F[:, 0])] = True
+        return mask
+    if F.shape[1] == 2:
+        order = np.lexsort((F[:, 1], F[:, 0]))
+        second = F[order, 1]
+        best_before = np.minimum.accumulate(np.concatenate([[np.inf], second[:-1]]))
+        mask = np.zeros(n, dtype=bool)
+        mask[order[second < best_before]] = True
+        return mask
+
+    candidates = np.arange(n)
+    front = []
+    while candidates.size:
+        # El mínimo de la suma no lo domina nadie: es del frente
+        best = candidates[np.argmin(F[candidates].sum(axis=1))]
+        front.append(best)
+        rest = F[candidates]
+        dominated = np.all(F[best] <= rest, axis=1)
+        candidates = candidates[~dominated]
+    mask = np.zeros(n, dtype=bool)
+    mask[front] = True
+    return mask
+
+
+def _select(columns, index):
+    return {name: np.broadcast_to(values, len(columns['Rata']))[index] for name, values in columns.items()}
+
+
+def _concat(parts):
+    parts = [p for p in parts if p]
+    if not parts:
+        return {}
+    return {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+
+
+def _best(config, columns, keep):
+    """
+    Los 'keep' diseños con mejor primer objetivo (sin ordenar todo el bloque).
+    """
+    if not columns or keep <= 0:
+        return {}
+    score = objective_matrix(config, columns)[:, 0]
+    if len(score) > keep:
+        index = np.argpartition(score, keep - 1)[:keep]
+        columns = _select(columns, index)
+    return columns
+
+
+# ----------------------------------------------------------------------
+# EJECUCIÓN POR BLOQUES (SECUENCIAL O EN POOL DE PROCESOS)
+# ----------------------------------------------------------------------
+
+_WORKER = {}
+
+
+def _init_worker(config):
+    """
+    Se ejecuta una vez por proceso: guarda la configuración y carga el modelo
+    (joblib con mmap: los procesos comparten las páginas del archivo).
+    """
+    _WORKER['config'] = config
+    _WORKER['model'] = None
+    if config.model_path is not None:
+        from surrogado import SurrogateModel
+        _WORKER['model'] = SurrogateModel.load(config.model_path)
+
+
+def _run_chunk(chunk_index):
+    """
+    Evalúa un bloque y devuelve (índice, n diseños, factibles, rechazos por
+    restricción, frente del bloque, mejores del bloque).
+    """
+    config, model = _WORKER['config'], _WORKER['model']
+    columns = evaluate_designs(config, sample_chunk(config, chunk_index), model)
+    masks = constraint_masks(config, columns)
+    feasible = np.logical_and.reduce(list(masks.values()))
+    rejected = {name: int((~mask).sum()) for name, mask in masks.items()}
+
+    columns = _select(columns, feasible)
+    n_feasible = int(feasible.sum())
+    front = _select(columns, pareto_mask(objective_matrix(config, columns))) if n_feasible else {}
+    return chunk_index, len(feasible), n_feasible, rejected, front, _best(config, columns, config.keep)
+
+
+def run_sweep(config, workers=1, progress_every=10):
+    """
+    Ejecuta el barrido. Devuelve (frente, ranking, resumen): el frente y el
+    ranking como DataFrames ordenados por el primer objetivo.
+
+    Con workers > 1 los bloques se reparten en un pool de procesos con a lo sumo
+    2 x workers bloques en vuelo, así que la memoria no crece con el número de
+    diseños.
+    """
+    import pandas as pd
+
+    start = time.perf_counter()
+    fronts, best = [], {}
+    summary = {'Disenos': 0, 'Factibles': 0, 'Rechazos': {}}
+
+    def collect(result):
+        nonlocal best
+        chunk_index, n, n_feasible, rejected, front, chunk_best = result
+        summary['Disenos'] += n
+        summary['Factibles'] += n_feasible
+        for name, count in rejected.items():
+            summary['Rechazos'][name] = summary['Rechazos'].get(name, 0) + count
+        fronts.append((chunk_index, front))
+        # Frente y ranking se reducen al vuelo: solo se guarda lo no dominado
+        if len(fronts) >= 64:
+            merged = _concat([f for _, f in sorted(fronts, key=lambda x: x[0])])
+            fronts[:] = [(-1, _select(merged, pareto_mask(objective_matrix(config, merged))))]
+        best = _best(config, _concat([best, chunk_best]), config.keep)
+        done = len(done_chunks) + 1
+        done_chunks.add(chunk_index)
+        if progress_every and done % progress_every == 0:
+            rate = summary['Disenos'] / (time.perf_counter() - start)
+            print(f"  -> {done}/{config.n_chunks} bloques | {summary['Disenos']:,} diseños "
+                  f"({rate:,.0f}/s) | factibles {summary['Factibles']:,}")
+
+    done_chunks = set()
+    if workers > 1 and config.n_chunks > 1:
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(config,)) as pool:
+            pending = set()
+            next_chunk = 0
+            while next_chunk < config.n_chunks or pending:
+                while next_chunk < config.n_chunks and len(pending) < 2 * workers:
+                    pending.add(pool.submit(_run_chunk, next_chunk))
+                    next_chunk += 1
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+    else:
+        _init_worker(config)
+        for chunk_index in range(config.n_chunks):
+            collect(_run_chunk(chunk_index))
+
+    merged = _concat([f for _, f in sorted(fronts, key=lambda x: x[0])])
+    front = _select(merged, pareto_mask(objective_matrix(config, merged))) if merged else {}
+    summary['Frente'] = len(front.get('Rata', []))
+    summary['Segundos'] = time.perf_counter() - start
+
+    first = config.objectives[0][0]
+    ascending = config.objectives[0][1] == 'min'
+    front_df = pd.DataFrame(front).sort_values(first, ascending=ascending, ignore_index=True) if front else pd.DataFrame()
+    ranking_df = pd.DataFrame(best).sort_values(first, ascending=ascending, ignore_index=True) if best else pd.DataFrame()
+    return front_df, ranking_df, summary
+
+
+def print_summary(config, summary):
+    print("\n" + "=" * 50)
+    print(f"Barrido {config.method}: {summary['Disenos']:,} diseños en {summary['Segundos']:.1f} s "
+          f"({summary['Disenos'] / max(summary['Segundos'], 1e-9):,.0f} diseños/s)")
+    print(f"Factibles: {summary['Factibles']:,} | Frente de Pareto: {summary['Frente']} diseños "
+          f"({', '.join(f'{n}:{s}' for n, s in config.objectives)})")
+    for name, count in sorted(summary['Rechazos'].items(), key=lambda x: -x[1]):
+        if count:
+            print(f"  Rechazados por {name}: {count:,}")
+    print("=" * 50)
+
+
+def main(argv=None):
+    import argparse
+    from escritores import write_dataset
+
+    parser = argparse.ArgumentParser(description="Barrido del espacio de diseño con la calculadora y el modelo sustituto.")
+    parser.add_argument("--method", default="lhs", choices=["lhs", "grid"])
+    parser.add_argument("-n", "--samples", type=int, default=1_000_000, help="Diseños del hipercubo latino")
+    parser.add_argument("--levels", type=int, default=30, help="Niveles por variable de la malla")
+    parser.add_argument("--var", nargs=3, action="append", default=[], metavar=("NOMBRE", "MIN", "MAX"),
+                        help=f"Rango de una variable ({', '.join(DEFAULT_SPACE)})")
+    parser.add_argument("--ends", default="TCM", help="Tipo de extremos (BASEDAT)")
+    parser.add_argument("--material", default=DEFAULT_MATERIAL)
+    parser.add_argument("--load", type=float, default=3000.0, help="Carga de trabajo (N)")
+    parser.add_argument("--time", type=float, default=1.0, help="Tiempo de entrada del modelo sustituto")
+    parser.add_argument("--max-stress", type=float, default=None, help="Esfuerzo cortante máximo a la carga (MPa)")
+    parser.add_argument("--max-solid-height", type=float, default=None, help="Altura sólida máxima (mm)")
+    parser.add_argument("--min-rate", type=float, default=None, help="Rata mínima (N/mm)")
+    parser.add_argument("--max-rate", type=float, default=None, help="Rata máxima (N/mm)")
+    parser.add_argument("--max-surrogate", nargs=2, action="append", default=[], metavar=("SALIDA", "MAX"),
+                        help="Límite sobre una salida del modelo sustituto (p. ej. Max_Von_Mises 1100)")
+    parser.add_argument("--no-buckling", action="store_true", help="No verificar pandeo")
+    parser.add_argument("--objectives", nargs="+", default=list(DEFAULT_OBJECTIVES),
+                        help="Columnas a minimizar ('columna:max' para maximizar)")
+    parser.add_argument("-m", "--model", default=None, help="Modelo sustituto (surrogado.joblib)")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="Diseños por bloque")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos")
+    parser.add_argument("--keep", type=int, default=1000, help="Diseños factibles en el ranking")
+    parser.add_argument("-o", "--output", default="frente_pareto.parquet")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = SweepConfig(
+        space={name: (float(low), float(high)) for name, low, high in args.var},
+        method=args.method, n_samples=args.samples, levels=args.levels, seed=args.seed,
+        ends=args.ends, material=args.material, load=args.load, time_value=args.time,
+        max_stress=args.max_stress, max_solid_height=args.max_solid_height,
+        min_rate=args.min_rate, max_rate=args.max_rate, check_buckling=not args.no_buckling,
+        max_surrogate={name: float(limit) for name, limit in args.max_surrogate},
+        objectives=args.objectives, model_path=args.model, chunk_size=args.chunk, keep=args.keep)
+
+    print(f"Barrido {config.method}: {config.n_designs:,} diseños en {config.n_chunks} bloques "
+          f"de {config.chunk_size:,} ({args.workers} procesos)")
+    front, ranking, summary = run_sweep(config, workers=args.workers)
+    print_summary(config, summary)
+    if len(front):
+        path = write_dataset(front, args.output)
+        print(f"Frente de Pareto guardado en '{path}'")
+    if len(ranking):
+        base, ext = os.path.splitext(args.output)
+        path = write_dataset(ranking, f"{base}_ranking{ext}")
+        print(f"Ranking de los {len(ranking)} mejores diseños guardado en '{path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import os
+import io
+import json
+import time
+import sqlite3
+import hashlib
+
+# ----------------------------------------------------------------------
+# CACHÉ INCREMENTAL DE EXTRACCIÓN (SQLite)
+# ----------------------------------------------------------------------
+# Cada archivo .rst se identifica por su ruta, tamaño, fecha de modificación y
+# una huella barata del contenido (hash de los primeros y últimos bloques).
+# Si la huella no cambia, se reutilizan las filas guardadas y el archivo no se
+# vuelve a abrir con DPF.
+#
+# Las filas se guardan como Parquet (sin pérdida: mismos tipos y mismos bits
+# en los flotantes), así que un dataset armado desde el caché es idéntico al de
+# una extracción directa. Cada put() es una transacción: sirve de punto de
+# control para reanudar una ejecución interrumpida (ver diario_extraccion.py).
+
+# Subir este número cuando cambie la forma de las filas extraídas
+# (columnas nuevas, otra reducción, etc.) para invalidar todo el caché.
+CACHE_VERSION = 6
+
+# Bytes leídos al inicio y al final del archivo para la huella de contenido
+FINGERPRINT_BLOCK = 1024 * 1024
+
+
+def file_fingerprint(path, block_size=FINGERPRINT_BLOCK):
+    """
+    Devuelve (tamaño, mtime_ns, hash) de un archivo. El hash cubre solo el primer
+    y el último bloque más el tamaño, así que es barato incluso para .rst de varios GB.
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(stat.st_size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(block_size))
+        if stat.st_size > 2 * block_size:
+            f.seek(-block_size, os.SEEK_END)
+            digest.update(f.read(block_size))
+    return stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+
+
+def encode_rows(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def decode_rows(blob):
+    import pandas as pd
+
+    return pd.read_parquet(io.BytesIO(blob))
+
+
+class ExtractionCache:
+    """
+    Caché persistente de filas extraídas por archivo .rst.
+
+    Uso típico:
+        cache = ExtractionCache("cache_extraccion.sqlite")
+        df = cache.get(rst_path)        # None si falta o cambió
+        cache.put(rst_path, df)
+        cache.prune(rutas_actuales, root_directory)
+    """
+
+    def __init__(self, db_path, rebuild=False):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self.removed = 0
+        self._pending_fingerprints = {}
+
+        self.conn = sqlite3.connect(db_path)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(archivos)")]
+        if columns and 'rows_blob' not in columns:
+            # Caché de una versión anterior (filas en JSON): se descarta
+            print(f"  [AVISO] El caché '{db_path}' tiene un formato anterior; se vacía.")
+            self.conn.execute("DROP TABLE archivos")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS archivos (
+                rst_path    TEXT PRIMARY KEY,
+                size        INTEGER NOT NULL,
+                mtime_ns    INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                version     INTEGER NOT NULL,
+                n_rows      INTEGER NOT NULL,
+                extracted_at REAL NOT NULL,
+                rows_blob   BLOB NOT NULL
+            )""")
+        if rebuild:
+            self.clear()
+        self.conn.commit()
+
+    def clear(self):
+        self.conn.execute("DELETE FROM archivos")
+        self.conn.commit()
+
+    def get(self, rst_path):
+        """
+        Devuelve el DataFrame guardado si la huella del archivo coincide;
+        en caso contrario None (y cuenta un fallo de caché).
+        """
+        try:
+            fingerprint = file_fingerprint(rst_path)
+        except OSError:
+            self.misses += 1
+            return None
+        self._pending_fingerprints[rst_path] = fingerprint
+
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, fingerprint, version, rows_blob FROM archivos WHERE rst_path = ?",
+            (rst_path,)).fetchone()
+        if row is None or tuple(row[:3]) != fingerprint or row[3] != CACHE_VERSION:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return decode_rows(row[4])
+
+    def fingerprint(self, rst_path):
+        """
+        Huella calculada en get() para un archivo aún no confirmado, o None.
+        Sirve para no volver a leer el archivo (ver cache_mallas.MeshCache).
+        """
+        return self._pending_fingerprints.get(rst_path)
+
+    def rows(self, rst_path):
+        """
+        Filas guardadas de un archivo sin verificar la huella (por ejemplo las
+        recién confirmadas con put()), o None si no están.
+        """
+        row = self.conn.execute("SELECT rows_blob FROM archivos WHERE rst_path = ? AND version = ?",
+                                (rst_path, CACHE_VERSION)).fetchone()
+        return None if row is None else decode_rows(row[0])
+
+    def put(self, rst_path, df):
+        """
+        Guarda las filas extraídas de un archivo (una transacción: o quedan todas
+        o ninguna). Usa la huella calculada en get() si existe, para no volver a
+        leer el archivo.
+        """
+        fingerprint = self._pending_fingerprints.pop(rst_path, None) or file_fingerprint(rst_path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (rst_path, *fingerprint, CACHE_VERSION, len(df), time.time(),
+             encode_rows(df)))
+        self.conn.commit()
+
+    def prune(self, current_paths, root_directory=None):
+        """
+        Elimina del caché los archivos que ya no existen. Si se da root_directory,
+        solo se eliminan entradas bajo esa carpeta (el caché puede compartirse
+        entre varias raíces).
+        """
+        current = set(current_paths)
+        stale = []
+        for (path,) in self.conn.execute("SELECT rst_path FROM archivos"):
+            if path in current:
+                continue
+            if root_directory is not None and not path.startswith(os.path.join(root_directory, '')):
+                continue
+            stale.append((path,))
+        self.conn.executemany("DELETE FROM archivos WHERE rst_path = ?", stale)
+        self.conn.commit()
+        self.removed += len(stale)
+        return len(stale)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'removed': self.removed}
+
+    def summary(self):
+        (n_files,) = self.conn.execute("SELECT COUNT(*) FROM archivos").fetchone()
+        return (f"Caché '{self.db_path}': aciertos={self.hits}, fallos={self.misses}, "
+                f"eliminados={self.removed}, archivos guardados={n_files}")
+
+    def close(self):
+        self.conn.close()
+
+
+def describe_cache(db_path):
+    """
+    Resumen rápido del contenido del caché sin abrir DPF (para la línea de comandos).
+    """
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT rst_path, n_rows, version, extracted_at FROM archivos ORDER BY rst_path").fetchall()
+    conn.close()
+    return [{'RST_Source': path, 'Filas': n, 'Version': v,
+             'Extraido': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))}
+            for path, n, v, t in rows]
+
+
+def export_cache(db_path, output_filename, root_directory=None, **write_options):
+    """
+    Reexporta al dataset todas las filas guardadas en el caché (versión actual),
+    en el mismo orden de rutas que process_all_projects. No abre DPF ni lee los
+    .rst, así que funciona aunque el disco de resultados no esté conectado.
+    Devuelve la ruta escrita (o None si el caché está vacío).
+    """
+    import pandas as pd
+    from escritores import write_dataset
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT rst_path, rows_blob FROM archivos WHERE version = ? ORDER BY rst_path",
+                        (CACHE_VERSION,)).fetchall()
+    conn.close()
+    if root_directory is not None:
+        rows = [row for row in rows if row[0].startswith(os.path.join(root_directory, ''))]
+    if not rows:
+        print(f"El caché '{db_path}' no tiene filas para exportar.")
+        return None
+
+    frames = [decode_rows(blob) for _, blob in rows]
+    path = write_dataset(pd.concat(frames, ignore_index=True), output_filename, **write_options)
+    print(f"{len(rows)} archivos del caché exportados a '{path}'")
+    return path
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Consulta o reexporta el caché de extracción (sin DPF).")
+    parser.add_argument("cache", nargs="?", default="cache_extraccion.sqlite", help="Archivo SQLite del caché")
+    parser.add_argument("--export", default=None, metavar="SALIDA",
+                        help="Escribir el dataset con las filas del caché en lugar de listarlo")
+    parser.add_argument("--root", default=None, help="Solo los .rst bajo esta carpeta")
+    parser.add_argument("--format", default="parquet", help="Formato de salida (parquet o csv)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.cache):
+        print(f"[ERROR] No existe el caché '{args.cache}'")
+        return
+    if args.export is not None:
+        export_cache(args.cache, args.export, root_directory=args.root, fmt=args.format)
+        return
+    for entry in describe_cache(args.cache):
+        print(json.dumps(entry, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from cache_extraccion import file_fingerprint
+
+# ----------------------------------------------------------------------
+# CACHÉ DE MALLAS (REUTILIZACIÓN ENTRE OPERADORES Y ENTRE ARCHIVOS)
+# ----------------------------------------------------------------------
+# Los design points de un proyecto (dp0, dp1, ...) suelen tener la misma malla.
+# Cada malla leída se identifica por una huella de su contenido (ids de nodos,
+# coordenadas y conectividad) y se guarda en un caché LRU limitado por memoria:
+#
+#   - dentro de un archivo, la malla se lee UNA vez y se pasa explícitamente
+#     (mesh=...) a todos los operadores de resultados, que así no la vuelven a
+#     resolver desde el .rst
+#   - entre archivos del mismo proceso, un .rst ya visto (misma ruta, tamaño y
+#     fecha) no vuelve a ejecutar mesh_provider, y los archivos con la misma
+#     malla comparten un único objeto
+#   - con export_dir, los arreglos compactos de cada malla única se escriben una
+#     sola vez:
+#
+#       export_dir/
+#         indice.jsonl                   <- una línea {rst_path, mesh} por archivo
+#         <huella>/
+#           node_ids.npy       (nodos,)           int32
+#           coords.npy         (nodos, 3)         float32
+#           element_ids.npy    (elementos,)       int32
+#           element_types.npy  (elementos,)       int32
+#           connectivity.npy   (conexiones,)      int32   índices de nodo (base 0)
+#           offsets.npy        (elementos + 1,)   int64   inicio de cada elemento
+#
+# La huella de una malla nueva exige leerla una vez; lo que se ahorra es la
+# lectura repetida en los operadores, la memoria duplicada y la exportación.
+
+MESH_CACHE_MB = 512
+MESH_INDEX_FILE = 'indice.jsonl'
+MESH_ARRAYS = ('node_ids', 'coords', 'element_ids', 'element_types', 'connectivity', 'offsets')
+
+
+def _connectivity(elements):
+    """
+    Conectividad en formato CSR (índices de nodo planos + inicio de cada elemento).
+    """
+    field = elements.connectivities_field
+    flat = np.asarray(field.data, dtype=np.int32).ravel()
+    pointer = getattr(field, '_data_pointer', None)
+    if pointer is not None:
+        offsets = np.append(np.asarray(pointer, dtype=np.int64), flat.size)
+    else:
+        # Sin puntero de datos: una consulta por elemento (lento, solo como respaldo)
+        counts = [np.atleast_1d(field.get_entity_data(i)).size for i in range(len(elements.scoping.ids))]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return flat, offsets
+
+
+def mesh_arrays(mesh):
+    """
+    Arreglos compactos de una malla DPF (ver MESH_ARRAYS).
+    """
+    elements = mesh.elements
+    connectivity, offsets = _connectivity(elements)
+    try:
+        element_types = np.asarray(elements.element_types_field.data, dtype=np.int32)
+    except Exception:
+        element_types = np.full(len(offsets) - 1, -1, dtype=np.int32)
+    return {
+        'node_ids': np.asarray(mesh.nodes.scoping.ids, dtype=np.int32),
+        'coords': np.asarray(mesh.nodes.coordinates_field.data, dtype=np.float32).reshape(-1, 3),
+        'element_ids': np.asarray(elements.scoping.ids, dtype=np.int32),
+        'element_types': element_types,
+        'connectivity': connectivity,
+        'offsets': offsets,
+    }
+
+
+def mesh_fingerprint(arrays):
+    """
+    Huella de 16 caracteres del contenido de la malla.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for name in ('node_ids', 'coords', 'connectivity', 'offsets'):
+        digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+    return digest.hexdigest()
+
+
+def _arrays_nbytes(arrays):
+    return sum(a.nbytes for a in arrays.values())
+
+
+class MeshCache:
+    """
+    Caché LRU de mallas DPF por huella de contenido, limitado por memoria.
+
+        meshes = MeshCache(budget_mb=512, export_dir="mallas")
+        mesh, mesh_id = meshes.get(data_source, rst_path)
+        op = ops.result.displacement(data_sources=data_source, mesh=mesh, ...)
+
+    Los archivos se reconocen por cache_extraccion.file_fingerprint, que lee
+    hasta 2 MB del .rst. Quien ya la calculó (el caché de extracción, o antes de
+    cached() + get()) la pasa en fingerprint para no volver a leer el archivo,
+    que puede estar en el NAS.
+
+    El tamaño de cada malla se estima con sus arreglos compactos; la copia que
+    DPF tiene internamente es de un orden parecido.
+    """
+
+    def __init__(self, budget_mb=MESH_CACHE_MB, export_dir=None):
+        self.budget_bytes = int(budget_mb * 2 ** 20)
+        self.export_dir = export_dir
+        self._meshes = OrderedDict()       # huella -> (malla, n_bytes)
+        self._by_file = {}                 # (ruta, tamaño, fecha) -> huella
+        self._exported = set()             # (carpeta, huella)
+        self._indexed = set()              # (carpeta, ruta, huella)
+        self.nbytes = 0
+        self.hits = self.shared = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._meshes)
+
+    def __contains__(self, rst_path):
+        return self.cached(rst_path)
+
+    def cached(self, rst_path, fingerprint=None):
+        """
+        True si la malla del .rst está en el caché (get no leería el archivo).
+        """
+        return self._by_file.get(fingerprint or file_fingerprint(rst_path)) in self._meshes
+
+    def get(self, data_source, rst_path, fingerprint=None):
+        """
+        (malla, huella) del .rst. Solo ejecuta mesh_provider si el archivo no
+        se ha visto o su malla fue desalojada. fingerprint: file_fingerprint
+        del archivo, si ya se calculó.
+        """
+        file_key = fingerprint or file_fingerprint(rst_path)
+        mesh_id = self._by_file.get(file_key)
+        if mesh_id in self._meshes:
+            self._meshes.move_to_end(mesh_id)
+            self.hits += 1
+            mesh = self._meshes[mesh_id][0]
+            self.export(mesh_id, mesh, rst_path)
+            return mesh, mesh_id
+
+        from ansys.dpf.core import operators as ops
+
+        mesh = ops.mesh.mesh_provider(data_sources=data_source).outputs.mesh()
+        arrays = mesh_arrays(mesh)
+        mesh_id = mesh_fingerprint(arrays)
+        self._by_file[file_key] = mesh_id
+        self.export(mesh_id, mesh, rst_path, arrays)
+
+        if mesh_id in self._meshes:
+            # Otro archivo con la misma malla: se comparte el objeto ya guardado
+            self._meshes.move_to_end(mesh_id)
+            self.shared += 1
+            return self._meshes[mesh_id][0], mesh_id
+
+        self.misses += 1
+        size = _arrays_nbytes(arrays)
+        self._meshes[mesh_id] = (mesh, size)
+        self.nbytes += size
+        self._evict()
+        return mesh, mesh_id
+
+    def _evict(self):
+        # La malla recién agregada nunca se desaloja, aunque sola supere el presupuesto
+        while self.nbytes > self.budget_bytes and len(self._meshes) > 1:
+            _, (_, size) = self._meshes.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+
+    def export(self, mesh_id, mesh, rst_path, arrays=None):
+        """
+        Escribe los arreglos de la malla en export_dir (si no existen) y agrega el
+        archivo al índice. No hace nada sin export_dir o si ya se registró.
+        """
+        if self.export_dir is None or (self.export_dir, rst_path, mesh_id) in self._indexed:
+            return
+        mesh_dir = os.path.join(self.export_dir, mesh_id)
+        if (self.export_dir, mesh_id) not in self._exported and not os.path.isdir(mesh_dir):
+            arrays = arrays if arrays is not None else mesh_arrays(mesh)
+            # Se escribe en una carpeta temporal y se renombra: otro proceso que
+            # exporte la misma malla a la vez no deja una carpeta a medias
+            tmp_dir = f"{mesh_dir}.tmp{os.getpid()}"
+            os.makedirs(tmp_dir, exist_ok=True)
+            for name in MESH_ARRAYS:
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), arrays[name])
+            try:
+                os.rename(tmp_dir, mesh_dir)
+            except OSError:
+                import shutil
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        self._exported.add((self.export_dir, mesh_id))
+
+        # Líneas cortas en modo 'a': los procesos del pool pueden agregar a la vez
+        with open(os.path.join(self.export_dir, MESH_INDEX_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'rst_path': rst_path, 'mesh': mesh_id}, ensure_ascii=False) + '\n')
+        self._indexed.add((self.export_dir, rst_path, mesh_id))
+
+    def clear(self):
+        self._meshes.clear()
+        self.nbytes = 0
+
+    def summary(self):
+        return (f"Caché de mallas: {len(self._meshes)} mallas ({self.nbytes / 2 ** 20:.1f} MB) | "
+                f"aciertos {self.hits} | compartidas {self.shared} | leídas {self.misses} | "
+                f"desalojadas {self.evictions}")
+
+
+# ----------------------------------------------------------------------
+# CACHÉ DEL PROCESO (COMPARTIDO POR TODOS LOS ARCHIVOS DE UN WORKER)
+# ----------------------------------------------------------------------
+
+_SHARED = None
+
+
+def shared_cache(budget_mb=None, export_dir=None):
+    """
+    Caché de mallas del proceso. Los argumentos, si se dan, ajustan el caché
+    existente (el contenido se conserva).
+    """
+    global _SHARED
+    if _SHARED is None:
+        _SHARED = MeshCache(MESH_CACHE_MB if budget_mb is None else budget_mb, export_dir)
+    else:
+        if budget_mb is not None:
+            _SHARED.budget_bytes = int(budget_mb * 2 ** 20)
+            _SHARED._evict()
+        if export_dir is not None:
+            _SHARED.export_dir = export_dir
+    if _SHARED.export_dir is not None:
+        os.makedirs(_SHARED.export_dir, exist_ok=True)
+    return _SHARED
+
+
+# ----------------------------------------------------------------------
+# LECTURA DE LAS MALLAS EXPORTADAS
+# ----------------------------------------------------------------------
+
+def read_mesh_index(export_dir):
+    """
+    Dict rst_path -> huella de malla (la última línea de cada archivo manda).
+    """
+    path = os.path.join(export_dir, MESH_INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return {entry['rst_path']: entry['mesh'] for entry in entries}
+
+
+def load_mesh(export_dir, mesh_id, mmap_mode='r'):
+    """
+    Arreglos de una malla exportada (memory-mapped por defecto).
+    """
+    mesh_dir = os.path.join(export_dir, mesh_id)
+    return {name: np.load(os.path.join(mesh_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in MESH_ARRAYS}
+
+
+def element_nodes(arrays, element_index):
+    """
+    Índices de nodo (base 0) del elemento en la posición element_index.
+    """
+    offsets = arrays['offsets']
+    return arrays['connectivity'][offsets[element_index]:offsets[element_index + 1]]
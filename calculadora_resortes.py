@@ -0,0 +1,222 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# CALCULADORA ANALÍTICA DE RESORTES HELICOIDALES (VECTORIZADA)
+# ----------------------------------------------------------------------
+# Fórmulas clásicas de las hojas BASEDAT, CALC y ESFUERZO de DATIS.xlsm
+# llevadas a NumPy: cada función recibe arreglos (o escalares) y evalúa todos
+# los diseños a la vez. Unidades: mm, N, MPa.
+#
+#   C   = D / d                                    índice del resorte
+#   Kw  = (4C - 1)/(4C - 4) + 0.615 / C            factor de Wahl
+#   k   = G d^4 / (8 D^3 Na)                       rata (N/mm)
+#   tau = 8 D P Kw / (pi d^3)                      esfuerzo cortante corregido
+#   Na  = Nt - espiras inactivas(extremos)         tabla BASEDAT!A4:F5
+#   Hs  = 1.01 d (Nt + ajuste extremos)            altura sólida (BASEDAT!AO)
+
+# Espiras inactivas según el tipo de extremo (BASEDAT!A4:F5)
+INACTIVE_COILS = {
+    'CM': 1.5,
+    'R': 2.0,
+    'RCM': 1.75,
+    'RT': 1.67,
+    'T': 1.33,
+    'TCM': 1.42,
+}
+END_TYPES = list(INACTIVE_COILS)
+
+# Propiedades de material (MPa, kg/mm^3). G de DATIS: 8091.83 kg/mm^2 = 79353 MPa
+MATERIALS = {
+    'ACERO': {'G': 79353.0, 'E': 206000.0, 'densidad': 7.85e-6},
+    'SAE9254': {'G': 79300.0, 'E': 206000.0, 'densidad': 7.85e-6},
+    'SAE5160': {'G': 78600.0, 'E': 203000.0, 'densidad': 7.85e-6},
+    'INOX302': {'G': 69000.0, 'E': 193000.0, 'densidad': 7.92e-6},
+}
+DEFAULT_MATERIAL = 'ACERO'
+
+GRAVITY = 9.80665
+
+
+def _lookup(values, table, default=None):
+    """
+    Traduce un arreglo de claves (texto) a valores numéricos con una tabla, sin
+    bucles por diseño: se buscan solo las claves únicas.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'fiu':
+        return values
+    keys, inverse = np.unique(values.astype(str), return_inverse=True)
+    mapped = np.array([table.get(k.strip().upper(), default) for k in keys], dtype=object)
+    if any(v is None for v in mapped):
+        missing = [k for k, v in zip(keys, mapped) if v is None]
+        raise KeyError(f"Claves desconocidas: {missing}. Opciones: {sorted(table)}")
+    return mapped.astype(np.float64)[inverse].reshape(values.shape)
+
+
+def material_properties(material):
+    """
+    G, E y densidad para un arreglo de nombres de material (o un solo nombre).
+    """
+    material = np.asarray(material, dtype=str)
+    return tuple(_lookup(material, {k: v[prop] for k, v in MATERIALS.items()})
+                 for prop in ('G', 'E', 'densidad'))
+
+
+def spring_index(d, D):
+    return np.asarray(D, dtype=np.float64) / d
+
+
+def wahl_factor(C):
+    C = np.asarray(C, dtype=np.float64)
+    return (4 * C - 1) / (4 * C - 4) + 0.615 / C
+
+
+def active_coils(total_coils, ends):
+    return np.asarray(total_coils, dtype=np.float64) - _lookup(ends, INACTIVE_COILS)
+
+
+def spring_rate(d, D, Na, G=MATERIALS[DEFAULT_MATERIAL]['G']):
+    """
+    Rata del resorte en N/mm.
+    """
+    d = np.asarray(d, dtype=np.float64)
+    return G * d ** 4 / (8 * np.asarray(D, dtype=np.float64) ** 3 * Na)
+
+
+def shear_stress(d, D, load, corrected=True):
+    """
+    Esfuerzo cortante en MPa para una carga en N (corregido con Wahl por defecto).
+    """
+    d = np.asarray(d, dtype=np.float64)
+    tau = 8 * np.asarray(D, dtype=np.float64) * load / (np.pi * d ** 3)
+    return tau * wahl_factor(spring_index(d, D)) if corrected else tau
+
+
+def solid_height(d, total_coils, ends, roll_thickness=0.0):
+    """
+    Altura sólida en mm con la regla de BASEDAT!AO (1.01 d por espira y ajuste
+    según el tipo de extremo y el espesor de la punta rolada).
+    """
+    d = np.asarray(d, dtype=np.float64)
+    Nt = np.asarray(total_coils, dtype=np.float64)
+    ends = np.char.upper(np.char.strip(np.asarray(ends, dtype=str)))
+    roll = np.broadcast_to(np.asarray(roll_thickness, dtype=np.float64), np.broadcast(d, Nt, ends).shape)
+
+    with_roll = np.where(ends == 'R', 1.01 * d * (Nt - 1) + 2 * roll,
+                np.where(ends == 'RT', 1.01 * d * Nt + roll,
+                         1.01 * d * (Nt - 1) + roll))
+    without_roll = np.where(ends == 'T', 1.01 * d * (Nt + 1),
+                   np.where(ends == 'CM', 1.01 * d * (Nt - 1.25),
+                            1.01 * d * Nt))
+    return np.where(roll > 0, with_roll, without_roll)
+
+
+def buckling_deflection(free_length, D, E, G, alpha=0.5):
+    """
+    Deflexión crítica de pandeo (mm) según el criterio clásico de Wahl.
+    alpha es el factor de apoyo: 0.5 entre placas paralelas, 0.7 un extremo
+    articulado, 1.0 ambos articulados. Devuelve inf cuando el resorte es estable
+    para cualquier deflexión.
+    """
+    L0 = np.asarray(free_length, dtype=np.float64)
+    slenderness = alpha * L0 / np.asarray(D, dtype=np.float64)
+    C1 = E / (2 * (E - G))
+    C2 = 2 * np.pi ** 2 * (E - G) / (2 * G + E)
+    radicand = 1 - C2 / slenderness ** 2
+    with np.errstate(invalid='ignore'):
+        critical = L0 * C1 * (1 - np.sqrt(radicand))
+    return np.where(radicand > 0, critical, np.inf)
+
+
+def spring_weight(d, D, total_coils, density=MATERIALS[DEFAULT_MATERIAL]['densidad']):
+    """
+    Peso en kg (BASEDAT!AI y AJ: longitud de alambre pi D Nt por el área de la barra).
+    """
+    d = np.asarray(d, dtype=np.float64)
+    wire_length = np.pi * np.asarray(D, dtype=np.float64) * total_coils
+    return density * np.pi * (d / 2) ** 2 * wire_length
+
+
+def calculate(d, D, total_coils, free_length, ends='TCM', material=DEFAULT_MATERIAL,
+              load=None, roll_thickness=0.0, alpha=0.5):
+    """
+    Evalúa la calculadora completa para todos los diseños. Todas las entradas
+    se combinan con broadcasting de NumPy. Devuelve un dict de arreglos:
+
+    - Indice_Resorte, Factor_Wahl, Espiras_Activas, Rata (N/mm)
+    - Altura_Solida, Deflexion_Solida, Carga_Solida, Esfuerzo_Solido
+    - Deflexion_Pandeo, Peso
+    - con 'load' (N): Deflexion_Carga, Esfuerzo_Carga
+    """
+    G, E, density = material_properties(material)
+    d = np.asarray(d, dtype=np.float64)
+    D = np.asarray(D, dtype=np.float64)
+    Nt = np.asarray(total_coils, dtype=np.float64)
+    L0 = np.asarray(free_length, dtype=np.float64)
+
+    C = spring_index(d, D)
+    Kw = wahl_factor(C)
+    Na = active_coils(Nt, ends)
+    rate = spring_rate(d, D, Na, G)
+    Hs = solid_height(d, Nt, ends, roll_thickness)
+    solid_deflection = L0 - Hs
+    solid_load = rate * solid_deflection
+
+    result = {
+        'Indice_Resorte': C,
+        'Factor_Wahl': Kw,
+        'Espiras_Activas': Na,
+        'Rata': rate,
+        'Altura_Solida': Hs,
+        'Deflexion_Solida': solid_deflection,
+        'Carga_Solida': solid_load,
+        'Esfuerzo_Solido': 8 * D * solid_load * Kw / (np.pi * d ** 3),
+        'Deflexion_Pandeo': buckling_deflection(L0, D, E, G, alpha),
+        'Peso': spring_weight(d, D, Nt, density),
+    }
+    if load is not None:
+        load = np.asarray(load, dtype=np.float64)
+        result['Deflexion_Carga'] = load / rate
+        result['Esfuerzo_Carga'] = 8 * D * load * Kw / (np.pi * d ** 3)
+    return result
+
+
+def add_features(df, d='Diametro_Alambre', D='Diametro_Medio', total_coils='Espiras_Totales',
+                 free_length='Longitud_Libre', ends='Tipo_Extremos', material=None, load=None,
+                 prefix='Calc_'):
+    """
+    Agrega a un DataFrame las columnas de la calculadora (con prefijo 'Calc_'),
+    para usarlas como variables del modelo o como base física del sustituto.
+    """
+    result = calculate(
+        df[d].to_numpy(), df[D].to_numpy(), df[total_coils].to_numpy(), df[free_length].to_numpy(),
+        ends=df[ends].to_numpy() if ends in df else 'TCM',
+        material=df[material].to_numpy() if material and material in df else DEFAULT_MATERIAL,
+        load=df[load].to_numpy() if load and load in df else None,
+    )
+    features = pd.DataFrame({prefix + k: np.broadcast_to(v, len(df)) for k, v in result.items()},
+                            index=df.index)
+    return pd.concat([df, features], axis=1)
+
+
+if __name__ == "__main__":
+    # Prueba rápida de velocidad con diseños aleatorios
+    n = 2_000_000
+    rng = np.random.default_rng(0)
+    d = rng.uniform(8, 20, n)
+    D = d * rng.uniform(5, 12, n)
+    Nt = rng.uniform(4, 12, n)
+    L0 = rng.uniform(200, 450, n)
+    ends = rng.choice(END_TYPES, n)
+
+    start = time.perf_counter()
+    result = calculate(d, D, Nt, L0, ends=ends, load=3000.0)
+    seconds = time.perf_counter() - start
+    print(f"{n} diseños en {seconds:.3f} s ({n / seconds:,.0f} diseños/s)")
+
+    # Verificación contra la fila 8 de BASEDAT (d=12, De=73.23, Nt=14.83, extremos TCM)
+    check = calculate(12.0, 73.23 - 12.0, 14.83, 304.0, ends='TCM')
+    print(f"Rata BASEDAT fila 8: {float(check['Rata']) / GRAVITY:.4f} kg/mm (DATIS: 6.8133)")
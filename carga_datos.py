@@ -0,0 +1,401 @@
+import os
+import re
+import hashlib
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from escritores import write_dataset
+
+# ----------------------------------------------------------------------
+# CARGA DE LOS LIBROS DE DISEÑO (DATIS.xlsm Y DataSet.xlsx) CON CACHÉ
+# ----------------------------------------------------------------------
+# Los libros se leen una sola vez con openpyxl en modo read_only (lectura por
+# filas, sin cargar estilos ni fórmulas) y el resultado se guarda como Parquet
+# tipado en CACHE_DIR. El nombre del archivo en caché incluye el hash del libro:
+# si el libro cambia, el caché se invalida solo.
+
+# Rutas relativas a la carpeta del repositorio (no al directorio actual), para
+# que los comandos funcionen desde cualquier carpeta
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DATIS_PATH = os.path.join(REPO_DIR, "2_Formulacion_del_problema_de_machine_learning", "DATIS.xlsm")
+DATASET_PATH = os.path.join(REPO_DIR, "3_Dataset_FEA_de_resortes_IMAL", "DataSet.xlsx")
+CACHE_DIR = os.path.join(REPO_DIR, ".cache_datos")
+
+# Rango con nombre DATOS (se usa si el libro no trae la definición)
+DATOS_RANGE = ("BASEDAT", "A10:BI298")
+
+GRAVITY = 9.80665
+
+# Columnas de BASEDAT (por letra, porque hay encabezados repetidos como
+# 'Deflexion' o 'Cant.') -> (nombre normalizado, factor a unidades mm/N/MPa)
+BASEDAT_COLUMNS = {
+    'A': ('Codigo', None),
+    'B': ('Marca_Referencia', None),
+    'C': ('Modelo', None),
+    'D': ('Anio', None),
+    'E': ('Posicion', None),
+    'F': ('Muestra', None),
+    'K': ('Diametro_Alambre', 1.0),
+    'L': ('Espiras_Totales', 1.0),
+    'M': ('Diametro_Externo', 1.0),
+    'N': ('Diametro_Interno', 1.0),
+    'S': ('Longitud_Libre', 1.0),
+    'AE': ('Tipo_Extremos', None),
+    'AF': ('Espesor_Punta_Roll', 1.0),
+    'AH': ('Esfuerzo_Preasentamiento', GRAVITY),   # kg/mm^2 -> MPa
+    'AJ': ('Peso', 1.0),                           # kg
+    'AK': ('Espiras_Activas', 1.0),
+    'AL': ('Diametro_Medio', 1.0),
+    'AN': ('Rata', GRAVITY),                       # kg/mm -> N/mm
+    'AO': ('Altura_Solida', 1.0),
+    'AQ': ('Carga_Preasentamiento', GRAVITY),      # kg -> N
+    'AS': ('Indice_Resorte', 1.0),
+    'AT': ('Factor_Wahl', 1.0),
+    'AU': ('Altura_Prueba', 1.0),
+    'AW': ('Carga_Prueba', GRAVITY),               # kg -> N
+    'AX': ('Esfuerzo_Prueba', GRAVITY),            # kg/mm^2 -> MPa
+    'BE': ('Carga_Maxima', 1.0),                   # N
+    'BF': ('Esfuerzo_Maximo', 1.0),                # MPa
+    'BG': ('Observaciones', None),
+}
+
+# Hojas de historias FEA en DataSet.xlsx: encabezado -> (nombre, factor)
+FEA_HISTORY_COLUMNS = {
+    'Tiempo': ('Tiempo', 1.0),
+    'Desplazamiento [m]': ('Desplazamiento', 1000.0),       # m -> mm
+    'Fuerza x [N]': ('Fuerza_X', 1.0),
+    'Fuerza y [N]': ('Fuerza_Y', 1.0),
+    'Fuerza z [N]': ('Fuerza_Z', 1.0),
+    'Fuerza resultante [N]': ('Fuerza_Resultante', 1.0),
+    'Esfuerzo minimo [Pa]': ('Esfuerzo_Minimo', 1e-6),      # Pa -> MPa
+    'Esfuerzo máximo [Pa]': ('Esfuerzo_Maximo', 1e-6),
+}
+
+
+def normalize_name(text):
+    """
+    Texto -> identificador en mayúsculas sin tildes ni símbolos
+    ('Daihatsu Terios 2006-2018 TRAS' -> 'DAIHATSU_TERIOS_2006_2018_TRAS').
+    """
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^0-9A-Z]+', '_', text.upper()).strip('_')
+
+
+def project_key(name):
+    """
+    Clave de unión por proyecto: nombre normalizado y con la posición abreviada
+    igual que en las carpetas de simulación (TRASERO/TRAS -> TRA, DELANTERO -> DEL).
+    """
+    key = normalize_name(name)
+    key = re.sub(r'_(TRASERO|TRASERA|TRAS)$', '_TRA', key)
+    return re.sub(r'_(DELANTERO|DELANTERA)$', '_DEL', key)
+
+
+def workbook_hash(path):
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cached(path, name, loader, refresh=False):
+    """
+    Devuelve loader(path) desde el caché Parquet si el libro no cambió.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    cache_file = os.path.join(CACHE_DIR, f"{name}_{workbook_hash(path)}.parquet")
+    if os.path.exists(cache_file) and not refresh:
+        return pd.read_parquet(cache_file)
+
+    df = loader(path)
+    # Se borran los cachés anteriores del mismo libro
+    for old in os.listdir(CACHE_DIR):
+        if old.startswith(name + '_') and old.endswith('.parquet'):
+            os.remove(os.path.join(CACHE_DIR, old))
+    write_dataset(df, cache_file, fmt='parquet')
+    print(f"  [OK] '{path}' -> caché '{cache_file}' ({len(df)} filas)")
+    # Se devuelve lo leído del caché: mismos tipos (esquema de escritores.py)
+    # con el caché frío y con el caliente
+    return pd.read_parquet(cache_file)
+
+
+def _iter_range(path, sheet, cell_range):
+    """
+    Filas de un rango como tuplas de valores, leyendo el libro en modo streaming.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True, keep_vba=False)
+    try:
+        yield from wb[sheet].iter_rows(*_range_bounds(cell_range), values_only=True)
+    finally:
+        wb.close()
+
+
+def _range_bounds(cell_range):
+    from openpyxl.utils import range_boundaries
+
+    min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+    return min_row, max_row, min_col, max_col
+
+
+def _defined_range(path, name, default):
+    """
+    (hoja, rango) de un nombre definido del libro, o 'default' si no existe.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, keep_vba=False)
+    try:
+        defined = wb.defined_names.get(name)
+        if defined is None:
+            return default
+        sheet, cell_range = next(iter(defined.destinations))
+        return sheet, cell_range.replace('$', '')
+    except Exception:
+        return default
+    finally:
+        wb.close()
+
+
+def _text(value):
+    """
+    Valor de celda como texto ('2008.0' -> '2008'); None si la celda está vacía.
+    """
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def _numeric(series, factor):
+    values = pd.to_numeric(series, errors='coerce')
+    return (values * factor).astype(np.float64) if factor != 1.0 else values.astype(np.float64)
+
+
+# ----------------------------------------------------------------------
+# DATIS.xlsm -> BASEDAT
+# ----------------------------------------------------------------------
+
+def read_basedat(path=DATIS_PATH):
+    """
+    Lee el rango DATOS de BASEDAT y devuelve una tabla con nombres normalizados
+    y unidades en mm, N y MPa. Se descartan las filas sin diámetro de barra.
+    """
+    from openpyxl.utils import column_index_from_string, range_boundaries
+
+    sheet, cell_range = _defined_range(path, 'DATOS', DATOS_RANGE)
+    first_col = range_boundaries(cell_range)[0]
+    positions = {letter: column_index_from_string(letter) - first_col for letter in BASEDAT_COLUMNS}
+
+    rows = list(_iter_range(path, sheet, cell_range))
+    raw = pd.DataFrame({BASEDAT_COLUMNS[letter][0]: [row[i] if i < len(row) else None for row in rows]
+                        for letter, i in positions.items()})
+
+    df = pd.DataFrame(index=raw.index)
+    for letter, (column, factor) in BASEDAT_COLUMNS.items():
+        if factor is None:
+            df[column] = raw[column].map(_text).astype('string')
+        else:
+            df[column] = _numeric(raw[column], factor)
+
+    df = df[df['Diametro_Alambre'] > 0].reset_index(drop=True)
+    df['Tipo_Extremos'] = df['Tipo_Extremos'].str.upper()
+    df['Proyecto'] = [project_key(' '.join(str(p) for p in parts if pd.notna(p) and str(p)))
+                      for parts in zip(df['Marca_Referencia'], df['Modelo'], df['Anio'], df['Posicion'])]
+    return df
+
+
+def load_basedat(path=DATIS_PATH, refresh=False):
+    return _cached(path, 'basedat', read_basedat, refresh=refresh)
+
+
+# ----------------------------------------------------------------------
+# DataSet.xlsx -> estado de proyectos e historias FEA
+# ----------------------------------------------------------------------
+
+def read_project_status(path=DATASET_PATH, sheet='Recolección'):
+    """
+    Hoja de seguimiento: una fila por proyecto y una columna 0/1 por etapa
+    (encabezado de dos filas combinado como 'RECOLECCION_INFORMACION__ESCANEO').
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = list(wb[sheet].iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+    groups, names = rows[0], rows[1]
+    header, columns, current_group = [], [], ''
+    for i, (group, name) in enumerate(zip(groups, names)):
+        # Celdas vacías al final del encabezado (formato sin datos): se descartan
+        if i >= 2 and not _text(group) and not _text(name):
+            continue
+        current_group = normalize_name(group) if group else current_group
+        if i < 2:
+            header.append('Proyecto' if i == 0 else 'Linea')
+        else:
+            header.append(f"{current_group}__{normalize_name(name)}" if name else current_group)
+        columns.append(i)
+    duplicated = sorted({name for name in header if header.count(name) > 1})
+    if duplicated:
+        raise ValueError(f"Encabezados repetidos en la hoja '{sheet}': {duplicated}")
+
+    width = max(columns) + 1
+    df = pd.DataFrame([[(tuple(r) + (None,) * width)[i] for i in columns] for r in rows[2:] if r and r[0]],
+                      columns=header)
+    df['Nombre'] = df['Proyecto'].astype(str).str.strip()
+    df['Proyecto'] = df['Nombre'].map(project_key)
+    for column in header[2:]:
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int8')
+    df['Linea'] = df['Linea'].astype('string')
+    return df
+
+
+def read_fea_histories(path=DATASET_PATH, sheets=('CKD', 'IMAL')):
+    """
+    Historias FEA (tiempo, desplazamiento, fuerzas y esfuerzos) de cada hoja en
+    formato largo, en mm, N y MPa. El proyecto es el título en A1 de la hoja.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    frames = []
+    try:
+        for sheet in sheets:
+            rows = list(wb[sheet].iter_rows(values_only=True))
+            title, header = rows[0][0], [str(h).strip() if h else '' for h in rows[1]]
+            width = len(header)
+            data = pd.DataFrame([(tuple(r) + (None,) * width)[:width] for r in rows[2:]
+                                 if r and r[0] is not None], columns=header)
+            df = pd.DataFrame({new: _numeric(data[old], factor)
+                               for old, (new, factor) in FEA_HISTORY_COLUMNS.items() if old in data})
+            df.insert(0, 'Fuente', sheet)
+            df.insert(0, 'Proyecto', project_key(title))
+            frames.append(df)
+    finally:
+        wb.close()
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_project_status(path=DATASET_PATH, refresh=False):
+    return _cached(path, 'estado_proyectos', read_project_status, refresh=refresh)
+
+
+def load_fea_histories(path=DATASET_PATH, refresh=False):
+    return _cached(path, 'historias_fea', read_fea_histories, refresh=refresh)
+
+
+# ----------------------------------------------------------------------
+# UNIÓN CON LA SALIDA DE LA EXTRACCIÓN FEA
+# ----------------------------------------------------------------------
+
+def design_index(design_df, verbose=True):
+    """
+    Tabla de diseño indexada por clave de proyecto, sin claves repetidas.
+
+    Varias filas de BASEDAT pueden dar la misma clave (mismo vehículo y posición
+    con otro alambre, variantes a gas, nombres incompletos). Esas filas se
+    indexan por la clave de su 'Codigo' cuando es única; las que siguen
+    ambiguas se dejan fuera (con aviso) en lugar de quedarse con la primera.
+    Devuelve (tabla, claves ambiguas sin resolver).
+    """
+    keys = design_df['Proyecto'].astype(str)
+    repeated = keys.duplicated(keep=False).to_numpy()
+    unique = design_df[~repeated].assign(Proyecto=keys[~repeated])
+
+    resolved = design_df[repeated]
+    if 'Codigo' in resolved:
+        codes = resolved['Codigo'].astype(str).map(project_key)
+        usable = (~codes.duplicated(keep=False) & ~codes.isin(unique['Proyecto']) & (codes != '')).to_numpy()
+    else:
+        codes, usable = None, np.zeros(len(resolved), dtype=bool)
+    left_out = keys[repeated][~usable]
+    resolved = resolved[usable].assign(Proyecto=codes[usable]) if usable.any() else resolved.iloc[:0]
+
+    ambiguous = sorted(set(left_out))
+    if ambiguous and verbose:
+        print(f"  [AVISO] {len(left_out)} filas de diseño comparten {len(ambiguous)} claves de proyecto "
+              f"y no se resolvieron por 'Codigo'; se omiten: {ambiguous[:10]}")
+    design = pd.concat([unique, resolved], ignore_index=True)
+    return design.set_index(design['Proyecto'].astype(str)).drop(columns='Proyecto'), ambiguous
+
+
+def join_with_fea(fea_df, design_df=None, how='left'):
+    """
+    Une el dataset de extracción (columna 'Proyecto') con la tabla de diseño
+    (BASEDAT por defecto) usando la clave normalizada de proyecto (ver
+    design_index). Informa cuántos proyectos FEA quedaron sin diseño asociado.
+    """
+    if design_df is None:
+        design_df = load_basedat()
+    design, _ = design_index(design_df)
+
+    fea = fea_df.copy()
+    fea['Proyecto_Clave'] = fea['Proyecto'].astype(str).map(project_key)
+    joined = fea.join(design, on='Proyecto_Clave', how=how, rsuffix='_Diseno')
+
+    missing = sorted(set(fea['Proyecto_Clave']) - set(design.index))
+    if missing:
+        print(f"  [AVISO] {len(missing)} proyectos FEA sin diseño en la tabla: {missing[:10]}")
+    return joined
+
+
+def check_workbooks(datis_path=DATIS_PATH, dataset_path=DATASET_PATH):
+    """
+    Lee los libros del repositorio SIN caché y revisa lo que usan los demás
+    módulos: columnas únicas, filas leídas y columnas esperadas. Devuelve la
+    lista de problemas (vacía si todo está bien).
+    """
+    checks = [
+        ('BASEDAT', read_basedat, datis_path, [name for name, _ in BASEDAT_COLUMNS.values()] + ['Proyecto']),
+        ('Recolección', read_project_status, dataset_path, ['Proyecto', 'Linea', 'Nombre']),
+        ('Historias FEA', read_fea_histories, dataset_path, ['Proyecto', 'Fuente', 'Tiempo']),
+    ]
+    problems = []
+    for name, reader, path, expected in checks:
+        try:
+            df = reader(path)
+        except Exception as e:
+            problems.append(f"{name}: {type(e).__name__}: {e}")
+            continue
+        missing = [column for column in expected if column not in df]
+        if not df.columns.is_unique:
+            problems.append(f"{name}: columnas repetidas {sorted(df.columns[df.columns.duplicated()])}")
+        if missing:
+            problems.append(f"{name}: faltan las columnas {missing}")
+        if df.empty:
+            problems.append(f"{name}: no se leyó ninguna fila")
+        if not missing and df.columns.is_unique and not df.empty:
+            print(f"  [OK] {name}: {len(df)} filas x {df.shape[1]} columnas")
+    for problem in problems:
+        print(f"  [ERROR] {problem}")
+    return problems
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Carga y cachea DATIS.xlsm y DataSet.xlsx.")
+    parser.add_argument("--refresh", action="store_true", help="Ignorar el caché y releer los libros")
+    parser.add_argument("--check", action="store_true",
+                        help="Solo revisar que los libros del repositorio se leen bien (sin caché)")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return 1 if check_workbooks() else 0
+    basedat = load_basedat(refresh=args.refresh)
+    status = load_project_status(refresh=args.refresh)
+    histories = load_fea_histories(refresh=args.refresh)
+    print(f"BASEDAT: {len(basedat)} diseños | Proyectos: {len(status)} | Historias FEA: {len(histories)} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+import os
+import json
+
+import numpy as np
+
+# ----------------------------------------------------------------------
+# COMPRESIÓN DE CAMPOS NODALES PARA DISTRIBUIR EL DATASET
+# ----------------------------------------------------------------------
+# Un cubo del almacén de campos (ver almacen_campos.py) ocupa pasos x nodos x
+# componentes x 4 bytes: demasiado para compartir un resorte completo. Este
+# módulo arma un paquete reducido a partir del almacén, en tres etapas:
+#
+# 1. Muestreo sobre el resorte (opcional): cada nodo recibe coordenadas propias
+#    de la hélice (ángulo de espira desenrollado y posición alrededor del
+#    alambre) y se toma el nodo más cercano a una rejilla fija de puntos:
+#    n_espira posiciones a lo largo del alambre x n_alambre posiciones en su
+#    sección (0 = fibra exterior, pi = fibra interior). Con el tiempo remuestreado
+#    a n_pasos, todos los resortes dan vectores de la misma longitud.
+# 2. Cuantización con cota de error: 'float16' (error relativo ~5e-4) o
+#    'cuantizado': enteros con un paso por componente tal que
+#    |x - x_reconstruido| <= error_bound (absoluto, o relativo al máximo |x|).
+# 3. Codificación delta entre pasos consecutivos (solo 'cuantizado'): se guardan
+#    las diferencias de los enteros, que son pequeñas y se comprimen mucho
+#    mejor. Es exacta sobre los enteros, así que no acumula error.
+#
+# Estructura del paquete:
+#
+#   DESTINO/
+#     index.json               <- versión, parámetros y un registro por proyecto
+#     muestras/<huella>_<n_espira>x<n_alambre>_<eje>.npz
+#                              <- nodos muestreados de cada malla única
+#     <clave_proyecto>.npz     <- un arreglo por campo (+ máscara de NaN si hay)
+
+PACKAGE_VERSION = 1
+INDEX_FILE = 'index.json'
+SAMPLES_DIR = 'muestras'
+MODES = ('float32', 'float16', 'cuantizado')
+FLOAT16_MAX = float(np.finfo(np.float16).max)
+ANGLE_BINS_PER_TURN = 72
+
+
+# ----------------------------------------------------------------------
+# CUANTIZACIÓN Y CODIFICACIÓN DELTA
+# ----------------------------------------------------------------------
+
+def _int_dtype(low, high):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def encode_field(cube, mode='cuantizado', error_bound=1e-3, relative=True, delta=True):
+    """
+    Codifica un cubo (pasos, puntos, componentes). Devuelve (arreglos, metadatos):
+    arreglos {'data': ..., 'nan': máscara empaquetada (si hay NaN)} y metadatos
+    con lo necesario para decode_field y el error máximo medido.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modo desconocido: '{mode}'. Opciones: {MODES}")
+    if delta and mode != 'cuantizado':
+        raise ValueError("La codificación delta solo se aplica al modo 'cuantizado'.")
+
+    values = np.asarray(cube, dtype=np.float64)
+    nan_mask = np.isnan(values)
+    meta = {'mode': mode, 'shape': list(values.shape), 'delta': bool(delta)}
+    arrays = {}
+    if nan_mask.any():
+        arrays['nan'] = np.packbits(nan_mask.ravel())
+
+    if mode == 'float32':
+        arrays['data'] = values.astype(np.float32)
+    elif mode == 'float16':
+        peak = np.nanmax(np.abs(values)) if values.size and not nan_mask.all() else 0.0
+        if peak > FLOAT16_MAX:
+            raise ValueError(f"Valores hasta {peak:.4g} no caben en float16 (máx {FLOAT16_MAX:.0f}); "
+                             f"usar el modo 'cuantizado'.")
+        arrays['data'] = values.astype(np.float16)
+    else:
+        # Un paso por componente: |error| <= paso / 2 = tolerancia. decode_field
+        # devuelve float32, cuyo redondeo (<= eps / 2 * |x|) se descuenta de la cota
+        axes = tuple(range(values.ndim - 1))
+        finite = np.where(nan_mask, 0.0, values)
+        low = np.min(np.where(nan_mask, np.inf, values), axis=axes)
+        high = np.max(np.where(nan_mask, -np.inf, values), axis=axes)
+        low, high = np.where(np.isfinite(low), low, 0.0), np.where(np.isfinite(high), high, 0.0)
+        peak = np.maximum(np.abs(low), np.abs(high))
+        bound = error_bound * peak if relative else np.full_like(low, error_bound)
+        tolerance = bound - np.finfo(np.float32).eps * peak
+        if np.any((peak > 0) & (tolerance <= 0)):
+            raise ValueError(f"error_bound={error_bound} está por debajo de la resolución de float32; "
+                             f"usar el modo 'float32'.")
+        tolerance = np.maximum(tolerance, 0.0)
+        scale = np.where(tolerance > 0, 2.0 * tolerance, 1.0)
+        offset = (low + high) / 2.0
+        codes = np.rint((finite - offset) / scale).astype(np.int64)
+        codes[nan_mask] = 0
+        if delta:
+            codes = np.diff(codes, axis=0, prepend=np.zeros_like(codes[:1]))
+        arrays['data'] = codes.astype(_int_dtype(codes.min(initial=0), codes.max(initial=0)))
+        meta.update(scale=scale.tolist(), offset=offset.tolist(), tolerance=tolerance.tolist(),
+                    bound=bound.tolist(), relative=bool(relative), error_bound=error_bound)
+
+    meta['dtype'] = str(arrays['data'].dtype)
+    reconstructed = decode_field(arrays, meta).astype(np.float64)
+    errors = np.where(nan_mask, 0.0, np.abs(reconstructed - values))
+    meta['max_error'] = float(errors.max()) if values.size else 0.0
+    if mode == 'cuantizado' and values.size:
+        worst = errors.max(axis=tuple(range(values.ndim - 1)))
+        if np.any(worst > bound):
+            raise ValueError(f"Error de reconstrucción {worst.max():.4g} mayor que la cota "
+                             f"{bound[np.argmax(worst - bound)]:.4g}.")
+    return arrays, meta
+
+
+def decode_field(arrays, meta):
+    """
+    Cubo float32 reconstruido a partir de encode_field.
+    """
+    shape = tuple(meta['shape'])
+    data = np.asarray(arrays['data'])
+    if meta['mode'] == 'cuantizado':
+        codes = np.cumsum(data, axis=0, dtype=np.int64) if meta['delta'] else data.astype(np.int64)
+        cube = (codes * np.asarray(meta['scale']) + np.asarray(meta['offset'])).astype(np.float32)
+    else:
+        cube = data.astype(np.float32)
+    if 'nan' in arrays:
+        mask = np.unpackbits(np.asarray(arrays['nan']), count=int(np.prod(shape))).astype(bool)
+        cube[mask.reshape(shape)] = np.nan
+    return cube
+
+
+# ----------------------------------------------------------------------
+# COORDENADAS DE LA HÉLICE Y MUESTREO A PUNTOS FIJOS
+# ----------------------------------------------------------------------
+
+def _unwrap_turns(theta, coords, connectivity, offsets, height):
+    """
+    Vueltas enteras de cada nodo para desenrollar el ángulo: se recorre un árbol
+    de los nodos conectados por los elementos (cada salto entre vecinos cambia
+    el ángulo poco) y se acumulan los cruces de -pi/pi. Si la malla tiene partes
+    sin conectar, se unen por sus nodos más cercanos.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import minimum_spanning_tree, breadth_first_order, connected_components
+
+    n = len(theta)
+    counts = np.diff(offsets)
+    rows = np.repeat(connectivity[offsets[:-1]], counts)
+    cols = connectivity
+    keep = rows != cols
+    rows, cols = rows[keep], cols[keep]
+    weights = np.full(len(rows), 1e-9)
+    graph = coo_matrix((weights, (rows, cols)), shape=(n, n)).tocsr()
+
+    n_parts, labels = connected_components(graph, directed=False)
+    if n_parts > 1:
+        from scipy.spatial import cKDTree
+
+        distance, neighbour = cKDTree(coords).query(coords, k=min(9, n))
+        source = np.repeat(np.arange(n), neighbour.shape[1])
+        neighbour, distance = neighbour.ravel(), distance.ravel()
+        bridge = labels[source] != labels[neighbour]
+        rows = np.concatenate([rows, source[bridge]])
+        cols = np.concatenate([cols, neighbour[bridge]])
+        weights = np.concatenate([weights, distance[bridge] + 1e-6])
+        graph = coo_matrix((weights, (rows, cols)), shape=(n, n)).tocsr()
+    tree = minimum_spanning_tree(graph)
+
+    # Árbol desde el nodo más bajo de cada parte que siga suelta
+    n_parts, labels = connected_components(tree, directed=False)
+    parent = np.full(n, -1, dtype=np.int64)
+    for part in range(n_parts):
+        members = np.flatnonzero(labels == part)
+        root = members[np.argmin(height[members])]
+        _, predecessors = breadth_first_order(tree, root, directed=False, return_predecessors=True)
+        parent[members] = predecessors[members]
+    parent[parent < 0] = -1
+
+    child = parent >= 0
+    jump = np.zeros(n, dtype=np.int64)
+    step = np.angle(np.exp(1j * (theta[child] - theta[parent[child]])))
+    jump[child] = np.rint((theta[parent[child]] + step - theta[child]) / (2 * np.pi)).astype(np.int64)
+
+    # Suma de saltos hasta la raíz por duplicación de punteros (log2(profundidad) pasadas)
+    turns = jump
+    while (parent >= 0).any():
+        linked = parent >= 0
+        turns, parent = turns.copy(), parent.copy()
+        turns[linked] += turns[parent[linked]]
+        parent[linked] = parent[parent[linked]]
+    return turns
+
+
+def coil_coordinates(mesh, axis='z'):
+    """
+    Coordenadas de cada nodo sobre el resorte:
+      phi  ángulo de espira desenrollado (rad), 0 en el extremo inferior
+      psi  posición alrededor del alambre (0 = exterior, +-pi = interior)
+      rho  distancia al eje del alambre
+    más el radio medio de espira y el radio del alambre.
+    """
+    coords = np.asarray(mesh['coords'], dtype=np.float64)
+    axis_index = 'xyz'.index(axis)
+    plane = [i for i in range(3) if i != axis_index]
+    height = coords[:, axis_index]
+    u = coords[:, plane[0]] - coords[:, plane[0]].mean()
+    v = coords[:, plane[1]] - coords[:, plane[1]].mean()
+    theta = np.arctan2(v, u)
+    radius = np.hypot(u, v)
+
+    turns = _unwrap_turns(theta, coords, np.asarray(mesh['connectivity'], dtype=np.int64),
+                          np.asarray(mesh['offsets'], dtype=np.int64), height)
+    phi = theta + 2 * np.pi * turns
+    # phi crece hacia arriba sin importar el sentido de la hélice
+    if len(phi) > 1 and np.cov(phi, height)[0, 1] < 0:
+        phi = -phi
+    phi -= phi.min()
+
+    # Línea media del alambre: radio y altura promedio por tramo de ángulo
+    bins = np.floor(phi / (2 * np.pi / ANGLE_BINS_PER_TURN)).astype(np.int64)
+    count = np.bincount(bins)
+    center_radius = np.bincount(bins, radius) / np.maximum(count, 1)
+    center_height = np.bincount(bins, height) / np.maximum(count, 1)
+    d_radius = radius - center_radius[bins]
+    d_height = height - center_height[bins]
+    return {
+        'phi': phi,
+        'psi': np.arctan2(d_height, d_radius),
+        'rho': np.hypot(d_radius, d_height),
+        'coil_radius': float(center_radius[count > 0].mean()),
+        'wire_radius': float(np.percentile(np.hypot(d_radius, d_height), 99)),
+    }
+
+
+def sample_nodes(mesh, n_coil=64, n_wire=8, axis='z'):
+    """
+    Índices de los nodos más cercanos a la rejilla fija (n_coil x n_wire) sobre
+    la superficie del alambre. Devuelve (índices, dict con la rejilla y la
+    distancia de cada muestra a su nodo).
+    """
+    from scipy.spatial import cKDTree
+
+    helix = coil_coordinates(mesh, axis)
+    arc, wire = helix['coil_radius'], helix['wire_radius']
+    points = np.column_stack([helix['phi'] * arc, helix['psi'] * wire, helix['rho']])
+
+    s = np.linspace(0.0, 1.0, n_coil)
+    psi = -np.pi + 2 * np.pi * np.arange(n_wire) / n_wire
+    grid_s, grid_psi = np.meshgrid(s, psi, indexing='ij')
+    targets = np.column_stack([grid_s.ravel() * helix['phi'].max() * arc,
+                               grid_psi.ravel() * wire,
+                               np.full(grid_s.size, wire)])
+    distance, index = cKDTree(points).query(targets)
+    return index.astype(np.int32), {
+        's': grid_s.ravel(), 'psi': grid_psi.ravel(), 'distance': distance,
+        'turns': float(helix['phi'].max() / (2 * np.pi)),
+        'coil_radius': helix['coil_radius'], 'wire_radius': wire,
+    }
+
+
+def resample_time(cube, times, n_steps):
+    """
+    Cubo interpolado linealmente a n_steps instantes fijos del tiempo
+    normalizado (t / t_final = 1/n_steps ... 1).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if len(times) == 1:
+        return np.repeat(np.asarray(cube[:1]), n_steps, axis=0)
+    normalized = times / times[-1]
+    grid = np.linspace(1.0 / n_steps, 1.0, n_steps)
+    upper = np.clip(np.searchsorted(normalized, grid), 1, len(times) - 1)
+    lower = upper - 1
+    weight = np.clip((grid - normalized[lower]) / (normalized[upper] - normalized[lower]), 0.0, 1.0)
+    weight = weight.reshape(-1, *([1] * (np.ndim(cube) - 1)))
+    return np.asarray(cube[lower]) * (1 - weight) + np.asarray(cube[upper]) * weight
+
+
+# ----------------------------------------------------------------------
+# PAQUETE COMPRIMIDO
+# ----------------------------------------------------------------------
+
+class CompressedPackage:
+    """
+    Paquete de campos comprimidos. Uso:
+
+        package = CompressedPackage("paquete", settings)
+        package.add_project(store, "PROYECTO")
+        disp = package.load("PROYECTO", "displacement")       # (pasos, puntos, 3) float32
+        keys, X = package.feature_matrix("stress")            # una fila por resorte
+    """
+
+    def __init__(self, root, settings=None):
+        self.root = root
+        os.makedirs(os.path.join(root, SAMPLES_DIR), exist_ok=True)
+        self.index_path = os.path.join(root, INDEX_FILE)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                self.index = json.load(f)
+            if self.index.get('version') != PACKAGE_VERSION:
+                raise ValueError(f"El paquete '{root}' tiene versión {self.index.get('version')}; "
+                                 f"se esperaba {PACKAGE_VERSION}. Crearlo en otra carpeta.")
+            if settings is not None and self.index['settings'] != settings:
+                print(f"  [AVISO] Parámetros distintos a los del paquete '{root}': se recomprime todo.")
+                self.index = {'version': PACKAGE_VERSION, 'settings': settings, 'projects': {}}
+        else:
+            self.index = {'version': PACKAGE_VERSION, 'settings': settings or {}, 'projects': {}}
+        self.settings = self.index['settings']
+        self._samples = {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def projects(self):
+        return sorted(self.index['projects'])
+
+    def entry(self, key):
+        return self.index['projects'][key]
+
+    def samples(self, store, key):
+        """
+        Nodos muestreados de la malla del proyecto (se calculan una vez por malla).
+        """
+        mesh_id = store.entry(key)['mesh']
+        if mesh_id not in self._samples:
+            # La rejilla y el eje van en el nombre: otro muestreo no reutiliza el archivo
+            n_coil, n_wire = self.settings['samples']
+            axis = self.settings['axis']
+            path = os.path.join(self.root, SAMPLES_DIR, f'{mesh_id}_{n_coil}x{n_wire}_{axis}.npz')
+            if os.path.exists(path):
+                with np.load(path) as data:
+                    self._samples[mesh_id] = data['nodes']
+            else:
+                nodes, grid = sample_nodes(store.mesh(key), n_coil, n_wire, axis)
+                np.savez(path, nodes=nodes, **grid)
+                print(f"    Muestras de la malla {mesh_id}: {grid['turns']:.2f} espiras, "
+                      f"distancia máx. a un nodo {grid['distance'].max():.3g}")
+                self._samples[mesh_id] = nodes
+        return self._samples[mesh_id]
+
+    def is_current(self, store, key):
+        entry = self.index['projects'].get(key)
+        return entry is not None and entry['fingerprint'] == store.entry(key)['fingerprint']
+
+    def add_project(self, store, key, fields=None, force=False):
+        if not force and self.is_current(store, key):
+            print(f"  [OK] {key} ya está en el paquete")
+            return None
+
+        settings = self.settings
+        source = store.entry(key)
+        fields = [name for name in (fields or source['fields']) if name in source['fields']]
+        times = store.times(key)
+        nodes = self.samples(store, key) if settings.get('samples') else None
+
+        arrays, field_entries, raw_bytes = {}, {}, 0
+        for name in fields:
+            cube = store.open(key, name)
+            raw_bytes += cube.nbytes
+            reduced = np.asarray(cube[:, nodes, :] if nodes is not None else cube)
+            if settings.get('n_steps'):
+                reduced = resample_time(reduced, times, settings['n_steps'])
+            field_arrays, meta = encode_field(reduced, settings['mode'], settings['error_bound'],
+                                              settings['relative'], settings['delta'])
+            meta['columns'] = source['fields'][name]['columns']
+            arrays.update({f'{name}__{part}': value for part, value in field_arrays.items()})
+            field_entries[name] = meta
+
+        path = os.path.join(self.root, f'{key}.npz')
+        tmp_path = os.path.join(self.root, f'{key}.tmp.npz')
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+        stored_bytes = os.path.getsize(path)
+        self.index['projects'][key] = {
+            'rst_path': source['rst_path'],
+            'fingerprint': source['fingerprint'],
+            'mesh': source['mesh'],
+            'times': source['times'],
+            'file': f'{key}.npz',
+            'raw_bytes': int(raw_bytes),
+            'stored_bytes': int(stored_bytes),
+            'fields': field_entries,
+        }
+        self._save_index()
+        errors = ", ".join(f"{name} {meta['max_error']:.3g}" for name, meta in field_entries.items())
+        print(f"  [OK] {key}: {raw_bytes / 2 ** 20:.1f} MB -> {stored_bytes / 2 ** 10:.1f} KB "
+              f"(x{raw_bytes / max(stored_bytes, 1):.0f}) | error máx.: {errors}")
+        return key
+
+    # --- Lectura ---
+
+    def load(self, key, field_name):
+        """
+        Campo reconstruido (pasos, puntos, componentes) en float32.
+        """
+        entry = self.entry(key)
+        meta = entry['fields'][field_name]
+        prefix = f'{field_name}__'
+        with np.load(os.path.join(self.root, entry['file'])) as data:
+            arrays = {name[len(prefix):]: data[name] for name in data.files if name.startswith(prefix)}
+        return decode_field(arrays, meta)
+
+    def feature_matrix(self, field_name, keys=None):
+        """
+        (claves, X) con una fila por resorte: el campo aplanado. Exige que todos
+        los proyectos tengan la misma forma (muestreo y n_pasos fijos).
+        """
+        keys = [key for key in (keys or self.projects()) if field_name in self.entry(key)['fields']]
+        shapes = {tuple(self.entry(key)['fields'][field_name]['shape']) for key in keys}
+        if len(shapes) > 1:
+            raise ValueError(f"'{field_name}' tiene formas distintas entre proyectos ({sorted(shapes)}); "
+                             f"comprimir con muestreo y n_pasos fijos.")
+        if not keys:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return keys, np.stack([self.load(key, field_name).ravel() for key in keys])
+
+    def summary(self):
+        raw = sum(e['raw_bytes'] for e in self.index['projects'].values())
+        stored = sum(e['stored_bytes'] for e in self.index['projects'].values())
+        return (f"Paquete '{self.root}': {len(self.index['projects'])} proyectos | "
+                f"{raw / 2 ** 20:.1f} MB -> {stored / 2 ** 20:.2f} MB (x{raw / max(stored, 1):.0f})")
+
+
+def compress_store(store_root, package_root, fields=None, mode='cuantizado', error_bound=1e-3,
+                   relative=True, delta=True, samples=(64, 8), n_steps=None, axis='z', force=False):
+    """
+    Comprime todos los proyectos del almacén de campos en el paquete. Los
+    proyectos cuyo .rst no cambió (misma huella en el almacén) se saltan.
+    samples=None guarda todos los nodos (sin muestreo).
+    """
+    from almacen_campos import FieldStore
+
+    settings = {'mode': mode, 'error_bound': error_bound, 'relative': relative,
+                'delta': bool(delta) and mode == 'cuantizado',
+                'samples': list(samples) if samples else None, 'n_steps': n_steps, 'axis': axis}
+    store = FieldStore(store_root)
+    package = CompressedPackage(package_root, settings)
+    for key in store.projects():
+        try:
+            package.add_project(store, key, fields=fields, force=force)
+        except Exception as e:
+            print(f"  [ERROR] {key}: {e}")
+    print(package.summary())
+    return package
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Comprime el almacén de campos nodales para distribuirlo.")
+    parser.add_argument("store", help="Carpeta del almacén de campos (almacen_campos.py)")
+    parser.add_argument("package", help="Carpeta del paquete comprimido")
+    parser.add_argument("--fields", nargs="+", default=None, help="Campos a incluir (por defecto todos)")
+    parser.add_argument("--mode", default='cuantizado', choices=MODES,
+                        help="Almacenamiento de los valores")
+    parser.add_argument("--error", type=float, default=1e-3,
+                        help="Cota de error del modo cuantizado (relativa al máximo |x| de cada componente)")
+    parser.add_argument("--absolute", action="store_true", help="--error es absoluto (unidades del campo)")
+    parser.add_argument("--no-delta", action="store_true", help="Sin codificación delta entre pasos")
+    parser.add_argument("--samples", type=int, nargs=2, default=[64, 8], metavar=("ESPIRA", "ALAMBRE"),
+                        help="Puntos a lo largo del alambre y alrededor de su sección")
+    parser.add_argument("--all-nodes", action="store_true", help="Guardar todos los nodos (sin muestreo)")
+    parser.add_argument("--steps", type=int, default=None,
+                        help="Remuestrear el tiempo a N pasos fijos (vectores de igual longitud)")
+    parser.add_argument("--axis", default='z', choices=('x', 'y', 'z'), help="Eje del resorte")
+    parser.add_argument("--force", action="store_true", help="Recomprimir aunque el proyecto no haya cambiado")
+    args = parser.parse_args(argv)
+
+    compress_store(args.store, args.package, fields=args.fields, mode=args.mode, error_bound=args.error,
+                   relative=not args.absolute, delta=not args.no_delta,
+                   samples=None if args.all_nodes else args.samples, n_steps=args.steps,
+                   axis=args.axis, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import os
+
+import numpy as np
+
+from reduccion_campos import stack_fields
+
+# ----------------------------------------------------------------------
+# CURVAS FUERZA-DEFLEXIÓN Y AJUSTE VECTORIZADO DE LA RATA
+# ----------------------------------------------------------------------
+# Para cada .rst se extrae, en UNA evaluación por resultado y para todos los
+# sets del soporte de tiempo:
+#   - la reacción en la selección nombrada de apoyo (p. ej. 'FIJO'), sumada
+#     en el eje del resorte -> fuerza axial por set
+#   - el desplazamiento axial medio de la selección que se mueve (p. ej.
+#     'MOVIL') -> deflexión por set
+# La suma de reacciones de TODO el modelo se cancela cuando el resorte está
+# apoyado en ambos extremos; por eso la fuerza se toma en una sola selección.
+#
+# Las curvas se guardan juntas en un .npz comprimido (arreglos (resortes,
+# puntos) rellenos con NaN) y se ajustan todas a la vez con NumPy: rata lineal,
+# ajuste cuadrático F = a d + b d^2, R^2 e índice de no linealidad.
+# Unidades: las del .rst (con unidades mm-N la rata queda en N/mm).
+
+AXES = {'X': 0, 'Y': 1, 'Z': 2}
+
+# Nombres de selección buscados (sin tildes ni mayúsculas) si no se indican
+FIXED_SELECTIONS = ('FIJO', 'FIXED', 'APOYO', 'BASE', 'SOPORTE')
+MOVING_SELECTIONS = ('MOVIL', 'MOVING', 'CARGA', 'TOPE', 'PLACA')
+
+# Operadores de reacción de DPF, en orden de preferencia
+REACTION_OPERATORS = ('reaction_force', 'support_reaction')
+
+CURVES_FILE = 'curvas_resortes.npz'
+METRICS_FILE = 'curvas_metricas.parquet'
+
+
+def reaction_operator(ops):
+    """
+    Operador de fuerza de reacción disponible en esta versión de DPF.
+    """
+    for name in REACTION_OPERATORS:
+        operator = getattr(ops.result, name, None)
+        if operator is not None:
+            return operator
+    raise AttributeError(f"DPF no tiene ninguno de los operadores de reacción {REACTION_OPERATORS}")
+
+
+def find_selection(mesh, candidates):
+    """
+    Primera selección nombrada de la malla cuyo nombre coincide con alguno de
+    los candidatos (sin distinguir tildes ni mayúsculas), o None.
+    """
+    from descubrimiento import fold
+
+    available = {fold(name): name for name in mesh.available_named_selections}
+    for candidate in candidates:
+        if fold(candidate) in available:
+            return available[fold(candidate)]
+    return None
+
+
+def support_selection(mesh, selection=None):
+    """
+    Nombre de la selección de apoyo en la malla: 'selection' (sin distinguir
+    tildes ni mayúsculas) o, sin ella, la primera de FIXED_SELECTIONS. Lanza
+    ValueError si no existe: sin apoyo no hay fuerza de reacción que medir.
+    """
+    candidates = (selection,) if selection else FIXED_SELECTIONS
+    found = find_selection(mesh, candidates)
+    if found is None:
+        raise ValueError(f"No se encontró la selección de apoyo {list(candidates)}. "
+                         f"Disponibles: {list(mesh.available_named_selections)}")
+    return found
+
+
+def support_reaction(ops, data_source, time_scoping, mesh, selection=None):
+    """
+    Reacción total en la selección de apoyo por set: (set_ids, vector (sets, 3)
+    sumado sobre los nodos de la selección, nombre de la selección). La
+    selección se resuelve con support_selection.
+    """
+    selection = support_selection(mesh, selection)
+    reaction_op = reaction_operator(ops)(data_sources=data_source, time_scoping=time_scoping, mesh=mesh,
+                                         mesh_scoping=mesh.named_selection(selection))
+    set_ids, reactions, _ = stack_fields(reaction_op.outputs.fields_container())
+    return set_ids, np.nansum(reactions, axis=1), selection
+
+
+# ----------------------------------------------------------------------
+# EXTRACCIÓN
+# ----------------------------------------------------------------------
+
+def extract_curve(rst_path, fixed_selection=None, moving_selection=None, axis='Z'):
+    """
+    Curva fuerza-deflexión axial de un .rst. Devuelve un dict con key,
+    rst_path, set_ids, times, deflection, force, fixed y moving.
+
+    Sin selección móvil se usa el máximo desplazamiento axial de todo el modelo
+    (más costoso: se lee el campo completo).
+    """
+    from ansys.dpf import core as dpf
+    from ansys.dpf.core import operators as ops
+    from soporte_tiempo import read_time_support
+    from almacen_campos import project_key
+    from cache_mallas import shared_cache
+
+    component = AXES[axis.upper()]
+    data_source = dpf.DataSources(rst_path)
+    mesh, _ = shared_cache().get(data_source, rst_path)
+    support = read_time_support(data_source)
+    time_scoping = support.scoping()
+
+    moving = moving_selection or find_selection(mesh, MOVING_SELECTIONS)
+
+    # 1. Reacción en el apoyo, todos los sets en una evaluación
+    set_ids, reaction, fixed = support_reaction(ops, data_source, time_scoping, mesh, fixed_selection)
+    force = np.abs(reaction[:, component])
+
+    # 2. Desplazamiento axial de la selección móvil (o de todo el modelo)
+    if moving is None:
+        print(f"    [AVISO] Sin selección móvil {MOVING_SELECTIONS}; se usa el máximo del modelo.")
+        displacement_op = ops.result.displacement(data_sources=data_source, time_scoping=time_scoping,
+                                                  mesh=mesh)
+    else:
+        displacement_op = ops.result.displacement(data_sources=data_source, time_scoping=time_scoping,
+                                                  mesh=mesh, mesh_scoping=mesh.named_selection(moving))
+    disp_set_ids, disp, _ = stack_fields(displacement_op.outputs.fields_container())
+    if list(disp_set_ids) != list(set_ids):
+        raise ValueError("La reacción y el desplazamiento devolvieron sets distintos")
+    axial = disp[:, :, component]
+    if moving is None:
+        deflection = np.max(np.where(np.isfinite(axial), np.abs(axial), -np.inf), axis=1)
+    else:
+        deflection = np.abs(np.nanmean(axial, axis=1))
+
+    return {
+        'key': project_key(rst_path),
+        'rst_path': rst_path,
+        'set_ids': np.asarray(set_ids, dtype=np.int32),
+        'times': support.times_of(set_ids),
+        'deflection': deflection,
+        'force': force,
+        'fixed': fixed,
+        'moving': moving or '',
+    }
+
+
+def _curve_worker(task):
+    rst_path, options = task
+    try:
+        return rst_path, extract_curve(rst_path, **options), None
+    except Exception as e:
+        return rst_path, None, f"{type(e).__name__}: {e}"
+
+
+# ----------------------------------------------------------------------
+# AJUSTE VECTORIZADO
+# ----------------------------------------------------------------------
+
+def pad_curves(curves, field):
+    """
+    Arreglo (resortes, puntos) con el campo 'field' de cada curva, relleno con NaN.
+    """
+    width = max((len(c[field]) for c in curves), default=0)
+    padded = np.full((len(curves), width), np.nan)
+    for i, curve in enumerate(curves):
+        padded[i, :len(curve[field])] = curve[field]
+    return padded
+
+
+def fit_curves(deflection, force):
+    """
+    Ajusta todas las curvas a la vez. deflection y force: (resortes, puntos),
+    NaN donde no hay punto. Devuelve un dict de arreglos (uno por métrica):
+
+    - Rata_Origen          pendiente de F = k d (mínimos cuadrados por el origen)
+    - Rata_Lineal, Intercepto, R2_Lineal    ajuste F = k d + c
+    - Rata_Cuadratica_A, Coef_Cuadratico_B   ajuste F = a d + b d^2
+    - Indice_No_Linealidad  (k tangente en d_max - a) / a = 2 b d_max / a
+    - Rata_Secante_Inicial  F/d del primer punto
+    - Rata_Tangente_Final   pendiente entre los dos últimos puntos
+    """
+    d = np.asarray(deflection, dtype=np.float64)
+    f = np.asarray(force, dtype=np.float64)
+    valid = np.isfinite(d) & np.isfinite(f)
+    d0 = np.where(valid, d, 0.0)
+    f0 = np.where(valid, f, 0.0)
+    n = valid.sum(axis=1).astype(np.float64)
+    rows = np.arange(d.shape[0])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s_d, s_f = d0.sum(axis=1), f0.sum(axis=1)
+        s_dd, s_df = (d0 * d0).sum(axis=1), (d0 * f0).sum(axis=1)
+        s_d3, s_d4 = (d0 ** 3).sum(axis=1), (d0 ** 4).sum(axis=1)
+        s_d2f = (d0 * d0 * f0).sum(axis=1)
+
+        rate_origin = s_df / s_dd
+        slope = (n * s_df - s_d * s_f) / (n * s_dd - s_d ** 2)
+        intercept = (s_f - slope * s_d) / n
+        residual = np.where(valid, f0 - slope[:, None] * d0 - intercept[:, None], 0.0)
+        spread = np.where(valid, f0 - (s_f / n)[:, None], 0.0)
+        r2 = 1.0 - (residual ** 2).sum(axis=1) / (spread ** 2).sum(axis=1)
+
+        det = s_dd * s_d4 - s_d3 ** 2
+        a = (s_df * s_d4 - s_d2f * s_d3) / det
+        b = (s_dd * s_d2f - s_d3 * s_df) / det
+
+        d_max = np.max(np.where(valid, np.abs(d), -np.inf), axis=1, initial=-np.inf)
+        f_max = np.max(np.where(valid, np.abs(f), -np.inf), axis=1, initial=-np.inf)
+        d_max[~np.isfinite(d_max)] = np.nan
+        f_max[~np.isfinite(f_max)] = np.nan
+
+        first = valid.argmax(axis=1)
+        last = d.shape[1] - 1 - valid[:, ::-1].argmax(axis=1) if d.shape[1] else first
+        previous = np.maximum(last - 1, first)
+        secant_initial = f0[rows, first] / d0[rows, first]
+        tangent_final = (f0[rows, last] - f0[rows, previous]) / (d0[rows, last] - d0[rows, previous])
+
+    return {
+        'N_Puntos': n.astype(np.int32),
+        'Deflexion_Max': d_max,
+        'Fuerza_Max': f_max,
+        'Rata_Origen': rate_origin,
+        'Rata_Lineal': slope,
+        'Intercepto': intercept,
+        'R2_Lineal': r2,
+        'Rata_Cuadratica_A': a,
+        'Coef_Cuadratico_B': b,
+        'Indice_No_Linealidad': 2 * b * d_max / a,
+        'Rata_Secante_Inicial': secant_initial,
+        'Rata_Tangente_Final': tangent_final,
+    }
+
+
+# ----------------------------------------------------------------------
+# ALMACENAMIENTO COMPACTO (UN .npz PARA TODOS LOS RESORTES)
+# ----------------------------------------------------------------------
+
+def save_curves(curves, path=CURVES_FILE):
+    """
+    Guarda las curvas en un .npz comprimido: claves y rutas (resortes,),
+    n_points, y set_ids / times / deflection / force como (resortes, puntos).
+    """
+    curves = sorted(curves, key=lambda c: c['key'])
+    set_ids = pad_curves(curves, 'set_ids')
+    np.savez_compressed(
+        path,
+        keys=np.array([c['key'] for c in curves], dtype=str),
+        rst_paths=np.array([c['rst_path'] for c in curves], dtype=str),
+        fixed=np.array([c['fixed'] for c in curves], dtype=str),
+        moving=np.array([c['moving'] for c in curves], dtype=str),
+        n_points=np.array([len(c['force']) for c in curves], dtype=np.int32),
+        set_ids=np.where(np.isnan(set_ids), -1, set_ids).astype(np.int32),
+        times=pad_curves(curves, 'times'),
+        deflection=pad_curves(curves, 'deflection').astype(np.float32),
+        force=pad_curves(curves, 'force').astype(np.float32),
+    )
+    return path
+
+
+def load_curves(path=CURVES_FILE):
+    """
+    Curvas guardadas con save_curves, como dict de arreglos.
+    """
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def unpack_curves(data):
+    """
+    Lista de curvas (dicts) desde el resultado de load_curves, sin el relleno.
+    """
+    curves = []
+    for i, n in enumerate(data['n_points']):
+        curves.append({
+            'key': str(data['keys'][i]),
+            'rst_path': str(data['rst_paths'][i]),
+            'fixed': str(data['fixed'][i]),
+            'moving': str(data['moving'][i]),
+            'set_ids': data['set_ids'][i, :n],
+            'times': data['times'][i, :n],
+            'deflection': data['deflection'][i, :n].astype(np.float64),
+            'force': data['force'][i, :n].astype(np.float64),
+        })
+    return curves
+
+
+def metrics_frame(data):
+    """
+    Tabla de métricas (una fila por resortes) desde el resultado de load_curves.
+    """
+    import pandas as pd
+
+    metrics = fit_curves(data['deflection'], data['force'])
+    return pd.DataFrame({
+        'Proyecto_Clave': data['keys'],
+        'RST_Source': data['rst_paths'],
+        **metrics,
+    })
+
+
+def build_curves(root_directory, output=CURVES_FILE, metrics_output=METRICS_FILE, workers=1,
+                 fixed_selection=None, moving_selection=None, axis='Z'):
+    """
+    Extrae la curva de cada .rst bajo root_directory, la agrega al .npz
+    (reemplazando las curvas de la misma clave) y escribe la tabla de métricas.
+    """
+    from descubrimiento import discover_rst_files
+    from escritores import write_dataset
+
+    rst_files = discover_rst_files(root_directory, use_index=False)
+    options = {'fixed_selection': fixed_selection, 'moving_selection': moving_selection, 'axis': axis}
+    tasks = [(path, options) for path in rst_files]
+
+    if workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_curve_worker, tasks))
+    else:
+        results = [_curve_worker(task) for task in tasks]
+
+    curves = {c['key']: c for c in unpack_curves(load_curves(output))} if os.path.exists(output) else {}
+    for rst_path, curve, error in results:
+        if error is not None:
+            print(f"  [ERROR] {rst_path}: {error}")
+            continue
+        curves[curve['key']] = curve
+        print(f"  [OK] {curve['key']}: {len(curve['force'])} puntos ({curve['fixed']} / {curve['moving'] or '-'})")
+
+    if not curves:
+        print("No se extrajo ninguna curva.")
+        return None
+    save_curves(list(curves.values()), output)
+    metrics_path = write_dataset(metrics_frame(load_curves(output)), metrics_output)
+    print(f"{len(curves)} curvas en '{output}' | métricas en '{metrics_path}'")
+    return output
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Curvas fuerza-deflexión de los .rst y ajuste de la rata.")
+    parser.add_argument("root", nargs="?", default=None,
+                        help="Carpeta con las carpetas de proyecto (sin ella solo se reajusta el .npz)")
+    parser.add_argument("-o", "--output", default=CURVES_FILE, help="Archivo .npz de curvas")
+    parser.add_argument("--metrics", default=METRICS_FILE, help="Tabla de métricas del ajuste")
+    parser.add_argument("--fixed", default=None, help="Selección nombrada del apoyo")
+    parser.add_argument("--moving", default=None, help="Selección nombrada que se desplaza")
+    parser.add_argument("--axis", default="Z", choices=sorted(AXES), help="Eje del resorte")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para extraer en paralelo")
+    args = parser.parse_args(argv)
+
+    if args.root is None:
+        from escritores import write_dataset
+
+        path = write_dataset(metrics_frame(load_curves(args.output)), args.metrics)
+        print(f"Métricas recalculadas en '{path}'")
+        return
+    build_curves(args.root, args.output, args.metrics, workers=args.workers,
+                 fixed_selection=args.fixed, moving_selection=args.moving, axis=args.axis)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import os
+import time
+import json
+import sqlite3
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+# ----------------------------------------------------------------------
+# DESCUBRIMIENTO DE ARCHIVOS .rst (os.scandir + ÍNDICE PERSISTENTE)
+# ----------------------------------------------------------------------
+# Reemplaza glob('**/3_SIMULACION/**/*.rst'):
+#   - recorre con os.scandir y poda carpetas que no pueden tener resultados,
+#   - reconoce '3_SIMULACION' con o sin tilde / mayúsculas ('3_Simulación'),
+#   - reparte las carpetas de proyecto entre varios hilos (útil en red),
+#   - guarda un índice SQLite: si la fecha de modificación de una carpeta no
+#     cambió, se reutiliza su contenido sin volver a listarla.
+# Consultar "qué hay nuevo" es una consulta al índice (milisegundos).
+
+SIMULATION_DIR = '3_SIMULACION'
+RESULT_EXTENSIONS = ('.rst',)
+INDEX_FILE = 'indice_rst.sqlite'
+
+# Carpetas que nunca contienen archivos de resultados de interés
+SKIP_DIRS = {'.git', '__pycache__', 'user_files', 'dpall', '.cache_datos'}
+
+
+def fold(name):
+    """
+    Nombre sin tildes y en mayúsculas, para comparar carpetas ('3_Simulación' -> '3_SIMULACION').
+    """
+    return unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').upper()
+
+
+def is_simulation_dir(name):
+    return fold(name) == SIMULATION_DIR
+
+
+def simulation_dir_index(parts):
+    """
+    Posición de la carpeta '3_SIMULACION' (tolerante a tildes) en una lista de
+    partes de ruta, o None si no aparece.
+    """
+    for i, part in enumerate(parts):
+        if is_simulation_dir(part):
+            return i
+    return None
+
+
+class DiscoveryIndex:
+    """
+    Índice persistente de carpetas y archivos .rst encontrados.
+
+    Tablas:
+      carpetas(path, mtime_ns, subdirs, files)  listado en caché de cada carpeta
+      archivos(path, project, size, mtime_ns, first_seen, last_seen, status)
+      escaneos(id, root, started, finished, n_files)
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS carpetas (
+                path TEXT PRIMARY KEY, mtime_ns INTEGER, subdirs TEXT, files TEXT);
+            CREATE TABLE IF NOT EXISTS archivos (
+                path TEXT PRIMARY KEY, root TEXT, project TEXT, size INTEGER, mtime_ns INTEGER,
+                first_seen INTEGER, last_seen INTEGER, status TEXT);
+            CREATE INDEX IF NOT EXISTS archivos_status ON archivos(root, status);
+            CREATE TABLE IF NOT EXISTS escaneos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, root TEXT, started REAL, finished REAL,
+                n_files INTEGER);
+        """)
+        self.conn.commit()
+
+    def cached_listing(self, path, mtime_ns):
+        with self._lock:
+            row = self.conn.execute("SELECT mtime_ns, subdirs, files FROM carpetas WHERE path = ?",
+                                    (path,)).fetchone()
+        if row is None or row[0] != mtime_ns:
+            return None
+        return json.loads(row[1]), json.loads(row[2])
+
+    def store_listings(self, listings):
+        self.conn.executemany("INSERT OR REPLACE INTO carpetas VALUES (?, ?, ?, ?)",
+                              [(path, mtime, json.dumps(subdirs), json.dumps(files))
+                               for path, (mtime, subdirs, files) in listings.items()])
+        self.conn.commit()
+
+    def record_scan(self, root, found, started):
+        """
+        Actualiza la tabla de archivos con el resultado de un escaneo y marca cada
+        archivo como nuevo, modificado, sin_cambios o eliminado. Devuelve el id del escaneo.
+        """
+        cursor = self.conn.execute("INSERT INTO escaneos (root, started) VALUES (?, ?)", (root, started))
+        scan_id = cursor.lastrowid
+
+        previous = {path: (size, mtime) for path, size, mtime in self.conn.execute(
+            "SELECT path, size, mtime_ns FROM archivos WHERE root = ? AND status != 'eliminado'", (root,))}
+
+        rows = []
+        for path, (project, size, mtime) in found.items():
+            if path not in previous:
+                status = 'nuevo'
+            elif previous[path] != (size, mtime):
+                status = 'modificado'
+            else:
+                status = 'sin_cambios'
+            rows.append((path, root, project, size, mtime, scan_id, scan_id, status))
+        self.conn.executemany("""
+            INSERT INTO archivos VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                project=excluded.project, size=excluded.size, mtime_ns=excluded.mtime_ns,
+                last_seen=excluded.last_seen, status=excluded.status""", rows)
+
+        deleted = [(scan_id, path) for path in previous if path not in found]
+        self.conn.executemany("UPDATE archivos SET status='eliminado', last_seen=? WHERE path = ?", deleted)
+
+        self.conn.execute("UPDATE escaneos SET finished = ?, n_files = ? WHERE id = ?",
+                          (time.time(), len(found), scan_id))
+        self.conn.commit()
+        return scan_id
+
+    def files(self, root, include_deleted=False):
+        query = "SELECT path FROM archivos WHERE root = ?"
+        if not include_deleted:
+            query += " AND status != 'eliminado'"
+        return sorted(path for (path,) in self.conn.execute(query, (root,)))
+
+    def changes(self, root, statuses=('nuevo', 'modificado', 'eliminado')):
+        """
+        Archivos nuevos, modificados o eliminados en el último escaneo de 'root'.
+        """
+        marks = ','.join('?' * len(statuses))
+        return [{'path': path, 'project': project, 'status': status}
+                for path, project, status in self.conn.execute(
+                    f"SELECT path, project, status FROM archivos WHERE root = ? AND status IN ({marks}) "
+                    "AND last_seen = (SELECT MAX(id) FROM escaneos WHERE root = ?) ORDER BY path",
+                    (root, *statuses, root))]
+
+    def close(self):
+        self.conn.close()
+
+
+def _list_dir(path, index, listings):
+    """
+    (subcarpetas, archivos .rst) de una carpeta, desde el índice si su mtime no cambió.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return [], []
+    if index is not None:
+        cached = index.cached_listing(path, mtime_ns)
+        if cached is not None:
+            return cached
+
+    subdirs, files = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+                            subdirs.append(entry.name)
+                    elif entry.name.lower().endswith(RESULT_EXTENSIONS):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"  [AVISO] No se pudo listar '{path}': {e}")
+        return [], []
+
+    listings[path] = (mtime_ns, subdirs, files)
+    return subdirs, files
+
+
+def _walk(top, inside_simulation, index, listings):
+    """
+    Recorrido iterativo desde 'top'. Fuera de una carpeta 3_SIMULACION solo se
+    buscan más carpetas; dentro se recogen los .rst de todo el subárbol.
+    """
+    found = []
+    stack = [(top, inside_simulation)]
+    while stack:
+        path, inside = stack.pop()
+        subdirs, files = _list_dir(path, index, listings)
+        if inside:
+            found.extend(os.path.join(path, name) for name in files)
+        for name in subdirs:
+            stack.append((os.path.join(path, name), inside or is_simulation_dir(name)))
+    return found
+
+
+def discover_rst_files(root_directory, index_path=INDEX_FILE, workers=8, use_index=True):
+    """
+    Lista ordenada de .rst dentro de carpetas 3_SIMULACION bajo root_directory.
+    Las carpetas del primer nivel se recorren en paralelo con 'workers' hilos.
+    Con use_index, el resultado y el listado de carpetas quedan en el índice.
+    """
+    started = time.time()
+    index = DiscoveryIndex(index_path) if use_index else None
+    listings = {}
+
+    subdirs, files = _list_dir(root_directory, index, listings)
+    root_is_simulation = is_simulation_dir(os.path.basename(os.path.normpath(root_directory)))
+    tops = [(os.path.join(root_directory, name), root_is_simulation or is_simulation_dir(name))
+            for name in subdirs]
+    rst_files = [os.path.join(root_directory, name) for name in files] if root_is_simulation else []
+
+    # Cada hilo acumula en su propio dict; se unen al terminar
+    def walk_top(top):
+        local_listings = {}
+        return _walk(top[0], top[1], index, local_listings), local_listings
+
+    if workers > 1 and len(tops) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(walk_top, tops))
+    else:
+        results = [walk_top(top) for top in tops]
+    for files, local_listings in results:
+        rst_files.extend(files)
+        listings.update(local_listings)
+    rst_files = sorted(rst_files)
+
+    if index is not None:
+        found = {}
+        for path in rst_files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found[path] = (project_from_path(path), stat.st_size, stat.st_mtime_ns)
+        index.store_listings(listings)
+        index.record_scan(root_directory, found, started)
+        index.close()
+
+    elapsed = time.time() - started
+    print(f"--- Descubrimiento: {len(rst_files)} archivos .rst en {elapsed:.2f} s "
+          f"({len(listings)} carpetas listadas)")
+    return rst_files
+
+
+def project_from_path(rst_path):
+    """
+    Carpeta inmediatamente superior a '3_SIMULACION' (con o sin tilde).
+    """
+    parts = os.path.normpath(rst_path).split(os.sep)
+    position = simulation_dir_index(parts)
+    if position:
+        return parts[position - 1]
+    return os.path.basename(os.path.dirname(os.path.dirname(rst_path)))
+
+
+def what_is_new(root_directory, index_path=INDEX_FILE):
+    """
+    Cambios del último escaneo registrados en el índice (sin tocar el disco de red).
+    """
+    index = DiscoveryIndex(index_path)
+    try:
+        return index.changes(root_directory)
+    finally:
+        index.close()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Descubre archivos .rst dentro de carpetas 3_SIMULACION.")
+    parser.add_argument("root", help="Carpeta que contiene las carpetas de proyecto")
+    parser.add_argument("--index", default=INDEX_FILE, help="Archivo SQLite del índice")
+    parser.add_argument("--workers", type=int, default=8, help="Hilos para recorrer carpetas")
+    parser.add_argument("--new", action="store_true",
+                        help="Solo mostrar los cambios del último escaneo (no recorre el disco)")
+    args = parser.parse_args(argv)
+
+    if args.new:
+        for change in what_is_new(args.root, args.index):
+            print(f"{change['status']:>12}  {change['path']}")
+    else:
+        for path in discover_rst_files(args.root, args.index, workers=args.workers):
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
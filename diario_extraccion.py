@@ -0,0 +1,155 @@
+import os
+import json
+import time
+
+# ----------------------------------------------------------------------
+# DIARIO DE EJECUCIÓN DE LA EXTRACCIÓN (REANUDACIÓN TRAS UNA CAÍDA)
+# ----------------------------------------------------------------------
+# Archivo JSON-lines que solo crece. Cada línea se escribe con flush + fsync
+# en cuanto ocurre el evento, así que después de una caída (servidor DPF,
+# falta de memoria, red) el diario dice exactamente hasta dónde se llegó:
+#
+#   {"type": "run",  "run": ..., "started": ..., "root": ..., "n_files": ...}
+#   {"type": "file", "run": ..., "rst_path": ..., "status": "ok", "rows": 24, "attempt": 1}
+#   {"type": "file", "run": ..., "rst_path": ..., "status": "error", "motivo": ..., "attempt": 2}
+#   {"type": "end",  "run": ..., "finished": ..., "ok": ..., "failed": ...}
+#
+# Las filas de cada archivo se confirman en el caché de extracción (una
+# transacción SQLite por archivo) ANTES de anotar 'ok' en el diario. Al
+# reiniciar, el caché salta los archivos confirmados y el diario da el número
+# de intentos fallidos de cada archivo pendiente (para el reintento con espera).
+
+BACKOFF_SECONDS = 5.0
+MAX_BACKOFF_SECONDS = 300.0
+MAX_ATTEMPTS = 3
+
+
+def backoff_delay(retry, base=BACKOFF_SECONDS, limit=MAX_BACKOFF_SECONDS):
+    """
+    Espera antes del reintento número 'retry' (1, 2, ...): base, 2 base, 4 base...
+    """
+    return min(base * 2 ** (retry - 1), limit)
+
+
+class RunJournal:
+    """
+    Diario de una ejecución. Uso:
+
+        journal = RunJournal("dataset_para_ia_diario.jsonl")
+        journal.start_run({'root': root, 'n_files': 200})
+        journal.record(rst_path, 'ok', rows=24, attempt=1)
+        journal.end_run(ok=199, failed=1)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.run_id = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _write(self, entry):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start_run(self, info=None):
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self._write({'type': 'run', 'run': self.run_id,
+                     'started': time.strftime('%Y-%m-%dT%H:%M:%S'), **(info or {})})
+        return self.run_id
+
+    def record(self, rst_path, status, **details):
+        self._write({'type': 'file', 'run': self.run_id, 'rst_path': rst_path, 'status': status,
+                     'time': time.time(), **details})
+
+    def end_run(self, **summary):
+        self._write({'type': 'end', 'run': self.run_id,
+                     'finished': time.strftime('%Y-%m-%dT%H:%M:%S'), **summary})
+
+    def entries(self):
+        return read_journal(self.path)
+
+    def failed_attempts(self):
+        """
+        Dict rst_path -> intentos fallidos seguidos desde su último 'ok'.
+        """
+        return {path: state['failed_attempts'] for path, state in file_states(self.entries()).items()
+                if state['failed_attempts']}
+
+
+def read_journal(path):
+    """
+    Entradas del diario. Una última línea cortada por la caída se ignora.
+    """
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def file_states(entries):
+    """
+    Estado de cada archivo según el diario: último estado, intentos fallidos
+    seguidos desde el último 'ok', motivo del último fallo y hora del último evento.
+    """
+    states = {}
+    for entry in entries:
+        if entry.get('type') != 'file':
+            continue
+        state = states.setdefault(entry['rst_path'], {'status': None, 'failed_attempts': 0,
+                                                      'motivo': None, 'time': None})
+        state['status'] = entry['status']
+        state['time'] = entry.get('time')
+        if entry['status'] == 'ok':
+            state['failed_attempts'] = 0
+            state['motivo'] = None
+        else:
+            state['failed_attempts'] += 1
+            state['motivo'] = entry.get('motivo')
+    return states
+
+
+def interrupted_runs(entries):
+    """
+    Ids de las ejecuciones que empezaron y no llegaron a su línea 'end'.
+    """
+    started = [e['run'] for e in entries if e.get('type') == 'run']
+    ended = {e['run'] for e in entries if e.get('type') == 'end'}
+    return [run for run in started if run not in ended]
+
+
+def describe(entries):
+    states = file_states(entries)
+    ok = sum(1 for s in states.values() if s['status'] == 'ok')
+    failed = {path: s for path, s in states.items() if s['status'] != 'ok'}
+    runs = [e for e in entries if e.get('type') == 'run']
+    lines = [f"Ejecuciones: {len(runs)} | interrumpidas: {len(interrupted_runs(entries))}",
+             f"Archivos confirmados: {ok} | pendientes por fallo: {len(failed)}"]
+    for path, state in sorted(failed.items()):
+        lines.append(f"  {state['failed_attempts']} intentos  {state['motivo'] or '-':>13}  {path}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Estado de un diario de extracción (reanudación).")
+    parser.add_argument("journal", help="Diario JSON-lines (<salida>_diario.jsonl)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.journal):
+        print(f"[ERROR] No existe el diario '{args.journal}'")
+        return
+    print(describe(read_journal(args.journal)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import time
+import types
+
+import numpy as np
+
+# ----------------------------------------------------------------------
+# BACKEND SINTÉTICO CON LA MISMA FORMA QUE ansys.dpf.core
+# ----------------------------------------------------------------------
+# Sirve para medir la extracción sin licencia de ANSYS ni archivos .rst reales.
+# Un "archivo .rst sintético" es un JSON pequeño con la especificación del
+# análisis (nodos, subpasos, componentes, semilla); los campos se generan de
+# forma determinista al evaluar cada operador, con la misma forma que DPF:
+#
+#   fc = ops.result.displacement(data_sources=ds, time_scoping=[...]).outputs.fields_container()
+#   fc.get_label_scoping("time").ids        -> ids de set
+#   fc.get_field({"time": 3}).data           -> (nodos, 3) float64
+#   fc.get_field({"time": 3}).scoping.ids    -> ids de nodo
+#
+# install() registra el backend como 'ansys.dpf.core' en sys.modules; debe
+# llamarse ANTES de importar los módulos de extracción. Solo para pruebas de
+# rendimiento: los valores son ruido, salvo la parte axial (eje Z) de una
+# compresión del resorte entre las selecciones 'FIJO' (base) y 'MOVIL' (tope):
+#   desplazamiento Z = -carrera * t/t_final * altura relativa del nodo
+#   reacción Z en FIJO / MOVIL = +/- rata * deflexión * (1 + no_linealidad * t/t_final)
+
+SYNTHETIC_FORMAT = 'rst_sintetico'
+DEFAULT_COMPONENTS = {
+    'displacement': 3,
+    'stress': 6,
+    'reaction_force': 3,
+    'support_reaction': 3,
+    'nodal_force': 3,
+}
+REACTION_RESULTS = ('reaction_force', 'support_reaction')
+NAMED_SELECTIONS = ('FIJO', 'MOVIL')
+
+
+def write_synthetic_rst(path, n_nodes=20000, n_steps=24, seed=0, end_time=1.0,
+                        support_fraction=0.02, call_overhead=0.0, components=None, n_load_steps=1,
+                        stroke=100.0, rate=30.0, nonlinearity=0.1):
+    """
+    Escribe un .rst sintético. n_steps es el total de sets, repartidos en
+    n_load_steps pasos de carga. call_overhead (s) se suma a cada evaluación
+    de operador para imitar la latencia de una llamada a DPF. stroke (mm),
+    rate (N/mm) y nonlinearity definen la curva fuerza-deflexión axial.
+    """
+    spec = {
+        'format': SYNTHETIC_FORMAT,
+        'n_nodes': int(n_nodes),
+        'n_steps': int(n_steps),
+        'n_load_steps': int(n_load_steps),
+        'seed': int(seed),
+        'end_time': float(end_time),
+        'support_fraction': float(support_fraction),
+        'call_overhead': float(call_overhead),
+        'stroke': float(stroke),
+        'rate': float(rate),
+        'nonlinearity': float(nonlinearity),
+        'components': {**DEFAULT_COMPONENTS, **(components or {})},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    return path
+
+
+def make_synthetic_tree(root, n_projects=4, files_per_project=1, **spec):
+    """
+    Árbol ROOT/<PROYECTO_i>/3_SIMULACION/dp0/SYS/MECH/file.rst con archivos
+    sintéticos (misma estructura que busca process_all_projects).
+    Devuelve la lista ordenada de rutas.
+    """
+    paths = []
+    seed = spec.pop('seed', 0)
+    for i in range(n_projects):
+        for j in range(files_per_project):
+            path = os.path.join(root, f'PROYECTO_{i:03d}', '3_SIMULACION', f'dp{j}', 'SYS', 'MECH', 'file.rst')
+            paths.append(write_synthetic_rst(path, seed=seed + 1000 * i + j, **spec))
+    return sorted(paths)
+
+
+# ----------------------------------------------------------------------
+# OBJETOS CON LA INTERFAZ DE DPF
+# ----------------------------------------------------------------------
+
+class _Scoping:
+    def __init__(self, ids):
+        self.ids = ids
+
+
+class Field:
+    def __init__(self, data, ids, entity_counts=None):
+        self.data = data
+        self.scoping = _Scoping(ids)
+        self._counts = entity_counts
+
+    def get_entity_data_by_id(self, entity_id):
+        index = list(self.scoping.ids).index(entity_id)
+        if self._counts is None:
+            return self.data[index]
+        start = int(sum(self._counts[:index]))
+        return self.data[start:start + self._counts[index]]
+
+    @property
+    def component_count(self):
+        return 1 if self.data.ndim == 1 else self.data.shape[1]
+
+
+class FieldsContainer:
+    def __init__(self, fields_by_time):
+        self._fields = fields_by_time
+
+    def get_label_scoping(self, label="time"):
+        return _Scoping(list(self._fields))
+
+    def get_field(self, label_space):
+        return self._fields[label_space["time"]]
+
+    def __getitem__(self, index):
+        return list(self._fields.values())[index]
+
+    def __len__(self):
+        return len(self._fields)
+
+
+class DataSources:
+    def __init__(self, result_path=None):
+        with open(result_path, encoding='utf-8') as f:
+            spec = json.load(f)
+        if spec.get('format') != SYNTHETIC_FORMAT:
+            raise ValueError(f"'{result_path}' no es un .rst sintético")
+        self.result_path = result_path
+        self.spec = spec
+
+    @property
+    def times(self):
+        n = self.spec['n_steps']
+        return self.spec['end_time'] * np.arange(1, n + 1, dtype=np.float64) / n
+
+    @property
+    def substeps_per_step(self):
+        n, n_load_steps = self.spec['n_steps'], self.spec.get('n_load_steps', 1)
+        counts = [n // n_load_steps] * n_load_steps
+        counts[-1] += n - sum(counts)
+        return counts
+
+
+class _TimeFreqSupport:
+    """
+    Como en DPF: time_frequencies tiene una entidad por paso de carga con un
+    valor de tiempo por subpaso.
+    """
+
+    def __init__(self, times, substeps_per_step):
+        self.n_sets = len(times)
+        self.time_frequencies = Field(times, np.arange(1, len(substeps_per_step) + 1), substeps_per_step)
+
+
+class _Nodes:
+    def __init__(self, spec):
+        n = spec['n_nodes']
+        self.n_nodes = n
+        self.scoping = _Scoping(np.arange(1, n + 1, dtype=np.int32))
+        # Nodos sobre una hélice (solo para que las coordenadas tengan forma de resorte)
+        angle = np.linspace(0.0, 2 * np.pi * 8, n)
+        self.coordinates_field = Field(
+            np.column_stack([50 * np.cos(angle), 50 * np.sin(angle), angle * 5]), self.scoping.ids)
+
+
+class _Elements:
+    def __init__(self, spec):
+        n_nodes = spec['n_nodes']
+        self.n_elements = max(n_nodes // 4, 1)
+        self.scoping = _Scoping(np.arange(1, self.n_elements + 1, dtype=np.int32))
+        # Elementos de 4 nodos consecutivos (índices de nodo base 0, como en DPF)
+        connectivity = np.minimum(np.arange(self.n_elements * 4), n_nodes - 1).astype(np.int32)
+        self.connectivities_field = Field(connectivity, self.scoping.ids, [4] * self.n_elements)
+        self.connectivities_field._data_pointer = np.arange(0, self.n_elements * 4, 4, dtype=np.int32)
+        self.element_types_field = Field(np.full(self.n_elements, 1, dtype=np.int32), self.scoping.ids)
+
+
+class _Mesh:
+    def __init__(self, spec):
+        self.nodes = _Nodes(spec)
+        self.elements = _Elements(spec)
+        self._selections = dict(zip(NAMED_SELECTIONS, _end_nodes(spec)))
+
+    @property
+    def available_named_selections(self):
+        return list(self._selections)
+
+    def named_selection(self, name):
+        return _Scoping(self._selections[name])
+
+
+def _end_nodes(spec):
+    """
+    Nodos de la base (primeros ids) y del tope (últimos ids) del resorte.
+    """
+    n = spec['n_nodes']
+    k = max(int(n * spec['support_fraction'] / 2), 1)
+    return np.arange(1, k + 1, dtype=np.int32), np.arange(n - k + 1, n + 1, dtype=np.int32)
+
+
+def _set_ids(data_source, time_scoping):
+    """
+    Enteros = ids de set; flotantes = valores de tiempo (como en DPF).
+    Sin time_scoping se devuelve el último set.
+    """
+    n = data_source.spec['n_steps']
+    if time_scoping is None:
+        return [n]
+    values = list(np.atleast_1d(time_scoping))
+    if all(isinstance(v, (int, np.integer)) for v in values):
+        return [int(v) for v in values if 1 <= v <= n]
+    times = data_source.times
+    return [int(np.argmin(np.abs(times - float(v)))) + 1 for v in values]
+
+
+class _Outputs:
+    def __init__(self, operator):
+        self._operator = operator
+
+    def fields_container(self):
+        return self._operator._evaluate()
+
+    def mesh(self):
+        return self._operator._evaluate()
+
+    def time_freq_support(self):
+        return self._operator._evaluate()
+
+
+class _Operator:
+    """
+    Operador perezoso: se evalúa al pedir la salida, como en DPF. Cada
+    evaluación suma 'call_overhead' segundos y genera los campos pedidos.
+    """
+    result_name = None
+
+    def __init__(self, data_sources=None, time_scoping=None, requested_location=None, mesh_scoping=None,
+                 **kwargs):
+        self.data_sources = data_sources
+        self.time_scoping = time_scoping
+        self.requested_location = requested_location
+        self.mesh_scoping = mesh_scoping
+        self.outputs = _Outputs(self)
+
+    def _overhead(self):
+        overhead = self.data_sources.spec.get('call_overhead', 0.0)
+        if overhead:
+            time.sleep(overhead)
+
+    def _evaluate(self):
+        self._overhead()
+        spec = self.data_sources.spec
+        n_comp = spec['components'][self.result_name]
+        n_nodes = spec['n_nodes']
+        reaction = self.result_name in REACTION_RESULTS
+        if reaction:
+            bottom, top = _end_nodes(spec)
+            ids = np.concatenate([bottom, top])
+            sign = np.where(ids <= bottom[-1], 1.0, -1.0)
+        else:
+            ids = np.arange(1, n_nodes + 1, dtype=np.int32)
+        # Con mesh_scoping solo se devuelven esos nodos (mismos valores que sin él)
+        keep = slice(None) if self.mesh_scoping is None else np.isin(ids, self.mesh_scoping.ids)
+        times = self.data_sources.times
+
+        fields = {}
+        for set_id in _set_ids(self.data_sources, self.time_scoping):
+            rng = np.random.default_rng([spec['seed'], set_id, n_comp, len(ids)])
+            fraction = times[set_id - 1] / times[-1]
+            data = rng.standard_normal((len(ids), n_comp)) * fraction
+            deflection = spec.get('stroke', 0.0) * fraction
+            if self.result_name == 'displacement':
+                data[:, 2] -= deflection * (ids - 1) / max(n_nodes - 1, 1)
+            elif reaction:
+                force = spec.get('rate', 0.0) * deflection * (1 + spec.get('nonlinearity', 0.0) * fraction)
+                data[:, 2] += sign * force / (len(ids) / 2)
+            fields[set_id] = Field(data[keep], ids[keep])
+        return FieldsContainer(fields)
+
+
+def _result_operator(name):
+    return type(name, (_Operator,), {'result_name': name})
+
+
+class _MeshProvider(_Operator):
+    def _evaluate(self):
+        self._overhead()
+        return _Mesh(self.data_sources.spec)
+
+
+class _TimeFreqProvider(_Operator):
+    def _evaluate(self):
+        self._overhead()
+        return _TimeFreqSupport(self.data_sources.times, self.data_sources.substeps_per_step)
+
+
+# ----------------------------------------------------------------------
+# REGISTRO COMO ansys.dpf.core
+# ----------------------------------------------------------------------
+
+def _build_modules():
+    operators = types.ModuleType('ansys.dpf.core.operators')
+    operators.result = types.SimpleNamespace(
+        displacement=_result_operator('displacement'),
+        stress=_result_operator('stress'),
+        reaction_force=_result_operator('reaction_force'),
+        support_reaction=_result_operator('support_reaction'),
+        nodal_force=_result_operator('nodal_force'),
+    )
+    operators.mesh = types.SimpleNamespace(mesh_provider=_MeshProvider)
+    operators.metadata = types.SimpleNamespace(time_freq_provider=_TimeFreqProvider)
+
+    core = types.ModuleType('ansys.dpf.core')
+    core.__synthetic__ = True
+    core.operators = operators
+    core.DataSources = DataSources
+    core.Field = Field
+    core.FieldsContainer = FieldsContainer
+    core.locations = types.SimpleNamespace(nodal='Nodal', elemental='Elemental',
+                                           elemental_nodal='ElementalNodal')
+
+    dpf_pkg = types.ModuleType('ansys.dpf')
+    dpf_pkg.core = core
+    ansys = types.ModuleType('ansys')
+    ansys.dpf = dpf_pkg
+    return {'ansys': ansys, 'ansys.dpf': dpf_pkg, 'ansys.dpf.core': core,
+            'ansys.dpf.core.operators': operators}
+
+
+def install():
+    """
+    Registra el backend sintético como ansys.dpf.core. Falla si el DPF real ya
+    fue importado en este proceso (los módulos de extracción ya lo tendrían).
+    """
+    current = sys.modules.get('ansys.dpf.core')
+    if current is not None:
+        if getattr(current, '__synthetic__', False):
+            return current
+        raise RuntimeError("ansys.dpf.core ya está importado; install() debe llamarse antes.")
+    sys.modules.update(_build_modules())
+    return sys.modules['ansys.dpf.core']
+
+
+def is_installed():
+    return getattr(sys.modules.get('ansys.dpf.core'), '__synthetic__', False)
@@ -0,0 +1,153 @@
+import os
+
+# ----------------------------------------------------------------------
+# CAPA DE ESCRITURA DE RESULTADOS (PARQUET POR DEFECTO, CSV OPCIONAL)
+# ----------------------------------------------------------------------
+# Todos los scripts de extracción guardan sus tablas con write_dataset().
+# Parquet es el formato por defecto: columnar, tipado y comprimido. El CSV con
+# ';' se mantiene para quien necesite abrir los datos en Excel.
+
+# Esquema explícito de las columnas conocidas. Las columnas que no aparecen
+# aquí se guardan con el tipo que traiga el DataFrame.
+SCHEMA = {
+    # Identificadores (codificados como diccionario: se repiten en cada fila)
+    'Proyecto': 'category',
+    'RST_Source': 'category',
+    # Tiempo y pasos
+    'Tiempo': 'float64',
+    'Paso_Carga': 'int32',
+    'Subpaso': 'int32',
+    'Set': 'int32',
+    'Paso_Tiempo': 'int32',
+    # Ids de nodo
+    'Node_ID': 'int32',
+    'Nodo_Max_Desplazamiento': 'int32',
+    'Nodo_Max_Von_Mises': 'int32',
+    'Nodo_Max_Principal': 'int32',
+    # Campos de resultados
+    'Max_Desplazamiento': 'float32',
+    'Max_Von_Mises': 'float32',
+    'Max_Principal': 'float32',
+    'Total_Reaction_Force_Norm': 'float32',
+    'Despl_X': 'float32',
+    'Despl_Y': 'float32',
+    'Despl_Z': 'float32',
+    'S_XX': 'float32',
+    'S_YY': 'float32',
+    'S_ZZ': 'float32',
+    'S_XY': 'float32',
+    'S_YZ': 'float32',
+    'S_XZ': 'float32',
+    'F_X': 'float32',
+    'F_Y': 'float32',
+    'F_Z': 'float32',
+}
+
+DEFAULT_FORMAT = 'parquet'
+DEFAULT_COMPRESSION = 'zstd'
+
+
+def apply_schema(df, schema=SCHEMA):
+    """
+    Convierte las columnas conocidas al tipo del esquema. Devuelve un DataFrame nuevo.
+    """
+    casts = {column: dtype for column, dtype in schema.items() if column in df.columns}
+    return df.astype(casts)
+
+
+class CsvWriter:
+    """
+    Escritor CSV compatible con Excel (separador ';' y punto decimal).
+    """
+    extension = '.csv'
+
+    def __init__(self, sep=';', decimal='.', encoding='utf-8', **_):
+        self.sep = sep
+        self.decimal = decimal
+        self.encoding = encoding
+
+    def write(self, df, path):
+        df.to_csv(path, index=False, sep=self.sep, decimal=self.decimal, encoding=self.encoding)
+        return path
+
+
+class ParquetWriter:
+    """
+    Escritor Parquet con esquema tipado. Con partition_cols (por ejemplo
+    ['Proyecto']) 'path' es una carpeta con una subcarpeta por valor.
+    """
+    extension = '.parquet'
+
+    def __init__(self, compression=DEFAULT_COMPRESSION, partition_cols=None, schema=SCHEMA, **_):
+        self.compression = compression
+        self.partition_cols = list(partition_cols) if partition_cols else None
+        self.schema = schema
+
+    def write(self, df, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Para escribir Parquet se necesita 'pyarrow' (pip install pyarrow) "
+                              "o usar el formato 'csv'.") from e
+
+        table = pa.Table.from_pandas(apply_schema(df, self.schema), preserve_index=False)
+        if self.partition_cols:
+            pq.write_to_dataset(table, root_path=path, partition_cols=self.partition_cols,
+                                compression=self.compression, existing_data_behavior='delete_matching')
+        else:
+            pq.write_table(table, path, compression=self.compression)
+        return path
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def get_writer(fmt=DEFAULT_FORMAT, **options):
+    try:
+        return WRITERS[fmt](**options)
+    except KeyError:
+        raise ValueError(f"Formato de salida desconocido: '{fmt}'. Opciones: {sorted(WRITERS)}")
+
+
+def output_path(path, fmt):
+    """
+    Ajusta la extensión de 'path' al formato elegido (dataset_para_ia.csv -> .parquet).
+    """
+    root, ext = os.path.splitext(path)
+    extension = WRITERS[fmt].extension
+    return path if ext == extension else root + extension
+
+
+def write_dataset(df, path, fmt=DEFAULT_FORMAT, **options):
+    """
+    Escribe un DataFrame con el escritor elegido y devuelve la ruta final.
+    Los archivos únicos se escriben en '<ruta>.tmp' y se renombran al final: una
+    caída a mitad de la escritura no deja un dataset truncado.
+    """
+    writer = get_writer(fmt, **options)
+    path = output_path(path, fmt)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if getattr(writer, 'partition_cols', None):
+        return writer.write(df, path)
+    tmp_path = path + '.tmp'
+    writer.write(df, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_dataset(path):
+    """
+    Lee un dataset escrito con write_dataset (CSV, archivo Parquet o carpeta particionada).
+    """
+    import pandas as pd
+
+    if path.endswith('.csv'):
+        return pd.read_csv(path, sep=';', decimal='.', encoding='utf-8')
+    return pd.read_parquet(path)
+
@@ -0,0 +1,202 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from soporte_tiempo import read_time_support
+
+# ----------------------------------------------------------------------
+# EXPORTACIÓN NODAL EN STREAMING (UN PASO DE TIEMPO EN MEMORIA A LA VEZ)
+# ----------------------------------------------------------------------
+# En lugar de guardar un DataFrame por paso y unirlos al final con pd.concat,
+# cada paso se pide a DPF por separado y se escribe directamente en disco:
+#   - 'npy': cubo memory-mapped de forma (pasos, nodos, componentes)
+#   - 'parquet': archivo Parquet con un row group por paso
+# La memoria máxima queda en un paso, sin importar cuántos pasos tenga el análisis.
+
+# Resultados soportados: nombre del operador en ops.result, nombres de columnas
+# y ubicación pedida (atributo de dpf.locations). Se guardan como texto para no
+# importar DPF al importar este módulo; se resuelven en stream_nodal_result.
+NODAL_RESULTS = {
+    'displacement': {
+        'operator': 'displacement',
+        'columns': ['Despl_X', 'Despl_Y', 'Despl_Z'],
+        'location': None,
+    },
+    'stress': {
+        'operator': 'stress',
+        'columns': ['S_XX', 'S_YY', 'S_ZZ', 'S_XY', 'S_YZ', 'S_XZ'],
+        'location': 'nodal',
+    },
+    'nodal_force': {
+        'operator': 'nodal_force',
+        'columns': ['F_X', 'F_Y', 'F_Z'],
+        'location': 'nodal',
+    },
+}
+
+
+class NpyCubeSink:
+    """
+    Escribe cada paso en un cubo .npy memory-mapped (pasos, nodos, componentes).
+    El orden de nodos lo fija el primer paso (o 'node_ids' si se da, por ejemplo
+    el orden de la malla) y se guarda en '<archivo>_node_ids.npy'; los pasos se
+    reordenan a ese orden (nodos ausentes quedan en NaN).
+    """
+
+    def __init__(self, path, n_steps, columns, dtype=np.float32, node_ids=None):
+        self.path = path
+        self.n_steps = n_steps
+        self.columns = columns
+        self.dtype = dtype
+        self.cube = None
+        self.node_ids = None if node_ids is None else np.asarray(node_ids, dtype=np.int32)
+        self._sorter = None
+        self.times = np.full(n_steps, np.nan)
+
+    def write_step(self, step_index, time_value, node_ids, data):
+        if self.cube is None:
+            if self.node_ids is None:
+                self.node_ids = np.asarray(node_ids, dtype=np.int32)
+            self._sorter = np.argsort(self.node_ids)
+            self.cube = np.lib.format.open_memmap(
+                self.path, mode='w+', dtype=self.dtype,
+                shape=(self.n_steps, len(self.node_ids), len(self.columns)))
+            self.cube[:] = np.nan
+            np.save(os.path.splitext(self.path)[0] + '_node_ids.npy', self.node_ids)
+
+        self.times[step_index] = time_value
+        if np.array_equal(node_ids, self.node_ids):
+            self.cube[step_index] = data
+            return
+
+        # Reordenar al orden de nodos del primer paso (vectorizado)
+        node_ids = np.asarray(node_ids)
+        positions = np.searchsorted(self.node_ids, node_ids, sorter=self._sorter)
+        positions = np.clip(positions, 0, len(self.node_ids) - 1)
+        positions = self._sorter[positions]
+        known = self.node_ids[positions] == node_ids
+
+        block = np.full((len(self.node_ids), len(self.columns)), np.nan, dtype=self.dtype)
+        block[positions[known]] = data[known]
+        self.cube[step_index] = block
+
+    def close(self):
+        if self.cube is None:
+            return
+        self.cube.flush()
+        del self.cube
+        self.cube = None
+        meta_path = os.path.splitext(self.path)[0] + '_meta.json'
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'columns': self.columns, 'times': self.times.tolist()}, f, indent=1)
+
+
+class ParquetStreamSink:
+    """
+    Agrega cada paso como un row group de un archivo Parquet
+    (columnas Paso_Tiempo, Tiempo, Node_ID y las del resultado).
+    """
+
+    def __init__(self, path, n_steps, columns, compression='zstd'):
+        self.path = path
+        self.columns = columns
+        self.compression = compression
+        self.writer = None
+
+    def write_step(self, step_index, time_value, node_ids, data):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({
+            'Paso_Tiempo': pa.array(np.full(len(node_ids), step_index + 1, dtype=np.int32)),
+            'Tiempo': pa.array(np.full(len(node_ids), time_value, dtype=np.float64)),
+            'Node_ID': pa.array(np.asarray(node_ids, dtype=np.int32)),
+            **{column: pa.array(np.asarray(data[:, i], dtype=np.float32))
+               for i, column in enumerate(self.columns)},
+        })
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+SINKS = {
+    'npy': NpyCubeSink,
+    'parquet': ParquetStreamSink,
+}
+
+
+def stream_nodal_result(data_source, output_file, result='displacement', sink='parquet',
+                        set_ids=None, time_values=None, mesh=None, **sink_options):
+    """
+    Exporta un resultado nodal paso a paso.
+
+    - data_source: dpf.DataSources (o ruta al .rst)
+    - result: 'displacement' o 'stress'
+    - sink: 'parquet' (archivo con un row group por paso) o 'npy' (cubo memory-mapped)
+    - set_ids: ids de set a exportar (por defecto todos los del archivo)
+    - time_values: tiempos de cada set (por defecto los del soporte de tiempo)
+    - mesh: malla ya leída (ver cache_mallas.py); se pasa a cada operador
+    - sink_options: argumentos extra del escritor (por ejemplo node_ids para 'npy')
+
+    Devuelve la ruta del archivo escrito.
+    """
+    from ansys.dpf import core as dpf
+    from ansys.dpf.core import operators as ops
+
+    if isinstance(data_source, str):
+        data_source = dpf.DataSources(data_source)
+    spec = NODAL_RESULTS[result]
+    operator = getattr(ops.result, spec['operator'])
+    kwargs = {} if mesh is None else {'mesh': mesh}
+    if spec['location'] is not None:
+        kwargs['requested_location'] = getattr(dpf.locations, spec['location'])
+
+    if set_ids is None or time_values is None:
+        support = read_time_support(data_source)
+        if set_ids is None:
+            set_ids = support.scoping()
+        if time_values is None:
+            time_values = support.times_of(set_ids)
+
+    writer = SINKS[sink](output_file, len(set_ids), spec['columns'], **sink_options)
+    try:
+        for step_index, (set_id, time_value) in enumerate(zip(set_ids, time_values)):
+            # Solo se evalúa este set: en memoria hay un único campo a la vez
+            op = operator(data_sources=data_source, time_scoping=[int(set_id)], **kwargs)
+            field = op.outputs.fields_container()[0]
+            data = np.asarray(field.data).reshape(-1, len(spec['columns']))
+            writer.write_step(step_index, float(time_value), field.scoping.ids, data)
+            del op, field, data
+    finally:
+        writer.close()
+    return output_file
+
+
+def load_npy_cube(path, mmap_mode='r'):
+    """
+    Abre un cubo exportado con NpyCubeSink sin cargarlo en memoria.
+    Devuelve (cubo, node_ids, metadatos).
+    """
+    base = os.path.splitext(path)[0]
+    cube = np.load(path, mmap_mode=mmap_mode)
+    node_ids = np.load(base + '_node_ids.npy')
+    with open(base + '_meta.json', encoding='utf-8') as f:
+        meta = json.load(f)
+    return cube, node_ids, meta
+
+
+def npy_cube_to_frame(path, step_index):
+    """
+    Un paso del cubo como DataFrame (Node_ID + componentes), útil para revisar datos.
+    """
+    cube, node_ids, meta = load_npy_cube(path)
+    df = pd.DataFrame(np.asarray(cube[step_index]), columns=meta['columns'])
+    df.insert(0, 'Node_ID', node_ids)
+    return df
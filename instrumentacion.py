@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import subprocess
+from contextlib import contextmanager, nullcontext
+
+# ----------------------------------------------------------------------
+# INSTRUMENTACIÓN DE LA EXTRACCIÓN (TIEMPOS, MEMORIA, E/S Y OPERADORES)
+# ----------------------------------------------------------------------
+# Se activa con enable() (o --profile en la línea de comandos). Cuando está
+# apagada, stage() devuelve un contexto vacío y no mide nada.
+#
+# Por cada archivo .rst se registra:
+#   - tiempo total y por etapa (mesh_provider, time_freq_support, displacement, ...)
+#   - número de evaluaciones de operadores DPF por etapa. Son las DECLARADAS
+#     en cada stage(..., evaluations=n) del código de extracción, no un conteo
+#     hecho por DPF: si el código cambia sin actualizar n, el número miente
+#   - RSS máximo del proceso desde que arrancó (peak_rss_proceso_mb: en un
+#     proceso del pool incluye los archivos anteriores), la variación de RSS
+#     durante el archivo (rss_delta_mb) y bytes leídos de disco
+# Nota: con un servidor DPF en otro proceso (gRPC) la lectura del .rst ocurre
+# en el servidor y no aparece en los bytes leídos de este proceso.
+
+_ACTIVE = None
+
+
+def _peak_rss_mb():
+    """
+    RSS máximo del proceso desde que arrancó (MB). En Linux y macOS sale de
+    getrusage; en Windows de psutil (peak_wset). El rss actual de psutil no
+    sirve: no ve el pico dentro del archivo.
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux lo da en KB, macOS en bytes
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+    except ImportError:
+        pass
+    try:
+        import psutil
+        peak = getattr(psutil.Process().memory_info(), 'peak_wset', None)
+        return peak / 2 ** 20 if peak is not None else None
+    except ImportError:
+        return None
+
+
+def _rss_mb():
+    """
+    RSS actual del proceso (MB): psutil o, sin él, /proc/self/statm (Linux).
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _bytes_read():
+    try:
+        import psutil
+        return psutil.Process().io_counters().read_bytes
+    except (ImportError, AttributeError):
+        pass
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('read_bytes:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class ExtractionProfiler:
+    """
+    Registros por archivo de la extracción. Uso:
+
+        profiler.start_file(rst_path)
+        with profiler.stage('displacement', evaluations=1):
+            ...
+        profiler.end_file(status='ok', rows=24)
+    """
+
+    def __init__(self):
+        self.records = []
+        self._current = None
+
+    def start_file(self, rst_path):
+        try:
+            size = os.path.getsize(rst_path)
+        except OSError:
+            size = None
+        self._current = {
+            'rst_path': rst_path,
+            'pid': os.getpid(),
+            'file_bytes': size,
+            'stages': {},
+            '_start': time.perf_counter(),
+            '_io_start': _bytes_read(),
+            '_rss_start': _rss_mb(),
+        }
+
+    @contextmanager
+    def stage(self, name, evaluations=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._current is not None:
+                entry = self._current['stages'].setdefault(name, {'seconds': 0.0, 'evaluations': 0})
+                entry['seconds'] += time.perf_counter() - start
+                entry['evaluations'] += evaluations
+
+    def end_file(self, status='ok', rows=0):
+        record, self._current = self._current, None
+        if record is None:
+            return None
+        io_start = record.pop('_io_start')
+        io_end = _bytes_read()
+        record['seconds'] = time.perf_counter() - record.pop('_start')
+        record['bytes_read'] = io_end - io_start if io_start is not None and io_end is not None else None
+        rss_start, rss_end = record.pop('_rss_start'), _rss_mb()
+        record['rss_delta_mb'] = rss_end - rss_start if rss_start is not None and rss_end is not None else None
+        record['peak_rss_proceso_mb'] = _peak_rss_mb()
+        record['evaluations'] = sum(s['evaluations'] for s in record['stages'].values())
+        record['status'] = status
+        record['rows'] = rows
+        record['finished_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.records.append(record)
+        return record
+
+    def pop_records(self):
+        records, self.records = self.records, []
+        return records
+
+
+def enable():
+    global _ACTIVE
+    if _ACTIVE is None:
+        _ACTIVE = ExtractionProfiler()
+    return _ACTIVE
+
+
+def disable():
+    global _ACTIVE
+    _ACTIVE = None
+
+
+def active():
+    return _ACTIVE
+
+
+def stage(name, evaluations=0):
+    """
+    Contexto de medición de una etapa; no hace nada si la instrumentación está apagada.
+    """
+    if _ACTIVE is None or _ACTIVE._current is None:
+        return nullcontext()
+    return _ACTIVE.stage(name, evaluations)
+
+
+def start_file(rst_path):
+    if _ACTIVE is not None:
+        _ACTIVE.start_file(rst_path)
+
+
+def end_file(status='ok', rows=0):
+    if _ACTIVE is not None:
+        return _ACTIVE.end_file(status, rows)
+    return None
+
+
+def pop_records():
+    return _ACTIVE.pop_records() if _ACTIVE is not None else []
+
+
+# ----------------------------------------------------------------------
+# REGISTRO JSON-LINES Y RESUMEN
+# ----------------------------------------------------------------------
+
+def git_revision():
+    """
+    (commit corto, True si hay cambios sin confirmar) o (None, None) fuera de git.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        return commit, bool(status)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def write_run_log(records, log_path, run_info=None):
+    """
+    Agrega los registros al archivo JSON-lines (un objeto por línea). La primera
+    línea de cada ejecución es un registro 'run' con los parámetros usados.
+    """
+    with open(log_path, 'a', encoding='utf-8') as f:
+        if run_info is not None:
+            f.write(json.dumps({'type': 'run', **run_info}, ensure_ascii=False) + '\n')
+        for record in records:
+            f.write(json.dumps({'type': 'file', **record}, ensure_ascii=False) + '\n')
+
+
+def read_run_log(log_path):
+    with open(log_path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """
+    Tabla por etapa: tiempo total, medio y máximo por archivo, y evaluaciones
+    declaradas (ver stage()).
+    """
+    import pandas as pd
+
+    rows = [{'Etapa': name, 'Archivo': r['rst_path'], 'Segundos': s['seconds'],
+             'Evaluaciones': s['evaluations']}
+            for r in records for name, s in r['stages'].items()]
+    if not rows:
+        return pd.DataFrame(columns=['Etapa', 'Total_s', 'Medio_s', 'Max_s', 'Evaluaciones', '%'])
+
+    df = pd.DataFrame(rows)
+    table = df.groupby('Etapa', sort=False).agg(
+        Total_s=('Segundos', 'sum'), Medio_s=('Segundos', 'mean'),
+        Max_s=('Segundos', 'max'), Evaluaciones=('Evaluaciones', 'sum')).reset_index()
+    table['%'] = 100 * table['Total_s'] / table['Total_s'].sum()
+    return table.sort_values('Total_s', ascending=False)
+
+
+def print_summary(records, slowest=5):
+    if not records:
+        print("Instrumentación: no hay registros.")
+        return
+    table = summarize(records)
+    total = sum(r['seconds'] for r in records)
+    # Los registros anteriores al cambio de nombre traen 'peak_rss_mb'
+    peak = max((r.get('peak_rss_proceso_mb', r.get('peak_rss_mb')) or 0) for r in records)
+    deltas = [r['rss_delta_mb'] for r in records if r.get('rss_delta_mb') is not None]
+    read = [r['bytes_read'] for r in records if r['bytes_read'] is not None]
+    evaluations = sum(r['evaluations'] for r in records)
+
+    print("\n" + "=" * 50)
+    print(f"Instrumentación: {len(records)} archivos, {total:.1f} s de extracción, "
+          f"{evaluations} evaluaciones de operadores (declaradas en cada etapa, no contadas por DPF)")
+    print(f"RSS máximo del proceso (desde su arranque): {peak:.0f} MB"
+          + (f" | Mayor aumento de RSS en un archivo: {max(deltas):.0f} MB" if deltas else "")
+          + (f" | Leído de disco: {sum(read) / 2 ** 20:.1f} MB" if read else ""))
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print("\nArchivos más lentos:")
+    for r in sorted(records, key=lambda r: r['seconds'], reverse=True)[:slowest]:
+        print(f"  {r['seconds']:8.2f} s  {r['status']:>6}  {r['rst_path']}")
+    print("=" * 50)
+
+
+def last_run(entries):
+    """
+    Registros de archivo de la última ejecución de un registro JSON-lines.
+    """
+    starts = [i for i, entry in enumerate(entries) if entry.get('type') == 'run']
+    start = starts[-1] + 1 if starts else 0
+    return [entry for entry in entries[start:] if entry.get('type') == 'file']
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resumen de un registro de instrumentación de la extracción.")
+    parser.add_argument("log", nargs="?", default="registro_extraccion.jsonl", help="Registro JSON-lines")
+    parser.add_argument("--all", action="store_true", help="Todas las ejecuciones, no solo la última")
+    parser.add_argument("--slowest", type=int, default=5, help="Archivos más lentos a mostrar")
+    args = parser.parse_args(argv)
+
+    entries = read_run_log(args.log)
+    records = [e for e in entries if e.get('type') == 'file'] if args.all else last_run(entries)
+    print_summary(records, slowest=args.slowest)
+
+
+if __name__ == "__main__":
+    main()
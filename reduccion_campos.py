@@ -0,0 +1,108 @@
+import numpy as np
+
+# ----------------------------------------------------------------------
+# REDUCCIONES ESCALARES DE CAMPOS NODALES (VECTORIZADAS)
+# ----------------------------------------------------------------------
+# Todas las funciones trabajan sobre arreglos apilados de forma
+# (pasos, nodos, componentes) sin bucles de Python por nodo.
+# El tensor de esfuerzos de DPF tiene 6 componentes en el orden
+# XX, YY, ZZ, XY, YZ, XZ.
+
+
+def stack_fields(fields_container):
+    """
+    Apila los campos de un FieldsContainer (un campo por subpaso) en un arreglo
+    de forma (pasos, entidades, componentes), ordenado por el id de subpaso,
+    junto con los ids de nodo de cada posición (pasos, entidades).
+    Si algún subpaso tiene menos entidades, las posiciones sobrantes quedan en NaN
+    (id -1) para poder reducir con NumPy sin bucles por nodo.
+    """
+    time_ids = sorted(fields_container.get_label_scoping("time").ids)
+    arrays = []
+    id_arrays = []
+    for time_id in time_ids:
+        field = fields_container.get_field({"time": time_id})
+        data = np.asarray(field.data, dtype=np.float64)
+        arrays.append(data.reshape(data.shape[0], -1))
+        id_arrays.append(np.asarray(field.scoping.ids, dtype=np.int64))
+
+    n_entities = max(a.shape[0] for a in arrays)
+    n_components = max(a.shape[1] for a in arrays)
+    stacked = np.full((len(arrays), n_entities, n_components), np.nan)
+    ids = np.full((len(arrays), n_entities), -1, dtype=np.int64)
+    for i, (data, entity_ids) in enumerate(zip(arrays, id_arrays)):
+        stacked[i, :data.shape[0], :data.shape[1]] = data
+        ids[i, :entity_ids.shape[0]] = entity_ids
+    return time_ids, stacked, ids
+
+
+def displacement_norm(displacement):
+    """
+    Norma del vector desplazamiento por nodo: (..., 3) -> (...).
+    """
+    return np.linalg.norm(displacement, axis=-1)
+
+
+def von_mises(stress):
+    """
+    Esfuerzo equivalente de Von Mises por nodo: (..., 6) -> (...).
+    """
+    sxx, syy, szz, sxy, syz, sxz = np.moveaxis(stress, -1, 0)
+    return np.sqrt(0.5 * ((sxx - syy) ** 2 + (syy - szz) ** 2 + (szz - sxx) ** 2)
+                   + 3.0 * (sxy ** 2 + syz ** 2 + sxz ** 2))
+
+
+def principal_stresses(stress):
+    """
+    Esfuerzos principales por nodo, ordenados de menor a mayor: (..., 6) -> (..., 3).
+    Los nodos con NaN (relleno de stack_fields) devuelven NaN.
+    """
+    sxx, syy, szz, sxy, syz, sxz = np.moveaxis(stress, -1, 0)
+    tensor = np.stack([
+        np.stack([sxx, sxy, sxz], axis=-1),
+        np.stack([sxy, syy, syz], axis=-1),
+        np.stack([sxz, syz, szz], axis=-1),
+    ], axis=-2)
+
+    valid = np.isfinite(tensor).all(axis=(-1, -2))
+    result = np.full(stress.shape[:-1] + (3,), np.nan)
+    result[valid] = np.linalg.eigvalsh(tensor[valid])
+    return result
+
+
+def max_with_ids(values, ids):
+    """
+    Máximo por paso y el id del nodo donde ocurre.
+    values e ids tienen forma (pasos, nodos); los NaN se ignoran.
+    Devuelve (máximos, ids) de forma (pasos,). Un paso sin datos da NaN e id -1.
+    """
+    filled = np.where(np.isnan(values), -np.inf, values)
+    position = np.argmax(filled, axis=1)
+    steps = np.arange(values.shape[0])
+    maxima = filled[steps, position]
+    node_ids = ids[steps, position].astype(np.int64)
+
+    empty = np.isneginf(maxima)
+    maxima = np.where(empty, np.nan, maxima)
+    node_ids[empty] = -1
+    return maxima, node_ids
+
+
+def reduce_results(disp, disp_ids, stress, stress_ids):
+    """
+    Etapa de reducción completa para un archivo: recibe los arreglos apilados de
+    desplazamiento (pasos, nodos, 3) y esfuerzo (pasos, nodos, 6) con sus ids de
+    nodo (pasos, nodos) y devuelve un dict de columnas escalares por paso.
+    """
+    max_disp, max_disp_node = max_with_ids(displacement_norm(disp), disp_ids)
+    max_vm, max_vm_node = max_with_ids(von_mises(stress), stress_ids)
+    max_principal, max_principal_node = max_with_ids(principal_stresses(stress)[..., -1], stress_ids)
+
+    return {
+        'Max_Desplazamiento': max_disp,
+        'Nodo_Max_Desplazamiento': max_disp_node,
+        'Max_Von_Mises': max_vm,
+        'Nodo_Max_Von_Mises': max_vm_node,
+        'Max_Principal': max_principal,
+        'Nodo_Max_Principal': max_principal_node,
+    }
@@ -0,0 +1,60 @@
+import sys
+import importlib
+
+# ----------------------------------------------------------------------
+# PUNTO DE ENTRADA ÚNICO DE LA LÍNEA DE COMANDOS
+# ----------------------------------------------------------------------
+#   python resortes.py <comando> [argumentos del comando]
+#   python resortes.py extraer --help
+#
+# Cada comando vive en su propio módulo (función main(argv)) y el módulo solo
+# se importa cuando se ejecuta ese comando. PyAnsys (DPF) y pandas se importan
+# dentro de las funciones que los necesitan, así que --help, 'descubrir' y
+# 'cache' arrancan sin cargarlos.
+
+# comando -> (módulo, descripción)
+COMMANDS = {
+    'extraer': ('Extraccion_datos3', "Extraer resultados de los .rst al dataset (usa DPF)"),
+    'descubrir': ('descubrimiento', "Listar los .rst encontrados o los cambios del último escaneo"),
+    'cache': ('cache_extraccion', "Consultar o reexportar el caché de extracción (sin DPF)"),
+    'perfil': ('instrumentacion', "Resumen de un registro de instrumentación (--profile)"),
+    'validar': ('validacion_dataset', "Control de calidad de un dataset y cuarentena por proyecto"),
+    'curvas': ('curvas_fuerza', "Curvas fuerza-deflexión y ajuste de la rata (usa DPF)"),
+    'almacen': ('almacen_campos', "Construir el almacén de campos nodales (usa DPF)"),
+    'comprimir': ('compresion_campos', "Comprimir el almacén de campos para distribuirlo (sin DPF)"),
+    'datos': ('carga_datos', "Cargar y cachear DATIS.xlsm y DataSet.xlsx"),
+    'surrogado': ('surrogado', "Entrenar, servir o medir el modelo sustituto"),
+    'barrido': ('barrido_disenos', "Barrido del espacio de diseño y frente de Pareto"),
+    'entrenar': ('banco_entrenamiento', "Validación cruzada por proyecto y rendimiento por familia de modelos"),
+    'activo': ('aprendizaje_activo', "Cola priorizada de resortes a simular (aprendizaje activo)"),
+    'diario': ('diario_extraccion', "Estado del diario de extracción (reanudación tras una caída)"),
+    'banco': ('banco_pruebas', "Banco de pruebas de la extracción con un DPF sintético"),
+}
+
+
+def usage():
+    lines = ["uso: resortes.py <comando> [argumentos]", "", "comandos:"]
+    width = max(len(name) for name in COMMANDS)
+    lines += [f"  {name:<{width}}  {description}" for name, (_, description) in COMMANDS.items()]
+    lines += ["", "Ayuda de un comando: resortes.py <comando> --help"]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Comando desconocido: '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module = importlib.import_module(COMMANDS[command][0])
+    # argparse del módulo muestra 'resortes.py <comando>' en la ayuda
+    sys.argv[0] = f"resortes.py {command}"
+    return module.main(rest) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import numpy as np
+
+# ----------------------------------------------------------------------
+# SOPORTE DE TIEMPO DE UN .rst (SETS, PASOS DE CARGA, SUBPASOS Y TIEMPOS)
+# ----------------------------------------------------------------------
+# DPF identifica cada resultado guardado con un id de set acumulado (1..n_sets),
+# que es lo que espera time_scoping cuando se le pasan enteros. Cada set
+# pertenece a un paso de carga y es un subpaso dentro de él:
+#
+#   set       1    2    3  ...  12 |  13   14  ...
+#   paso      1    1    1  ...   1 |   2    2  ...
+#   subpaso   1    2    3  ...  12 |   1    2  ...
+#   tiempo  0.08 0.17 0.25 ... 1.0 | 1.08 1.17 ...
+#
+# El soporte se lee UNA vez por archivo (time_freq_provider) y con él se pide
+# exactamente la lista de sets que existen, en una sola evaluación.
+
+OUTPUT_COLUMNS = ('Paso_Carga', 'Subpaso', 'Set', 'Tiempo')
+
+
+class TimeSupport:
+    """
+    Sets de un archivo de resultados con su paso de carga, subpaso y tiempo.
+
+        support = read_time_support(data_source)
+        support.scoping()                 # [1, 2, ..., n_sets] para time_scoping
+        support.scoping(load_step=2)      # solo los sets del paso de carga 2
+        support.columns(set_ids)          # Paso_Carga, Subpaso, Set, Tiempo por set
+    """
+
+    def __init__(self, times, substeps_per_step=None, step_ids=None):
+        times = np.asarray(times, dtype=np.float64).ravel()
+        counts = None if substeps_per_step is None else np.asarray(substeps_per_step, dtype=np.int64)
+        if counts is None or counts.sum() != len(times):
+            # Sin información de pasos de carga: un solo paso con todos los sets
+            counts = np.array([len(times)], dtype=np.int64)
+            step_ids = None
+        if step_ids is None or len(step_ids) != len(counts):
+            step_ids = np.arange(1, len(counts) + 1)
+
+        starts = np.cumsum(counts) - counts
+        self.times = times
+        self.set_ids = np.arange(1, len(times) + 1, dtype=np.int32)
+        self.load_steps = np.repeat(np.asarray(step_ids, dtype=np.int32), counts)
+        self.substeps = (np.arange(len(times)) - np.repeat(starts, counts) + 1).astype(np.int32)
+
+    @classmethod
+    def from_dpf(cls, time_freq_support):
+        """
+        Construye el soporte desde un TimeFreqSupport de DPF. El campo
+        time_frequencies tiene una entidad por paso de carga con un valor por
+        subpaso; si no se puede leer así, se asume un único paso de carga.
+        """
+        field = time_freq_support.time_frequencies
+        times = np.asarray(field.data, dtype=np.float64).ravel()
+        step_ids, counts = None, None
+        try:
+            step_ids = [int(i) for i in field.scoping.ids]
+            counts = [np.atleast_1d(field.get_entity_data_by_id(i)).size for i in step_ids]
+        except Exception:
+            pass
+        return cls(times, counts, step_ids)
+
+    @classmethod
+    def single(cls, time_value=np.nan):
+        """
+        Soporte de un solo set (análisis estático o soporte ilegible).
+        """
+        return cls([time_value])
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['times'], data.get('substeps_per_step'), data.get('step_ids'))
+
+    def to_dict(self):
+        step_ids, counts = np.unique(self.load_steps, return_counts=True)
+        return {'times': self.times.tolist(), 'substeps_per_step': counts.tolist(),
+                'step_ids': step_ids.tolist()}
+
+    @property
+    def n_sets(self):
+        return len(self.set_ids)
+
+    @property
+    def n_load_steps(self):
+        return len(np.unique(self.load_steps))
+
+    def __len__(self):
+        return self.n_sets
+
+    def _positions(self, set_ids):
+        positions = np.asarray(set_ids, dtype=np.int64).ravel() - 1
+        if positions.size and (positions.min() < 0 or positions.max() >= self.n_sets):
+            raise ValueError(f"Sets fuera de rango (1..{self.n_sets}): {list(set_ids)}")
+        return positions
+
+    def scoping(self, load_step=None, last_substep_only=False):
+        """
+        Lista de ids de set (enteros de Python, como los acepta time_scoping).
+        - load_step: solo los sets de ese paso de carga
+        - last_substep_only: solo el último subpaso de cada paso de carga
+        """
+        mask = np.ones(self.n_sets, dtype=bool)
+        if load_step is not None:
+            mask &= self.load_steps == load_step
+        if last_substep_only:
+            mask &= np.append(self.load_steps[1:] != self.load_steps[:-1], True)
+        return self.set_ids[mask].tolist()
+
+    def cumulative_index(self, load_step, substep):
+        """
+        Id de set acumulado de (paso de carga, subpaso).
+        """
+        match = np.flatnonzero((self.load_steps == load_step) & (self.substeps == substep))
+        if not match.size:
+            raise KeyError(f"No existe el paso {load_step}, subpaso {substep}")
+        return int(self.set_ids[match[0]])
+
+    def times_of(self, set_ids):
+        return self.times[self._positions(set_ids)]
+
+    def columns(self, set_ids=None):
+        """
+        Columnas de salida (Paso_Carga, Subpaso, Set, Tiempo) para los sets dados,
+        en el mismo orden. Sin set_ids, todos los sets.
+        """
+        positions = np.arange(self.n_sets) if set_ids is None else self._positions(set_ids)
+        return {
+            'Paso_Carga': self.load_steps[positions],
+            'Subpaso': self.substeps[positions],
+            'Set': self.set_ids[positions],
+            'Tiempo': self.times[positions],
+        }
+
+    def describe(self):
+        if not self.n_sets:
+            return "Soporte de tiempo vacío"
+        return (f"{self.n_sets} sets en {self.n_load_steps} pasos de carga "
+                f"(t = {self.times[0]:g} ... {self.times[-1]:g})")
+
+
+def read_time_support(data_source):
+    """
+    Lee el soporte de tiempo de un .rst con una sola evaluación de
+    time_freq_provider (data_source: dpf.DataSources o ruta).
+    """
+    from ansys.dpf import core as dpf
+    from ansys.dpf.core import operators as ops
+
+    if isinstance(data_source, str):
+        data_source = dpf.DataSources(data_source)
+    provider = ops.metadata.time_freq_provider(data_sources=data_source)
+    return TimeSupport.from_dpf(provider.outputs.time_freq_support())
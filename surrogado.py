@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# MODELO SUSTITUTO (SURROGATE) DE LOS RESULTADOS FEA DE RESORTES
+# ----------------------------------------------------------------------
+# Entrena un regresor que va de los parámetros de diseño del resorte a los
+# resultados del FEA (desplazamiento, Von Mises y fuerza de reacción), lo guarda
+# en disco y lo sirve por lotes, tanto desde Python (predict) como por HTTP.
+
+# Parámetros de diseño usados como entrada (nombres normalizados del dataset)
+DEFAULT_FEATURES = [
+    'Diametro_Alambre',
+    'Diametro_Medio',
+    'Espiras_Activas',
+    'Longitud_Libre',
+    'Tiempo',
+]
+
+# Resultados FEA a predecir (columnas de dataset_para_ia)
+DEFAULT_TARGETS = [
+    'Max_Desplazamiento',
+    'Max_Von_Mises',
+    'Total_Reaction_Force_Norm',
+]
+
+# Tamaño de lote interno de predict(): acota la memoria con millones de diseños
+PREDICT_CHUNK = 65536
+
+
+def make_estimator(kind='random_forest', n_jobs=-1, random_state=0):
+    """
+    Regresores disponibles. Todos aceptan varias salidas a la vez.
+    """
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler, PolynomialFeatures
+    from sklearn.linear_model import Ridge
+    from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+
+    if kind == 'random_forest':
+        return RandomForestRegressor(n_estimators=200, min_samples_leaf=2,
+                                     n_jobs=n_jobs, random_state=random_state)
+    if kind == 'extra_trees':
+        return ExtraTreesRegressor(n_estimators=300, min_samples_leaf=2,
+                                   n_jobs=n_jobs, random_state=random_state)
+    if kind == 'ridge_poly':
+        return make_pipeline(StandardScaler(), PolynomialFeatures(degree=3), Ridge(alpha=1e-3))
+    raise ValueError(f"Modelo desconocido: '{kind}'")
+
+
+class SurrogateModel:
+    """
+    Regresor entrenado + nombres de entradas y salidas.
+
+        model = SurrogateModel.train(df, kind='random_forest')
+        model.save('surrogado.joblib')
+        model = SurrogateModel.load('surrogado.joblib')
+        y = model.predict(X)          # X: (n_diseños, n_features) -> (n_diseños, n_targets)
+    """
+
+    def __init__(self, estimator, features, targets, metadata=None):
+        self.estimator = estimator
+        self.features = list(features)
+        self.targets = list(targets)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def train(cls, df, features=DEFAULT_FEATURES, targets=DEFAULT_TARGETS, kind='random_forest', **kwargs):
+        data = df.dropna(subset=list(features) + list(targets))
+        X = data[list(features)].to_numpy(dtype=np.float64)
+        y = data[list(targets)].to_numpy(dtype=np.float64)
+
+        estimator = make_estimator(kind, **kwargs)
+        start = time.perf_counter()
+        estimator.fit(X, y)
+        fit_seconds = time.perf_counter() - start
+
+        metadata = {'kind': kind, 'n_train': int(len(X)), 'fit_seconds': fit_seconds,
+                    'trained_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        print(f"Modelo '{kind}' entrenado con {len(X)} filas en {fit_seconds:.2f} s")
+        return cls(estimator, features, targets, metadata)
+
+    def predict(self, X):
+        """
+        Predicción por lotes. Acepta un arreglo (n, n_features), una lista de listas
+        o un DataFrame con las columnas de entrada.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy(dtype=np.float64)
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.shape[1] != len(self.features):
+            raise ValueError(f"Se esperaban {len(self.features)} columnas {self.features}, llegaron {X.shape[1]}")
+
+        out = np.empty((len(X), len(self.targets)), dtype=np.float64)
+        for start in range(0, len(X), PREDICT_CHUNK):
+            stop = start + PREDICT_CHUNK
+            out[start:stop] = np.asarray(self.estimator.predict(X[start:stop])).reshape(-1, len(self.targets))
+        return out
+
+    def predict_frame(self, df):
+        return pd.DataFrame(self.predict(df), columns=self.targets, index=df.index)
+
+    def save(self, path):
+        """
+        Guarda con joblib sin compresión: los arreglos grandes (árboles) se pueden
+        cargar con mmap_mode='r', lo que hace la carga prácticamente instantánea.
+        """
+        import joblib
+
+        joblib.dump({'estimator': self.estimator, 'features': self.features,
+                     'targets': self.targets, 'metadata': self.metadata}, path, compress=0)
+        with open(os.path.splitext(path)[0] + '_meta.json', 'w', encoding='utf-8') as f:
+            json.dump({'features': self.features, 'targets': self.targets, **self.metadata},
+                      f, indent=1, ensure_ascii=False)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        import joblib
+
+        payload = joblib.load(path, mmap_mode=mmap_mode)
+        return cls(payload['estimator'], payload['features'], payload['targets'], payload['metadata'])
+
+
+# ----------------------------------------------------------------------
+# SERVIDOR HTTP CON MICRO-LOTES
+# ----------------------------------------------------------------------
+
+class MicroBatcher:
+    """
+    Junta las peticiones que llegan casi al mismo tiempo en un solo predict().
+    Un hilo espera hasta max_wait segundos o hasta max_batch diseños, predice el
+    lote completo y reparte los resultados a cada petición.
+    """
+
+    def __init__(self, model, max_batch=100000, max_wait=0.005):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.designs = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, X):
+        """
+        Encola un arreglo de diseños y espera su resultado. El ancho se revisa
+        antes de encolar: una petición mal formada no debe tumbar el lote de las
+        demás.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        n_features = len(self.model.features)
+        if X.ndim != 2 or X.shape[1] != n_features:
+            raise ValueError(f"Se esperaban {n_features} columnas {self.model.features}, "
+                             f"llegaron {X.shape[1] if X.ndim == 2 else X.shape}")
+        done = threading.Event()
+        slot = {'X': X, 'done': done}
+        self.requests.put(slot)
+        done.wait()
+        if 'error' in slot:
+            raise slot['error']
+        return slot['y']
+
+    def _run(self):
+        while True:
+            pending = [self.requests.get()]
+            n_designs = len(pending[0]['X'])
+            deadline = time.perf_counter() + self.max_wait
+            while n_designs < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    slot = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(slot)
+                n_designs += len(slot['X'])
+
+            try:
+                y = self.model.predict(np.concatenate([slot['X'] for slot in pending]))
+                start = 0
+                for slot in pending:
+                    slot['y'] = y[start:start + len(slot['X'])]
+                    start += len(slot['X'])
+            except Exception as e:
+                for slot in pending:
+                    slot['error'] = e
+            self.batches += 1
+            self.designs += n_designs
+            for slot in pending:
+                slot['done'].set()
+
+
+def serve(model, host='127.0.0.1', port=8765, max_batch=100000, max_wait=0.005):
+    """
+    Servidor HTTP local.
+
+    POST /predict   {"designs": [[d, D, Na, L0, t], ...]}
+                 o  {"columns": [...], "rows": [[...], ...]}
+        -> {"targets": [...], "predictions": [[...], ...], "seconds": ...}
+    GET  /info      -> entradas, salidas y metadatos del modelo
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    batcher = MicroBatcher(model, max_batch=max_batch, max_wait=max_wait)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/info':
+                return self._send(404, {'error': 'Ruta desconocida'})
+            self._send(200, {'features': model.features, 'targets': model.targets,
+                             'metadata': model.metadata,
+                             'batches': batcher.batches, 'designs': batcher.designs})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                return self._send(404, {'error': 'Ruta desconocida'})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if 'rows' in request:
+                    X = pd.DataFrame(request['rows'], columns=request['columns'])[model.features].to_numpy()
+                else:
+                    X = request['designs']
+                start = time.perf_counter()
+                y = batcher.submit(X)
+                self._send(200, {'targets': model.targets, 'predictions': y.tolist(),
+                                 'seconds': time.perf_counter() - start})
+            except Exception as e:
+                self._send(400, {'error': f"{type(e).__name__}: {e}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Modelo sustituto disponible en http://{host}:{port}/predict (Ctrl+C para salir)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# ----------------------------------------------------------------------
+# BENCHMARK: LATENCIA POR DISEÑO VS UNA SOLUCIÓN FEA
+# ----------------------------------------------------------------------
+
+def benchmark(model, batch_sizes=(1, 100, 10000, 1000000), fea_seconds=600.0, repeats=3, seed=0):
+    """
+    Mide la latencia de predict() por diseño para varios tamaños de lote y la
+    compara con el tiempo de una solución FEA (fea_seconds, medido en ANSYS).
+    Los diseños se generan al azar dentro del rango de entrenamiento si está
+    disponible en los metadatos, o en [0, 1] si no.
+    """
+    rng = np.random.default_rng(seed)
+    low = np.asarray(model.metadata.get('feature_min', np.zeros(len(model.features))))
+    high = np.asarray(model.metadata.get('feature_max', np.ones(len(model.features))))
+
+    rows = []
+    for n in batch_sizes:
+        X = rng.uniform(low, high, size=(n, len(model.features)))
+        model.predict(X[:1])  # calentamiento
+        best = min(_timed(model.predict, X) for _ in range(repeats))
+        per_design = best / n
+        rows.append({'Lote': n, 'Segundos_Lote': best, 'Segundos_por_Diseno': per_design,
+                     'Disenos_por_Segundo': n / best if best > 0 else np.inf,
+                     'Aceleracion_vs_FEA': fea_seconds / per_design if per_design > 0 else np.inf})
+
+    result = pd.DataFrame(rows)
+    print(f"\nLatencia del modelo sustituto vs FEA ({fea_seconds:.0f} s por solución):")
+    print(result.to_string(index=False))
+    return result
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def train_from_file(dataset_path, model_path, features=DEFAULT_FEATURES, targets=DEFAULT_TARGETS,
+                    kind='random_forest'):
+    """
+    Entrena desde un dataset en disco (Parquet o CSV con ';') y guarda el modelo.
+    """
+    from escritores import read_dataset
+
+    df = read_dataset(dataset_path)
+    model = SurrogateModel.train(df, features=features, targets=targets, kind=kind)
+    model.metadata['feature_min'] = df[list(features)].min().tolist()
+    model.metadata['feature_max'] = df[list(features)].max().tolist()
+    model.save(model_path)
+    print(f"Modelo guardado en '{model_path}'")
+    return model
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Modelo sustituto de resultados FEA de resortes.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_train = sub.add_parser("train", help="Entrenar y guardar el modelo")
+    p_train.add_argument("dataset", help="Dataset con parámetros de diseño y resultados FEA")
+    p_train.add_argument("-m", "--model", default="surrogado.joblib")
+    p_train.add_argument("--kind", default="random_forest",
+                         choices=["random_forest", "extra_trees", "ridge_poly"])
+
+    p_serve = sub.add_parser("serve", help="Servir el modelo por HTTP")
+    p_serve.add_argument("-m", "--model", default="surrogado.joblib")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8765)
+    p_serve.add_argument("--max-batch", type=int, default=100000)
+    p_serve.add_argument("--max-wait-ms", type=float, default=5.0)
+
+    p_bench = sub.add_parser("bench", help="Latencia por diseño vs FEA")
+    p_bench.add_argument("-m", "--model", default="surrogado.joblib")
+    p_bench.add_argument("--fea-seconds", type=float, default=600.0,
+                         help="Duración de una solución FEA completa en ANSYS")
+
+    args = parser.parse_args(argv)
+    if args.command == "train":
+        train_from_file(args.dataset, args.model, kind=args.kind)
+    elif args.command == "serve":
+        serve(SurrogateModel.load(args.model), host=args.host, port=args.port,
+              max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000.0)
+    else:
+        benchmark(SurrogateModel.load(args.model), fea_seconds=args.fea_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+import os
+import time
+import shutil
+import asyncio
+
+from Extraccion_datos3 import _init_worker, _tracked_worker, _drain_started
+
+# ----------------------------------------------------------------------
+# TUBERÍA DE EXTRACCIÓN (COPIA, EVALUACIÓN Y ESCRITURA SOLAPADAS)
+# ----------------------------------------------------------------------
+# En el modo secuencial cada archivo se lee del NAS, se evalúa con DPF y se
+# escribe antes de pasar al siguiente: la red, la CPU y el disco local nunca
+# trabajan a la vez. La tubería separa las tres etapas con colas acotadas:
+#
+#   copia ──(cola de 'prefetch')──> evaluación ──(cola de 'max_pending')──> escritura
+#   NAS -> scratch (hilo)          DPF (pool de procesos)                  caché + diario
+#
+# - copia: copia el .rst siguiente al disco local (scratch) mientras se evalúa
+#   el actual. Sin scratch_dir no copia y pasa la ruta original.
+# - evaluación: 'workers' tareas, cada una con un proceso del pool (DPF usa CPU)
+#   y su propio caché de mallas. La copia local se borra al terminar. Si un
+#   proceso muere, el pool se reemplaza: los archivos que esperaban en él se
+#   reenvían sin contar como fallo y los que estaban en ejecución se repiten
+#   cada uno en un pool propio; solo el que vuelve a tumbarlo queda fallido.
+# - escritura: llama a on_result por archivo (confirmación en el caché y el
+#   diario, ver diario_extraccion.py) en el hilo principal, donde vive la
+#   conexión SQLite.
+#
+# Contrapresión: una etapa que llena su cola de salida se detiene. En disco
+# local hay como mucho prefetch + workers + 1 copias, y en memoria como mucho
+# max_pending + workers DataFrames esperando la escritura.
+#
+# Por etapa se mide: archivos, tiempo ocupado, tiempo esperando entrada (la
+# etapa anterior es más lenta), tiempo bloqueado por la cola de salida (la
+# siguiente es más lenta), bytes copiados y ocupación máxima de la cola.
+
+PREFETCH_DEPTH = 2
+MAX_PENDING = 4
+
+_DONE = None
+
+
+class StageMetrics:
+    """
+    Contadores de una etapa. 'busy' suma el tiempo de todas las tareas de la
+    etapa, así que la ocupación se divide por el número de tareas.
+    """
+
+    def __init__(self, name, tasks=1):
+        self.name = name
+        self.tasks = tasks
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.bytes = 0
+        self.max_queue = 0
+
+    def as_dict(self, wall):
+        return {
+            'stage': self.name,
+            'tasks': self.tasks,
+            'items': self.items,
+            'busy_s': round(self.busy, 4),
+            'starved_s': round(self.starved, 4),
+            'blocked_s': round(self.blocked, 4),
+            'items_per_s': round(self.items / self.busy, 3) if self.busy > 0 else None,
+            'mb_per_s': round(self.bytes / 2 ** 20 / self.busy, 2) if self.busy > 0 and self.bytes else None,
+            'utilization': round(self.busy / (wall * self.tasks), 3) if wall > 0 else None,
+            'max_queue': self.max_queue,
+        }
+
+
+async def _get(queue, metrics):
+    started = time.perf_counter()
+    item = await queue.get()
+    metrics.starved += time.perf_counter() - started
+    return item
+
+
+async def _put(queue, item, metrics):
+    started = time.perf_counter()
+    await queue.put(item)
+    metrics.blocked += time.perf_counter() - started
+    metrics.max_queue = max(metrics.max_queue, queue.qsize())
+
+
+def _stage_copy(rst_path, scratch_dir, index):
+    """
+    Copia el .rst a scratch con un nombre único. Devuelve (ruta local, bytes).
+    """
+    local_path = os.path.join(scratch_dir, f"{index:06d}_{os.path.basename(rst_path)}")
+    shutil.copyfile(rst_path, local_path)
+    return local_path, os.path.getsize(local_path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def _copy_stage(rst_files, scratch_dir, out_queue, metrics, n_consumers):
+    for index, rst_path in enumerate(rst_files):
+        started = time.perf_counter()
+        if scratch_dir is None:
+            item = (rst_path, None, None)
+        else:
+            try:
+                local_path, size = await asyncio.to_thread(_stage_copy, rst_path, scratch_dir, index)
+                metrics.bytes += size
+                item = (rst_path, local_path, None)
+            except OSError as e:
+                item = (rst_path, None, f"{type(e).__name__}: {e}")
+        metrics.busy += time.perf_counter() - started
+        metrics.items += 1
+        await _put(out_queue, item, metrics)
+    for _ in range(n_consumers):
+        await out_queue.put(_DONE)
+
+
+class _Pool:
+    """
+    ProcessPoolExecutor cuyos procesos avisan qué archivo empiezan (ver
+    Extraccion_datos3._tracked_worker). 'running' son los archivos empezados
+    y aún sin resultado: al romperse el pool, los únicos sospechosos.
+    """
+
+    def __init__(self, workers, initializer):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.started = multiprocessing.SimpleQueue()
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(self.started, initializer))
+        self.running = {}
+
+    async def run(self, rst_path, worker_args, local_path, fingerprint=None):
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.executor, _tracked_worker, rst_path, *worker_args, local_path,
+                                            fingerprint)
+        _drain_started(self.started, self.running)
+        self.running.pop(rst_path, None)
+        return result
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+async def _evaluate(pools, rst_path, local_path, worker_args, fingerprint=None):
+    """
+    Evalúa un archivo en el pool actual. Devuelve (df, fallo, registros).
+    """
+    from concurrent.futures.process import BrokenProcessPool
+
+    while True:
+        pool = pools['current']
+        try:
+            _, df, error, records = await pool.run(rst_path, worker_args, local_path, fingerprint)
+            failure = None if error is None else {'RST_Source': rst_path, 'Motivo': 'error', 'Detalle': error}
+            return df, failure, records
+        except BrokenProcessPool as e:
+            # Se reemplaza el pool una sola vez aunque varias tareas lo noten
+            _drain_started(pool.started, pool.running)
+            if pools['current'] is pool:
+                pools['replace']()
+            if rst_path not in pool.running:
+                continue
+            if len(pool.running) == 1:
+                return None, {'RST_Source': rst_path, 'Motivo': 'proceso_caido', 'Detalle': str(e)}, []
+            broken = e
+
+        # Varios archivos en ejecución: se repite este solo, de a un sospechoso a la vez
+        async with pools['isolation']:
+            alone = _Pool(1, pools['initializer'])
+            try:
+                _, df, error, records = await alone.run(rst_path, worker_args, local_path, fingerprint)
+            except BrokenProcessPool:
+                return None, {'RST_Source': rst_path, 'Motivo': 'proceso_caido', 'Detalle': str(broken)}, []
+            finally:
+                alone.shutdown(wait=False)
+        failure = None if error is None else {'RST_Source': rst_path, 'Motivo': 'error', 'Detalle': error}
+        return df, failure, records
+
+
+async def _evaluate_stage(pools, in_queue, out_queue, metrics, worker_args, fingerprints):
+    while True:
+        item = await _get(in_queue, metrics)
+        if item is _DONE:
+            return
+        rst_path, local_path, copy_error = item
+        if copy_error is not None:
+            await _put(out_queue, (rst_path, None, {'RST_Source': rst_path, 'Motivo': 'copia',
+                                                    'Detalle': copy_error}, []), metrics)
+            continue
+
+        started = time.perf_counter()
+        try:
+            df, failure, records = await _evaluate(pools, rst_path, local_path, worker_args,
+                                                   fingerprints.get(rst_path))
+        finally:
+            if local_path is not None:
+                _remove(local_path)
+        metrics.busy += time.perf_counter() - started
+        metrics.items += 1
+        await _put(out_queue, (rst_path, df, failure, records), metrics)
+
+
+async def _write_stage(in_queue, metrics, on_result, n_files):
+    results, failures, records = {}, [], []
+    while True:
+        item = await _get(in_queue, metrics)
+        if item is _DONE:
+            return results, failures, records
+        rst_path, df, failure, file_records = item
+        started = time.perf_counter()
+        records.extend(file_records)
+        if failure is not None:
+            failures.append(failure)
+            print(f"  [ERROR] {rst_path}: {failure['Detalle']}")
+        else:
+            results[rst_path] = df
+            print(f"  [OK] ({len(results)}/{n_files}) {rst_path}")
+        if on_result is not None:
+            on_result(rst_path, df, failure)
+        metrics.busy += time.perf_counter() - started
+        metrics.items += 1
+
+
+async def _run(rst_files, workers, scratch_dir, prefetch, max_pending, on_result, initializer, worker_args,
+               fingerprints):
+    copy_metrics = StageMetrics('copia')
+    evaluate_metrics = StageMetrics('evaluacion', tasks=workers)
+    write_metrics = StageMetrics('escritura')
+    staged = asyncio.Queue(maxsize=prefetch)
+    evaluated = asyncio.Queue(maxsize=max_pending)
+
+    pools = {'current': _Pool(workers, initializer), 'initializer': initializer,
+             'isolation': asyncio.Lock()}
+
+    def replace():
+        pools['current'].shutdown(wait=False)
+        pools['current'] = _Pool(workers, initializer)
+    pools['replace'] = replace
+
+    async def produce():
+        await asyncio.gather(
+            _copy_stage(rst_files, scratch_dir, staged, copy_metrics, workers),
+            *(_evaluate_stage(pools, staged, evaluated, evaluate_metrics, worker_args, fingerprints)
+              for _ in range(workers)))
+        await evaluated.put(_DONE)
+
+    # Si una etapa falla, gather lo propaga y asyncio.run cancela las demás
+    started = time.perf_counter()
+    try:
+        _, (results, failures, records) = await asyncio.gather(
+            produce(), _write_stage(evaluated, write_metrics, on_result, len(rst_files)))
+    finally:
+        pools['current'].shutdown(wait=True)
+    wall = time.perf_counter() - started
+
+    metrics = {'wall_s': round(wall, 4),
+               'stages': [m.as_dict(wall) for m in (copy_metrics, evaluate_metrics, write_metrics)]}
+    return results, failures, records, metrics
+
+
+def run_pipeline(rst_files, workers=1, scratch_dir=None, prefetch=PREFETCH_DEPTH, max_pending=MAX_PENDING,
+                 profile=False, mesh_cache_mb=None, mesh_export_dir=None, on_result=None, initializer=None,
+                 fixed_selection=None, fingerprints=None):
+    """
+    Extrae rst_files con la tubería copia -> evaluación -> escritura.
+
+    - workers: procesos de evaluación (con 1 también hay solapamiento: la copia
+      y la escritura corren en el proceso principal).
+    - scratch_dir: carpeta local para las copias (se crea y, si la creó la
+      tubería, se borra al final). None = leer directamente la ruta original.
+    - prefetch / max_pending: tamaño de las colas copia->evaluación y
+      evaluación->escritura.
+    - on_result(rst_path, df, fallo): igual que en run_parallel_extraction.
+    - fixed_selection: selección de apoyo para la fuerza de reacción.
+    - fingerprints: dict rst_path -> file_fingerprint ya calculado (el del caché
+      de extracción). Sin él, cada proceso calcula la huella sobre la copia
+      local, no sobre el original.
+
+    Devuelve (resultados, fallos, registros, métricas); las tres primeras como
+    run_parallel_extraction y 'métricas' un dict con wall_s y una entrada por etapa.
+    Sin tiempo máximo por archivo: un proceso bloqueado en DPF detiene su tarea.
+    """
+    created = False
+    if scratch_dir is not None and not os.path.isdir(scratch_dir):
+        os.makedirs(scratch_dir)
+        created = True
+    try:
+        return asyncio.run(_run(list(rst_files), max(1, workers), scratch_dir, max(1, prefetch),
+                                max(1, max_pending), on_result, initializer,
+                                (profile, mesh_cache_mb, mesh_export_dir, fixed_selection),
+                                fingerprints or {}))
+    finally:
+        if created:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def print_metrics(metrics):
+    """
+    Tabla de rendimiento por etapa. La etapa con ocupación más alta es el cuello
+    de botella; 'espera' alto indica que la etapa anterior no la alimenta.
+    """
+    print(f"\nTubería: {metrics['wall_s']:.2f} s")
+    print(f"{'etapa':<12}{'tareas':>7}{'archivos':>10}{'ocupado s':>11}{'espera s':>10}"
+          f"{'bloqueo s':>11}{'arch/s':>10}{'MB/s':>9}{'uso %':>7}{'cola':>6}")
+    for stage in metrics['stages']:
+        rate = f"{stage['items_per_s']:.1f}" if stage['items_per_s'] is not None else '-'
+        mb_rate = f"{stage['mb_per_s']:.1f}" if stage['mb_per_s'] is not None else '-'
+        usage = f"{100 * stage['utilization']:.0f}" if stage['utilization'] is not None else '-'
+        print(f"{stage['stage']:<12}{stage['tasks']:>7}{stage['items']:>10}{stage['busy_s']:>11.2f}"
+              f"{stage['starved_s']:>10.2f}{stage['blocked_s']:>11.2f}{rate:>10}{mb_rate:>9}{usage:>7}"
+              f"{stage['max_queue']:>6}")
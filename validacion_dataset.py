@@ -0,0 +1,300 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# CONTROL DE CALIDAD DEL DATASET EXTRAÍDO (CUARENTENA POR PROYECTO)
+# ----------------------------------------------------------------------
+# Se ejecuta después de process_all_projects, sobre todo el dataset a la vez
+# (cada regla es una operación de columnas, sin bucles por fila). Una regla de
+# severidad 'error' en cualquier fila manda el PROYECTO completo a cuarentena:
+# sus filas salen del dataset de entrenamiento y quedan aparte junto con el
+# reporte, para revisarlas sin que contaminen el modelo.
+#
+# Reglas (ver RULES):
+#   - tipos: columnas de resultados con texto (por ejemplo la representación de
+#     un Field de DPF en lugar del número)
+#   - valores no finitos (NaN, inf) y normas negativas. Excepción: Tiempo NaN en
+#     un archivo de un solo set (soporte de tiempo ilegible o análisis estático,
+#     ver TimeSupport.single) es solo un aviso
+#   - fuerza de reacción 0.0 en todos los pasos de un archivo
+#   - Set y Tiempo estrictamente crecientes, Paso_Carga no decreciente y
+#     Subpaso creciente dentro de cada paso de carga (subpasos fijos a mano)
+#   - rangos físicos contra BASEDAT (DATIS.xlsm): desplazamiento máximo contra
+#     la longitud libre y Von Mises contra el esfuerzo de preasentamiento
+#
+# Las filas de un mismo .rst deben estar juntas y en orden de salida (así las
+# deja process_all_projects); las reglas de orden comparan cada fila con la
+# anterior del mismo archivo.
+
+# Columnas numéricas que se validan cuando existen
+NUMERIC_COLUMNS = ('Paso_Carga', 'Subpaso', 'Set', 'Tiempo', 'Max_Desplazamiento', 'Max_Von_Mises',
+                   'Max_Principal', 'Total_Reaction_Force_Norm')
+NON_NEGATIVE_COLUMNS = ('Max_Desplazamiento', 'Max_Von_Mises', 'Total_Reaction_Force_Norm')
+REQUIRED_COLUMNS = ('Proyecto', 'RST_Source')
+
+# Límites físicos. Un nodo no se desplaza más que la longitud libre del
+# resorte; el Von Mises de una sección en torsión es sqrt(3) veces el cortante,
+# y el pico local del FEA puede superar al nominal de BASEDAT (STRESS_MARGIN).
+DISPLACEMENT_MARGIN = 1.0
+STRESS_MARGIN = 1.5
+VON_MISES_CAP_MPA = 3000.0     # sin diseño: por encima de la resistencia de cualquier acero de resortes
+
+# regla -> (severidad, descripción)
+RULES = {
+    'tipo_no_numerico': ('error', "Valor no numérico en una columna de resultados"),
+    'no_finito': ('error', "NaN o infinito en una columna de resultados"),
+    'negativo': ('error', "Norma o máximo negativo"),
+    'tiempo_desconocido': ('aviso', "Tiempo NaN en un archivo de un solo set (se asumió un único set)"),
+    'reaccion_nula': ('error', "Fuerza de reacción 0.0 en todos los pasos del archivo"),
+    'set_no_creciente': ('error', "Set no crece respecto a la fila anterior"),
+    'tiempo_no_creciente': ('error', "Tiempo no crece respecto a la fila anterior"),
+    'paso_carga_decreciente': ('error', "Paso_Carga decrece"),
+    'subpaso_no_creciente': ('error', "Subpaso no crece dentro del paso de carga"),
+    'desplazamiento_fuera_de_rango': ('error', "Max_Desplazamiento mayor que la longitud libre"),
+    'esfuerzo_fuera_de_rango': ('error', "Max_Von_Mises mayor que el límite del material"),
+    'sin_diseno': ('aviso', "Proyecto sin fila en BASEDAT: solo se aplican límites genéricos"),
+    'columna_faltante': ('aviso', "Columna ausente: las reglas que la usan no se aplicaron"),
+}
+
+REPORT_COLUMNS = ['Proyecto', 'RST_Source', 'Regla', 'Severidad', 'Filas', 'Detalle']
+
+
+def coerce_numeric(df, columns=NUMERIC_COLUMNS):
+    """
+    Copia del DataFrame con las columnas numéricas convertidas. Devuelve
+    (df, máscara de filas con texto no convertible).
+    """
+    df = df.copy()
+    bad = pd.Series(False, index=df.index)
+    for column in columns:
+        if column in df and not pd.api.types.is_numeric_dtype(df[column]):
+            converted = pd.to_numeric(df[column], errors='coerce')
+            bad |= converted.isna() & df[column].notna()
+            df[column] = converted
+    return df, bad
+
+
+def design_limits(df, design_df):
+    """
+    Límites por fila a partir de BASEDAT: (desplazamiento máximo, Von Mises
+    máximo, máscara de filas sin diseño).
+    """
+    n = len(df)
+    if design_df is None:
+        return np.full(n, np.inf), np.full(n, VON_MISES_CAP_MPA), np.ones(n, dtype=bool)
+
+    from carga_datos import project_key, design_index
+
+    # Una búsqueda por proyecto, no por fila. Claves ambiguas: sin diseño
+    design, _ = design_index(design_df, verbose=False)
+    inverse, names = pd.factorize(df['Proyecto'])
+    keys = pd.Index([project_key(str(name)) for name in names])
+    free_length = design['Longitud_Libre'].reindex(keys).to_numpy(dtype=np.float64)[inverse]
+    preset_stress = design['Esfuerzo_Preasentamiento'].reindex(keys).to_numpy(dtype=np.float64)[inverse]
+
+    missing = ~keys.isin(design.index)[inverse]
+    displacement_limit = np.where(np.isfinite(free_length) & (free_length > 0),
+                                  free_length * DISPLACEMENT_MARGIN, np.inf)
+    stress_limit = np.where(np.isfinite(preset_stress) & (preset_stress > 0),
+                            np.sqrt(3.0) * preset_stress * STRESS_MARGIN, VON_MISES_CAP_MPA)
+    return displacement_limit, stress_limit, missing
+
+
+def rule_masks(df, design_df=None):
+    """
+    Dict regla -> máscara booleana por fila (True = fila que incumple), más la
+    lista de columnas ausentes. df ya debe tener las columnas convertidas.
+    """
+    masks = {}
+    missing_columns = [c for c in NUMERIC_COLUMNS if c not in df]
+
+    source = pd.factorize(df['RST_Source'])[0]
+    numeric = [c for c in NUMERIC_COLUMNS if c in df]
+    finite = np.isfinite(df[numeric].to_numpy(dtype=np.float64))
+    if 'Tiempo' in df:
+        single_set = np.bincount(source)[source] == 1
+        unknown_time = single_set & np.isnan(df['Tiempo'].to_numpy(dtype=np.float64))
+        finite[:, numeric.index('Tiempo')] |= unknown_time
+        masks['tiempo_desconocido'] = unknown_time
+    masks['no_finito'] = ~finite.all(axis=1)
+    present = [c for c in NON_NEGATIVE_COLUMNS if c in df]
+    masks['negativo'] = (df[present].to_numpy(dtype=np.float64) < 0).any(axis=1)
+
+    if 'Total_Reaction_Force_Norm' in df:
+        peak = np.zeros(source.max(initial=-1) + 1)
+        np.maximum.at(peak, source, np.abs(df['Total_Reaction_Force_Norm'].to_numpy(dtype=np.float64)))
+        masks['reaccion_nula'] = peak[source] == 0
+
+    # Orden de los pasos: cada fila contra la anterior del mismo archivo
+    same_file = np.concatenate([[False], source[1:] == source[:-1]])
+    for column, rule in (('Set', 'set_no_creciente'), ('Tiempo', 'tiempo_no_creciente')):
+        if column in df:
+            masks[rule] = same_file & (df[column].diff().to_numpy() <= 0)
+    if 'Paso_Carga' in df:
+        step_change = df['Paso_Carga'].diff().to_numpy()
+        masks['paso_carga_decreciente'] = same_file & (step_change < 0)
+        if 'Subpaso' in df:
+            masks['subpaso_no_creciente'] = same_file & (step_change == 0) & (df['Subpaso'].diff().to_numpy() <= 0)
+
+    displacement_limit, stress_limit, no_design = design_limits(df, design_df)
+    if 'Max_Desplazamiento' in df:
+        masks['desplazamiento_fuera_de_rango'] = df['Max_Desplazamiento'].to_numpy() > displacement_limit
+    if 'Max_Von_Mises' in df:
+        masks['esfuerzo_fuera_de_rango'] = df['Max_Von_Mises'].to_numpy() > stress_limit
+    masks['sin_diseno'] = no_design
+    return masks, missing_columns
+
+
+def validate_dataset(df, design_df=None):
+    """
+    Valida todo el dataset. Devuelve (limpio, cuarentena, reporte): las filas de
+    los proyectos sin errores, las de los proyectos con algún error y un
+    DataFrame con una fila por (proyecto, archivo, regla) incumplida.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df]
+    if missing:
+        raise ValueError(f"El dataset no tiene las columnas {missing}; no se puede validar por proyecto.")
+
+    checked, not_numeric = coerce_numeric(df)
+    masks, missing_columns = rule_masks(checked, design_df)
+    # El texto convertido queda en NaN: se informa solo como tipo_no_numerico
+    masks['no_finito'] = masks['no_finito'] & ~not_numeric.to_numpy()
+    if 'tiempo_desconocido' in masks:
+        masks['tiempo_desconocido'] = masks['tiempo_desconocido'] & ~not_numeric.to_numpy()
+    masks = {'tipo_no_numerico': not_numeric.to_numpy(), **masks}
+
+    keys = df[['Proyecto', 'RST_Source']]
+    reports = []
+    for rule, mask in masks.items():
+        if not mask.any():
+            continue
+        counts = keys[mask].astype(str).value_counts(sort=False).rename('Filas').reset_index()
+        severity, description = RULES[rule]
+        counts['Regla'], counts['Severidad'], counts['Detalle'] = rule, severity, description
+        reports.append(counts)
+    for column in missing_columns:
+        severity, description = RULES['columna_faltante']
+        reports.append(pd.DataFrame([{'Proyecto': '*', 'RST_Source': '*', 'Regla': 'columna_faltante',
+                                      'Severidad': severity, 'Filas': len(df),
+                                      'Detalle': f"{description}: {column}"}]))
+    report = (pd.concat(reports, ignore_index=True)[REPORT_COLUMNS] if reports
+              else pd.DataFrame(columns=REPORT_COLUMNS))
+    report = report.sort_values(['Proyecto', 'RST_Source', 'Regla'], kind='stable', ignore_index=True)
+
+    bad_projects = set(report.loc[report['Severidad'] == 'error', 'Proyecto'])
+    quarantined = df['Proyecto'].astype(str).isin(bad_projects).to_numpy() if bad_projects \
+        else np.zeros(len(df), dtype=bool)
+    return df[~quarantined].reset_index(drop=True), df[quarantined].reset_index(drop=True), report
+
+
+def systemic_problem(report, n_rows, n_clean):
+    """
+    Mensaje si el problema es de la ejecución y no de algunos proyectos: todas
+    las filas en cuarentena, o una misma regla de error en todas las filas (por
+    ejemplo reaccion_nula cuando no se encontró la selección de apoyo). None si no.
+    """
+    if not n_rows:
+        return None
+    errors = report[report['Severidad'] == 'error']
+    per_rule = errors.groupby('Regla')['Filas'].sum()
+    everywhere = sorted(per_rule[per_rule >= n_rows].index)
+    if everywhere:
+        return f"La regla {everywhere} falla en las {n_rows} filas: revisar la extracción, no los proyectos."
+    if not n_clean:
+        return f"Las {n_rows} filas quedaron en cuarentena: revisar la extracción y el reporte."
+    return None
+
+
+def print_report(report, clean, quarantined):
+    print(f"\nValidación: {clean['Proyecto'].nunique()} proyectos aceptados ({len(clean)} filas) | "
+          f"{quarantined['Proyecto'].nunique()} en cuarentena ({len(quarantined)} filas)")
+    if report.empty:
+        return
+    summary = report.groupby(['Severidad', 'Regla'], sort=True).agg(
+        Proyectos=('Proyecto', 'nunique'), Filas=('Filas', 'sum'))
+    print(summary.to_string())
+
+
+def load_design(path=None):
+    """
+    BASEDAT de DATIS.xlsm (con caché). Sin path se usa el DATIS.xlsm del
+    repositorio. Lanza FileNotFoundError si el libro no está: sin BASEDAT el
+    control de calidad solo tendría límites genéricos y dejaría pasar proyectos
+    fuera de su diseño.
+    """
+    from carga_datos import load_basedat, DATIS_PATH
+
+    path = path or DATIS_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No se encontró '{path}': indicar el libro con --datis.")
+    return load_basedat(path)
+
+
+def quality_gate(df, output_filename, design_df=None, output_format=None, **write_options):
+    """
+    Valida el dataset, escribe la cuarentena y el reporte junto a output_filename
+    (<salida>_cuarentena.* y <salida>_validacion.csv) y devuelve las filas limpias.
+    Lanza ValueError si el problema es de toda la ejecución (ver
+    systemic_problem): en ese caso no debe guardarse el dataset.
+    """
+    from escritores import write_dataset, DEFAULT_FORMAT
+
+    clean, quarantined, report = validate_dataset(df, design_df)
+    print_report(report, clean, quarantined)
+
+    base = os.path.splitext(output_filename)[0]
+    report_path = base + "_validacion.csv"
+    report.to_csv(report_path, index=False, sep=';', encoding='utf-8')
+    if len(quarantined):
+        path = write_dataset(quarantined, base + "_cuarentena", fmt=output_format or DEFAULT_FORMAT,
+                             **write_options)
+        print(f"Proyectos en cuarentena guardados en '{path}' (reporte: '{report_path}')")
+    problem = systemic_problem(report, len(df), len(clean))
+    if problem:
+        raise ValueError(problem)
+    return clean
+
+
+def main(argv=None):
+    import argparse
+    from escritores import read_dataset, write_dataset, DEFAULT_FORMAT, WRITERS
+
+    parser = argparse.ArgumentParser(description="Control de calidad de un dataset de extracción.")
+    parser.add_argument("dataset", help="Dataset (Parquet, carpeta particionada o CSV con ';')")
+    parser.add_argument("--datis", default=None, help="Ruta de DATIS.xlsm (límites por proyecto)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Guardar las filas aceptadas aquí (también la cuarentena y el reporte)")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, choices=sorted(WRITERS))
+    args = parser.parse_args(argv)
+
+    df = read_dataset(args.dataset)
+    try:
+        design_df = load_design(args.datis)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    if args.output is None:
+        clean, quarantined, report = validate_dataset(df, design_df)
+        print_report(report, clean, quarantined)
+        if not report.empty:
+            print(report.to_string(max_rows=40))
+        problem = systemic_problem(report, len(df), len(clean))
+        if problem:
+            print(f"[ERROR] {problem}")
+            return 1
+        return 0
+    try:
+        clean = quality_gate(df, args.output, design_df, output_format=args.format)
+    except ValueError as e:
+        print(f"[ERROR] {e} No se guardó el dataset.")
+        return 1
+    path = write_dataset(clean, args.output, fmt=args.format)
+    print(f"Dataset validado guardado en '{path}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())